@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'User_Authentication.settings')
 
 application = get_asgi_application()
+
+# Preload templates, hashers and connections before serving (WARMUP_ON_STARTUP).
+# Imported here because accounts needs the app registry the handler sets up.
+from accounts.warmup import warm_up_if_enabled  # pylint: disable=wrong-import-position
+
+warm_up_if_enabled()
@@ -52,16 +52,52 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'your-email@example.com'
 EMAIL_HOST_PASSWORD = 'your-email-password'
 
+# Outbound mail queue (accounts.mail); run `manage.py send_queued_mail --loop`
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+MAIL_QUEUE_RETRY_BACKOFF = 60  # seconds, doubled after every failed attempt
+MAIL_QUEUE_LEASE = 300  # seconds a worker may hold a claimed batch
+
 AUTHENTICATION_BACKENDS = [
+    # Subclasses ModelBackend: also accepts the USERNAME_FIELD (email) and answers
+    # permission checks from accounts.permission_cache
     'accounts.auth_backend.EmailOrUsernameModelBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
 
 AUTH_USER_MODEL = 'accounts.User'
 
+# Hasher parameters come from PASSWORD_HASHER_PARAMS; re-run
+# `manage.py calibrate_hashers` on production hardware and paste its output.
+# Install argon2-cffi and move the Argon2 hasher first to prefer Argon2.
+# Hashes made by a hasher or parameters other than the first entry are
+# upgraded on the user's next successful login.
+PASSWORD_HASHERS = [
+    'accounts.hashers.CalibratedScryptPasswordHasher',
+    'accounts.hashers.CalibratedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASHER_PARAMS = {
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'time_cost': 2, 'memory_cost': 65536, 'parallelism': 1},
+}
+PASSWORD_HASH_TARGET_MS = 100  # per-hash budget calibrate_hashers aims for
+
+# Password hashing can run in a bounded process pool (accounts.hashing) so it
+# doesn't hold the GIL of request threads. 0 hashes inline in the caller. Each
+# worker is a separate interpreter (~40 MB) spawned in every process that
+# hashes, management commands and test runs included, so deployments opt in,
+# e.g. PASSWORD_HASHING_POOL_SIZE = os.cpu_count().
+PASSWORD_HASHING_POOL_SIZE = 0
+# Hashes allowed to wait for a free worker before requests get a 503; None is 8 per worker
+PASSWORD_HASHING_QUEUE_LIMIT = None
+
 MIDDLEWARE = [
+    'accounts.instrumentation.InstrumentationMiddleware',  # Outermost, to time the whole request
     'django.middleware.security.SecurityMiddleware',
+    'accounts.rate_limit.RateLimitMiddleware',  # Refuses over-limit requests before any session or DB work
+    'accounts.db_router.ReplicaRoutingMiddleware',  # Before sessions, so their reads and writes are routed
+    'accounts.middleware.HashingBackpressureMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,7 +111,8 @@ ROOT_URLCONF = 'User_Authentication.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing for accounts.instrumentation
+        'BACKEND': 'accounts.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -91,18 +128,169 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'User_Authentication.wsgi.application'
 
+# Request instrumentation (accounts.instrumentation), exported at /metrics/
+INSTRUMENTATION_SAMPLE_RATE = 0.1  # fraction of requests with per-kind timings
+# Addresses that may read /metrics/ without a staff login. Compared with
+# REMOTE_ADDR, so behind a reverse proxy list only the scraper's own address,
+# never the proxy's (e.g. 127.0.0.1 for nginx on the same host).
+METRICS_ALLOWED_IPS = []
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# Connections are kept open for CONN_MAX_AGE seconds by the thread that
+# opened them and checked before reuse (CONN_HEALTH_CHECKS). Under ASGI each
+# request runs on a new thread, so persistent connections aren't reused
+# there. Use a pooled engine instead, which shares connections between the
+# threads of a process (accounts.db_pool):
+#   'ENGINE': 'accounts.db_backends.postgresql',  # or accounts.db_backends.sqlite3
+#   'CONN_MAX_AGE': 0,
+#   'POOL': {'MAX_SIZE': 20, 'TIMEOUT': 5},  # connections; seconds to wait for one
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Stand-in read replica for accounts/tests/test_db_router.py, which gets
+    # its own test database. In memory, so commands that open every alias
+    # (makemigrations) leave no file behind. Point it at a real replica and
+    # list it in DATABASE_REPLICAS to use one.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+# Request-time reads go to these aliases, writes to 'default'
+# (accounts.db_router). Empty: everything uses 'default'.
+DATABASE_ROUTERS = ['accounts.db_router.ReplicaRouter']
+DATABASE_REPLICAS = []  # e.g. ['replica']
+# Upper bound on replication lag. Clients that wrote read from the primary
+# for this long, and so do cache loads of users changed more recently.
+REPLICA_LAG_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# LocMemCache is per process. With several workers, point this at a shared
+# backend so counters such as the login throttle are global, e.g.
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://127.0.0.1:6379',
+# or 'django.core.cache.backends.memcached.PyMemcacheCache'.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
 
+# Users loaded by the session middleware (accounts.user_cache)
+USER_CACHE = 'default'
+USER_CACHE_TIMEOUT = 300  # seconds
+
+
+# Sessions
+# 'accounts.session_backend' serves sessions from SESSION_CACHE_ALIAS and
+# writes them to the database in batches from a background thread. Only
+# enable it with a shared cache (see CACHES above).
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+SESSION_CACHE_ALIAS = 'default'
+SESSION_WRITE_BEHIND_INTERVAL = 1.0  # seconds; None flushes only when a batch fills
+SESSION_WRITE_BEHIND_BATCH_SIZE = 500
+SESSION_PURGE_INTERVAL = 60  # seconds between incremental purges of expired rows
+SESSION_PURGE_BATCH_SIZE = 1000
+
+
+# Permission names per user (accounts.permission_cache)
+PERMISSION_CACHE = 'default'
+PERMISSION_CACHE_TIMEOUT = 3600  # seconds
+
+
+# Bloom filter of known usernames/emails checked before login queries
+# (accounts.identifier_filter). Users saved by other processes are covered
+# through IDENTIFIER_FILTER_CACHE, so only enable it with a shared cache (see
+# CACHES above); with a per-process one, accounts registered on another worker
+# can't log in until the next rebuild.
+IDENTIFIER_FILTER_ENABLED = False
+IDENTIFIER_FILTER_CACHE = 'default'
+IDENTIFIER_FILTER_SNAPSHOT = BASE_DIR / 'identifier_filter.bin'  # generated; ignored by git
+IDENTIFIER_FILTER_CAPACITY = 100000  # minimum identifiers sized for
+IDENTIFIER_FILTER_ERROR_RATE = 0.01
+IDENTIFIER_FILTER_REBUILD_INTERVAL = 3600  # seconds
+IDENTIFIER_FILTER_RECENT_TTL = 86400  # seconds; older filters are not trusted
+
+
+# Signed activation and password-reset links (accounts.link_tokens)
+ACTIVATION_TOKEN_LIFETIME = 3 * 24 * 3600  # seconds
+PASSWORD_RESET_TIMEOUT = 24 * 3600  # seconds
+LINK_TOKEN_CACHE = 'default'  # used links; share it between processes
+# Also accept links sent with django.contrib.auth's default_token_generator
+# before the signed tokens; turn off once PASSWORD_RESET_TIMEOUT has passed
+LINK_TOKEN_ACCEPT_LEGACY = True
+# Repeated reset requests for one address within the window send no more mail
+PASSWORD_RESET_COALESCE_WINDOW = 60  # seconds
+PASSWORD_RESET_COALESCE_CACHE = 'default'
+
+
+# Signed API tokens (accounts.api_auth)
+API_ACCESS_TOKEN_LIFETIME = 300  # seconds
+API_REFRESH_TOKEN_LIFETIME = 7 * 24 * 3600  # seconds
+API_TOKEN_REVOCATION_CACHE = 'default'
+
+
+# Account lockout (accounts.throttling)
+
+LOGIN_THROTTLE_CACHE = 'default'
+MAX_FAILED_ATTEMPTS = 5  # per username
+MAX_FAILED_ATTEMPTS_PER_IP = 50
+LOCKOUT_TIME = 15  # minutes, length of the sliding window
+
+
+# Warm each worker up before it serves its first request (accounts.warmup):
+# URL resolver, templates, hashers and hashing pool, DB and cache connections
+WARMUP_ON_STARTUP = False
+
+
+# Token-bucket limits per URL name (accounts.rate_limit): (requests, seconds)
+# per client IP and across all clients. RATE_LIMIT_CACHE must be shared
+# between processes; each process also keeps up to RATE_LIMIT_LOCAL_MAX_KEYS
+# buckets locally.
+RATE_LIMITS = {
+    'register': {'ip': (5, 60), 'global': (100, 60), 'methods': ('POST',)},
+    'aregister': {'ip': (5, 60), 'global': (100, 60), 'methods': ('POST',)},
+    'activate': {'ip': (20, 60)},
+    'aactivate': {'ip': (20, 60)},
+    'login': {'ip': (30, 60), 'global': (1000, 60), 'methods': ('POST',)},
+    'alogin': {'ip': (30, 60), 'global': (1000, 60), 'methods': ('POST',)},
+    'password_reset': {'ip': (5, 60), 'global': (100, 60), 'methods': ('POST',)},
+    'password_reset_confirm': {'ip': (20, 60)},
+    'api_token': {'ip': (30, 60), 'global': (1000, 60)},
+    'api_token_refresh': {'ip': (60, 60)},
+}
+RATE_LIMIT_CACHE = 'default'
+RATE_LIMIT_LOCAL_MAX_KEYS = 10000
+
+
+# Login audit log (accounts.login_audit): events and last_login updates are
+# buffered per process and written in batches
+LOGIN_AUDIT_FLUSH_INTERVAL = 1.0  # seconds; None flushes only when a batch fills
+LOGIN_AUDIT_BATCH_SIZE = 500
+LOGIN_AUDIT_MAX_PENDING = 10000  # events kept while the database is unavailable
+LOGIN_AUDIT_RETENTION_DAYS = 90  # `manage.py prune_login_events`
+LOGIN_AUDIT_PARTITIONS_AHEAD = 2  # monthly partitions created ahead (PostgreSQL)
+
+
+# Registrations never activated within this many days are removed by
+# `manage.py purge_inactive_users`
+INACTIVE_ACCOUNT_MAX_AGE_DAYS = 7
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
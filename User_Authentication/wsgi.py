@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'User_Authentication.settings')
 
 application = get_wsgi_application()
+
+# Preload templates, hashers and connections before serving (WARMUP_ON_STARTUP).
+# Imported here because accounts needs the app registry the handler sets up.
+from accounts.warmup import warm_up_if_enabled  # pylint: disable=wrong-import-position
+
+warm_up_if_enabled()
@@ -1,11 +1,47 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import User
+from .search import estimated_user_count, search_users
+
+AFTER_VAR = 'after'
+
+
+class KeysetChangeList(ChangeList):
+    """Pages by the last email shown instead of OFFSET, and never runs COUNT(*)."""
+
+    def get_results(self, request):
+        after = getattr(request, 'keyset_after', None)
+        queryset = self.queryset
+        descending = (queryset.query.order_by or ('email',))[0].startswith('-')
+        if after:
+            queryset = queryset.filter(**{'email__lt' if descending else 'email__gt': after})
+        rows = list(queryset[:self.list_per_page + 1])
+        self.result_list = rows[:self.list_per_page]
+        self.result_count = len(self.result_list)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.next_url = None
+        if len(rows) > self.list_per_page:
+            self.next_url = self.get_query_string({AFTER_VAR: self.result_list[-1].email})
+        self.first_url = self.get_query_string() if after else None
+        self.estimated_count = estimated_user_count(queryset.db)
+
 
 class UserAdmin(BaseUserAdmin):
     ordering = ['email']
     list_display = ['email', 'username', 'is_staff', 'is_active']
+    # Without 'groups': filtering across the m2m forces a DISTINCT over the whole table
+    list_filter = ['is_staff', 'is_superuser', 'is_active']
     search_fields = ['email', 'username']
+    search_help_text = 'Matches email or username; terms shorter than 3 characters match prefixes.'
+    # Keyset pagination needs a unique sort key
+    sortable_by = ['email']
+    show_full_result_count = False
     fieldsets = (
         (None, {'fields': ('email', 'username', 'password')}),
         ('Permissions', {'fields': ('is_staff', 'is_active', 'is_superuser', 'groups', 'user_permissions')}),
@@ -16,4 +52,17 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
-admin.site.register(User, UserAdmin)
\ No newline at end of file
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # The cursor isn't a field filter, so keep it out of the changelist's params
+        if AFTER_VAR in request.GET:
+            request.GET = request.GET.copy()
+            request.keyset_after = request.GET.pop(AFTER_VAR)[-1]
+        return super().changelist_view(request, extra_context)
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_users(queryset, search_term), False
+
+admin.site.register(User, UserAdmin)
@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    from .search import install_sqlite_fts  # pylint: disable=import-outside-toplevel
+
+    install_sqlite_fts(using)
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # Imported for their signal receivers
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        from . import identifier_filter, instrumentation, login_audit, permission_cache, user_cache
+
+        # last_login is written in batches by accounts.login_audit instead
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+
+        post_migrate.connect(install_search_index, sender=self)
@@ -1,19 +1,130 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
-from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.contrib.auth import get_user_model, load_backend, login
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS
+from django.views.decorators.debug import sensitive_variables
+
+from . import db_router, hashing, identifier_filter, permission_cache
+from .models import normalize_identifier
+from .user_cache import get_cached_user
 
 UserModel = get_user_model()
 
+
+def _get_by_identifier(identifier):
+    try:
+        user = UserModel.objects.get_by_identifier(identifier)
+        if user.is_active or not db_router.reads_from_replica():
+            return user
+    except UserModel.DoesNotExist:
+        if not db_router.reads_from_replica():
+            raise
+    # The replica may not have this registration or activation yet
+    return UserModel.objects.db_manager(DEFAULT_DB_ALIAS).get_by_identifier(identifier)
+
+
+async def _aget_by_identifier(identifier):
+    try:
+        user = await UserModel.objects.aget_by_identifier(identifier)
+        if user.is_active or not db_router.reads_from_replica():
+            return user
+    except UserModel.DoesNotExist:
+        if not db_router.reads_from_replica():
+            raise
+    return await UserModel.objects.db_manager(DEFAULT_DB_ALIAS).aget_by_identifier(identifier)
+
+
 class EmailOrUsernameModelBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None:
             username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
         try:
-            # Authenticate with email or username
-            user = UserModel.objects.get(Q(username__iexact=username) | Q(email__iexact=username))
+            # Identifiers the filter has never seen skip the query
+            if not identifier_filter.might_exist(normalize_identifier(username)):
+                raise UserModel.DoesNotExist
+            # Authenticate with email or username via the indexed lower-case
+            # columns, on a replica when inside a routed request
+            user = _get_by_identifier(username)
         except UserModel.DoesNotExist:
+            # Run the hasher once so unknown identifiers take as long as wrong passwords
+            UserModel().set_password(password)
             return None
         else:
             if user.check_password(password) and self.user_can_authenticate(user):
                 return user
         return None
+
+    def get_user(self, user_id):
+        # Served from the user cache; invalidated on every save so password
+        # and is_active changes take effect on the next request
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    def _get_permissions(self, user_obj, obj, from_name):
+        # ModelBackend runs the permission joins once per user instance;
+        # permission_cache keeps the result across requests
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        perm_cache_name = '_%s_perm_cache' % from_name
+        if not hasattr(user_obj, perm_cache_name):
+            user_perms, group_perms = permission_cache.get_permissions(user_obj)
+            user_obj._user_perm_cache = set(user_perms)
+            user_obj._group_perm_cache = set(group_perms)
+        return getattr(user_obj, perm_cache_name)
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            if not await sync_to_async(identifier_filter.might_exist)(normalize_identifier(username)):
+                raise UserModel.DoesNotExist
+            user = await _aget_by_identifier(username)
+        except UserModel.DoesNotExist:
+            await hashing.amake_password(password)
+            return None
+        if await user.acheck_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+# Django 4.2 ships no async counterparts of authenticate()/login(); these mirror
+# the ones added in Django 5.0 so the async views can be ported without changes.
+
+@sensitive_variables('credentials')
+async def aauthenticate(request=None, **credentials):
+    for backend_path in settings.AUTHENTICATION_BACKENDS:
+        backend = load_backend(backend_path)
+        authenticate = getattr(backend, 'aauthenticate', None)
+        if authenticate is None:
+            authenticate = sync_to_async(backend.authenticate)
+        try:
+            inspect.signature(backend.authenticate).bind(request, **credentials)
+        except TypeError:
+            # This backend doesn't accept these credentials
+            continue
+        try:
+            user = await authenticate(request, **credentials)
+        except PermissionDenied:
+            # This backend says this user should not be allowed in at all
+            break
+        if user is None:
+            continue
+        user.backend = backend_path
+        return user
+    await sync_to_async(user_login_failed.send)(
+        sender=__name__, credentials={'username': credentials.get('username')}, request=request
+    )
+    return None
+
+
+async def alogin(request, user, backend=None):
+    await sync_to_async(login)(request, user, backend)
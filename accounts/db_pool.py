@@ -0,0 +1,171 @@
+"""
+Process-wide database connection pool for the accounts.db_backends engines.
+
+Django keeps one connection per thread. Under ASGI every request runs on a
+fresh thread, so persistent connections (CONN_MAX_AGE) are opened per request
+and never reused. The pooled engines instead take a raw connection from a
+pool shared by all threads of the process when a thread first queries, and
+hand it back when Django closes the connection at the end of the request.
+
+Configure per alias with ``'POOL': {'MAX_SIZE': 20, 'TIMEOUT': 5}``. A
+checkout waits up to TIMEOUT seconds for a free connection and then raises
+PoolTimeout. With CONN_HEALTH_CHECKS idle connections are checked before
+reuse. Pool sizes, waits and timeouts are exported by accounts.instrumentation.
+"""
+import threading
+import time
+
+from django.db import OperationalError
+
+from .instrumentation import registry
+
+DEFAULT_MAX_SIZE = 10
+DEFAULT_TIMEOUT = 5  # seconds
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, alias, max_size=DEFAULT_MAX_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle = []  # Most recently used last, so warm connections are reused first
+        self.size = 0  # Open connections, idle or checked out
+        self.condition = threading.Condition()
+
+    def acquire(self, connect, check=None):
+        """Return an idle connection, or one made by ``connect()`` while below MAX_SIZE."""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while not self.idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    registry.inc('accounts_db_pool_timeouts_total', {'alias': self.alias})
+                    raise PoolTimeout(
+                        f'No connection to {self.alias!r} became free within {self.timeout}s '
+                        f'({self.max_size} in use).'
+                    )
+                self.condition.wait(remaining)
+            conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                self.size += 1
+            self._publish()
+        registry.observe('accounts_db_pool_wait_seconds', {'alias': self.alias}, time.perf_counter() - started)
+
+        if conn is not None and check is not None and not check(conn):
+            # Dead idle connection: replace it within the same slot
+            _close_quietly(conn)
+            registry.inc('accounts_db_pool_discarded_total', {'alias': self.alias})
+            conn = None
+        if conn is None:
+            try:
+                conn = connect()
+            except BaseException:
+                self._forget()
+                raise
+            registry.inc('accounts_db_pool_connects_total', {'alias': self.alias})
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                # Never hand out a connection with an open transaction
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            _close_quietly(conn)
+            registry.inc('accounts_db_pool_discarded_total', {'alias': self.alias})
+            self._forget()
+            return
+        with self.condition:
+            self.idle.append(conn)
+            self.condition.notify()
+            self._publish()
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+            self._publish()
+        for conn in idle:
+            _close_quietly(conn)
+
+    def _forget(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+            self._publish()
+
+    def _publish(self):
+        labels = {'alias': self.alias}
+        registry.set_gauge('accounts_db_pool_connections', dict(labels, state='idle'), len(self.idle))
+        registry.set_gauge('accounts_db_pool_connections', dict(labels, state='in_use'), self.size - len(self.idle))
+        registry.set_gauge('accounts_db_pool_max_size', labels, self.max_size)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                options = settings_dict.get('POOL') or {}
+                pool = _pools[alias] = ConnectionPool(
+                    alias,
+                    max_size=options.get('MAX_SIZE', DEFAULT_MAX_SIZE),
+                    timeout=options.get('TIMEOUT', DEFAULT_TIMEOUT),
+                )
+    return pool
+
+
+class PooledDatabaseWrapperMixin:
+    """Mixed into a backend's DatabaseWrapper to draw connections from the pool."""
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        check = self._is_usable_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        return self.pool.acquire(lambda: connect(conn_params), check)
+
+    def connect(self):
+        super().connect()
+        # Obsolete straight away: close_old_connections() hands it back to
+        # the pool when the request finishes
+        self.close_at = time.monotonic()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Closed inside an atomic block, Django may still touch the
+                # connection afterwards; don't let another thread have it
+                self.pool.release(self.connection, discard=self.in_atomic_block)
+
+    def _is_usable_connection(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
@@ -0,0 +1,144 @@
+"""
+Primary/replica routing for request-time reads.
+
+Inside a request handled by ReplicaRoutingMiddleware, reads go to one of the
+DATABASE_REPLICAS and writes to the primary (``default``). A request is
+pinned to the primary once it writes, and the client keeps reading from the
+primary for REPLICA_LAG_SECONDS afterwards (a signed cookie), so it always
+sees its own registration, activation, login or profile change. Views that
+validate against data they are about to change are wrapped in use_primary.
+
+Outside requests (management commands, workers, shells) everything uses the
+primary.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'primary_pin'
+PIN_SALT = 'accounts.db_router.pin'
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Mutated in place rather than re-set, so pins made in a sync_to_async
+# thread are seen by the rest of the request
+_state = ContextVar('accounts_db_routing', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def lag_seconds():
+    return getattr(settings, 'REPLICA_LAG_SECONDS', 10)
+
+
+def reads_from_replica():
+    """Whether a read issued now would be routed to a replica."""
+    state = _state.get()
+    return state is not None and not state.pinned and bool(replicas())
+
+
+def may_lag(changed_at):
+    # Replicas are trusted only with changes older than the lag budget
+    return bool(replicas()) and time.time() - changed_at < lag_seconds()
+
+
+def pin_to_primary():
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def use_primary(view):
+    """Serve every query of this view from the primary."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            pin_to_primary()
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            pin_to_primary()
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reads_from_replica():
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related lookups follow the database the instance came from
+            return instance._state.db
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Read-your-writes for the rest of this request and, through the
+            # pin cookie, for the client's next requests
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        if not replicas():
+            return None, None
+        pinned = request.get_signed_cookie(PIN_COOKIE, default=None, salt=PIN_SALT, max_age=lag_seconds())
+        state = RoutingState(pinned=pinned is not None)
+        return state, _state.set(state)
+
+    def _pin(self, response, state):
+        if state is not None and state.wrote:
+            response.set_signed_cookie(
+                PIN_COOKIE, '1', salt=PIN_SALT, max_age=lag_seconds(), httponly=True, samesite='Lax'
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _state.reset(token)
+        return self._pin(response, state)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _state.reset(token)
+        return self._pin(response, state)
@@ -0,0 +1,45 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+
+UserModel = get_user_model()
+
+# Never export password hashes
+EXPORT_FIELDS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser', 'last_login')
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    # csv.writer needs a file-like object; returning the line lets us yield it
+    def write(self, value):
+        return value
+
+
+def iter_user_rows(chunk_size=2000):
+    # values_list + iterator() keeps memory flat: no model instances, no result cache,
+    # and a server-side cursor on databases that support it
+    return UserModel.objects.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        record = dict(zip(EXPORT_FIELDS, row))
+        if record['last_login'] is not None:
+            record['last_login'] = record['last_login'].isoformat()
+        yield json.dumps(record) + '\n'
+
+
+def stream_users(fmt='csv', chunk_size=2000):
+    rows = iter_user_rows(chunk_size)
+    return iter_csv(rows) if fmt == 'csv' else iter_jsonl(rows)
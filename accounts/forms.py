@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from .auth_backend import aauthenticate
 from .models import User
 
 class CustomUserCreationForm(UserCreationForm):
@@ -13,6 +14,24 @@ class CustomUserCreationForm(UserCreationForm):
 class CustomAuthenticationForm(AuthenticationForm):
     username = forms.CharField(label='Email or Username')
 
+    async def ais_valid(self):
+        # Authenticate up front with the async backends so clean() doesn't hit the DB
+        username = (self.data.get('username') or '').strip()
+        password = self.data.get('password')
+        if username and password:
+            self.user_cache = await aauthenticate(self.request, username=username, password=password)
+        self._credentials_checked = True
+        return self.is_valid()
+
+    def clean(self):
+        if not getattr(self, '_credentials_checked', False):
+            return super().clean()
+        if self.cleaned_data.get('username') and self.cleaned_data.get('password'):
+            if self.user_cache is None:
+                raise self.get_invalid_login_error()
+            self.confirm_login_allowed(self.user_cache)
+        return self.cleaned_data
+
 class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         model = User
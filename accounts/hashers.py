@@ -0,0 +1,125 @@
+"""
+Password hashers whose cost parameters come from settings.
+
+PASSWORD_HASHER_PARAMS holds the parameters per algorithm, normally as
+printed by `manage.py calibrate_hashers`. Hashes keep the stock 'scrypt' and
+'argon2' formats, so they stay readable by Django's own hashers, and any
+stored hash made with other parameters is upgraded on the next successful
+login (must_update, acted on by accounts.hashing).
+"""
+import base64
+import hashlib
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class CalibratedHasherMixin:
+    defaults = {}
+
+    def __init__(self, **params):
+        self._params = params
+
+    def _param(self, name):
+        if name in self._params:
+            return self._params[name]
+        configured = getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(self.algorithm, {})
+        return configured.get(name, self.defaults[name])
+
+    def current_params(self):
+        return {name: self._param(name) for name in self.defaults}
+
+    def frozen(self):
+        """A copy with the current parameters fixed, for hashing in another process."""
+        return type(self)(**self.current_params())
+
+
+class CalibratedScryptPasswordHasher(CalibratedHasherMixin, ScryptPasswordHasher):
+    defaults = {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1}
+
+    work_factor = property(lambda self: self._param('work_factor'))
+    block_size = property(lambda self: self._param('block_size'))
+    parallelism = property(lambda self: self._param('parallelism'))
+
+    @staticmethod
+    def memory(n, r, p):
+        return 128 * n * r * p
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            # OpenSSL refuses more than 32 MiB unless told otherwise
+            maxmem=2 * self.memory(n, r, p),
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+
+class CalibratedArgon2PasswordHasher(CalibratedHasherMixin, Argon2PasswordHasher):
+    # Needs argon2-cffi
+    defaults = {'time_cost': 2, 'memory_cost': 65536, 'parallelism': 1}
+
+    time_cost = property(lambda self: self._param('time_cost'))
+    memory_cost = property(lambda self: self._param('memory_cost'))  # KiB
+    parallelism = property(lambda self: self._param('parallelism'))
+
+
+def argon2_available():
+    try:
+        import argon2  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        return False
+    return True
+
+
+def median_latency(hasher, samples=5):
+    salt = hasher.salt()
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.encode('calibration-password', salt)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate_scrypt(target, block_size=8, parallelism=1, samples=5, max_log2=20):
+    """Largest power-of-two work factor whose median hash time fits ``target`` seconds."""
+    chosen = None
+    for log2 in range(12, max_log2 + 1):
+        hasher = CalibratedScryptPasswordHasher(
+            work_factor=2 ** log2, block_size=block_size, parallelism=parallelism
+        )
+        latency = median_latency(hasher, samples)
+        if latency > target and chosen is not None:
+            break
+        chosen = (hasher.current_params(), latency)
+        if latency > target:
+            break
+    return chosen
+
+
+def calibrate_argon2(target, memory_cost=65536, parallelism=1, samples=5, max_time_cost=20):
+    """Largest time cost at ``memory_cost`` KiB whose median hash time fits ``target`` seconds."""
+    chosen = None
+    for time_cost in range(1, max_time_cost + 1):
+        hasher = CalibratedArgon2PasswordHasher(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+        )
+        latency = median_latency(hasher, samples)
+        if latency > target and chosen is not None:
+            break
+        chosen = (hasher.current_params(), latency)
+        if latency > target:
+            break
+    return chosen
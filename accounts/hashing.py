@@ -0,0 +1,188 @@
+import asyncio
+import atexit
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from . import instrumentation
+
+
+class HashingPoolFull(Exception):
+    """Raised when the hashing pool's queue is full; surfaced as a 503."""
+
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _worker_init():
+    # Spawned workers start from a clean interpreter; DJANGO_SETTINGS_MODULE is inherited
+    import django
+    django.setup()
+
+
+def _check(password, encoded):
+    return hashers.check_password(password, encoded)
+
+
+def _preferred_hasher():
+    # Calibrated hashers read their parameters from settings; pin the current
+    # ones so workers spawned with older settings hash with them too
+    hasher = hashers.get_hasher('default')
+    return hasher.frozen() if hasattr(hasher, 'frozen') else hasher
+
+
+def _must_update(encoded):
+    # Decided here rather than in the worker, whose settings were frozen when
+    # it was spawned, so parameter changes apply without restarting the pool
+    preferred = hashers.get_hasher('default')
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def create_pool(size):
+    return ProcessPoolExecutor(
+        max_workers=size,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_worker_init,
+    )
+
+
+def _get_executor():
+    global _executor, _slots
+    pool_size = getattr(settings, 'PASSWORD_HASHING_POOL_SIZE', 0)
+    if not pool_size:
+        return None
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                queue_limit = getattr(settings, 'PASSWORD_HASHING_QUEUE_LIMIT', None)
+                if queue_limit is None:
+                    queue_limit = pool_size * 8
+                _slots = threading.BoundedSemaphore(pool_size + queue_limit)
+                _executor = create_pool(pool_size)
+    return _executor
+
+
+def _submit(fn, *args):
+    executor = _get_executor()
+    if executor is None:
+        return None
+    if not _slots.acquire(blocking=False):
+        raise HashingPoolFull()
+    try:
+        future = executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda f: _slots.release())
+    return future
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(shutdown)
+
+
+def _ping():
+    return None
+
+
+def warm_up():
+    """Start every pool worker now instead of on the first logins; returns the number started."""
+    executor = _get_executor()
+    if executor is None:
+        return 0
+    # Spawned pools start a worker per submit while none is idle, so submit
+    # one task per worker before waiting on any
+    futures = [executor.submit(_ping) for _ in range(settings.PASSWORD_HASHING_POOL_SIZE)]
+    for future in futures:
+        future.result()
+    return len(futures)
+
+
+def make_password(password):
+    with instrumentation.timed('hashing'):
+        return _make_password(password)
+
+
+def _make_password(password):
+    if password is None:
+        return hashers.make_password(password)
+    future = _submit(hashers.make_password, password, None, _preferred_hasher())
+    if future is None:
+        return hashers.make_password(password)
+    return future.result()
+
+
+def check_password(password, encoded, setter=None):
+    with instrumentation.timed('hashing'):
+        return _check_password(password, encoded, setter)
+
+
+def _check_password(password, encoded, setter=None):
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    future = _submit(_check, password, encoded)
+    if future is None:
+        return hashers.check_password(password, encoded, setter)
+    is_correct = future.result()
+    if is_correct and setter and _must_update(encoded):
+        setter(password)
+    return is_correct
+
+
+async def amake_password(password):
+    started = time.perf_counter()
+    try:
+        return await _amake_password(password)
+    finally:
+        instrumentation.observe('hashing', time.perf_counter() - started)
+
+
+async def _amake_password(password):
+    if password is None:
+        return hashers.make_password(password)
+    future = _submit(hashers.make_password, password, None, _preferred_hasher())
+    if future is None:
+        return await sync_to_async(hashers.make_password)(password)
+    return await asyncio.wrap_future(future)
+
+
+async def acheck_password(password, encoded, setter=None):
+    started = time.perf_counter()
+    try:
+        return await _acheck_password(password, encoded, setter)
+    finally:
+        instrumentation.observe('hashing', time.perf_counter() - started)
+
+
+async def _acheck_password(password, encoded, setter=None):
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    future = _submit(_check, password, encoded)
+    if future is None:
+        updated = []
+        is_correct = await sync_to_async(hashers.check_password)(password, encoded, updated.append)
+        must_update = bool(updated)
+    else:
+        is_correct = await asyncio.wrap_future(future)
+        must_update = is_correct and _must_update(encoded)
+    if is_correct and must_update and setter:
+        await setter(password)
+    return is_correct
@@ -0,0 +1,242 @@
+"""
+In-memory Bloom filter over normalized usernames and emails.
+
+authenticate() consults might_exist() before querying: an identifier the
+filter has never seen cannot belong to a user, so the lookup is skipped
+(and a dummy hash is run instead, see EmailOrUsernameModelBackend).
+
+A Bloom filter never forgets, so false negatives are the only thing to
+guard against:
+
+* users saved in this process are added through post_save, and bulk
+  inserts and updates (import_users, backfill_lookup_fields) call
+  add_users(); other QuerySet.update() calls that change identifiers must
+  call add() themselves;
+* users saved in other processes are found through short-lived "recent"
+  markers in the shared cache, checked before reporting a miss;
+* the filter is rebuilt from the database in a background thread every
+  IDENTIFIER_FILTER_REBUILD_INTERVAL seconds (which also drops deleted
+  users), and is not trusted once it is older than the recent markers.
+
+Rebuilds write IDENTIFIER_FILTER_SNAPSHOT, which new workers load instead of
+scanning the table (`manage.py build_identifier_filter` writes one too).
+"""
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.db.models import Max
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .instrumentation import get_cache
+
+logger = logging.getLogger(__name__)
+
+UserModel = get_user_model()
+
+MAGIC = b'IDBF1'
+HEADER = struct.Struct('<5sQIdQ')  # magic, bits, hashes, built_at, max_pk
+
+
+class BloomFilter:
+    def __init__(self, size, hashes, bits=None):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        capacity = max(capacity, 1)
+        size = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hashes = max(1, round(size / capacity * math.log(2)))
+        return cls(size, hashes)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filter = None
+        self.built_at = 0.0
+        self.max_pk = 0
+        self.rebuilding = False
+
+
+_state = _State()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _recent_key(identifier):
+    return 'idfilter:recent:' + hashlib.blake2b(identifier.encode(), digest_size=16).hexdigest()
+
+
+def _identifiers(queryset):
+    for username_lower, email_lower in queryset.values_list('username_lower', 'email_lower').iterator(chunk_size=5000):
+        if username_lower:
+            yield username_lower
+        if email_lower:
+            yield email_lower
+
+
+def build():
+    """Build a filter from the users table; returns ``(filter, built_at, max_pk)``."""
+    built_at = time.time()
+    users = UserModel._default_manager.all()
+    max_pk = users.aggregate(last=Max('pk'))['last'] or 0
+    # Two identifiers per user, with as much headroom again for registrations
+    # before the next rebuild
+    capacity = max(4 * users.count(), _setting('IDENTIFIER_FILTER_CAPACITY', 100000))
+    bloom = BloomFilter.for_capacity(capacity, _setting('IDENTIFIER_FILTER_ERROR_RATE', 0.01))
+    for identifier in _identifiers(users.filter(pk__lte=max_pk)):
+        bloom.add(identifier)
+    return bloom, built_at, max_pk
+
+
+def write_snapshot(path, bloom, built_at, max_pk):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as stream:
+        stream.write(HEADER.pack(MAGIC, bloom.size, bloom.hashes, built_at, max_pk))
+        stream.write(bloom.bits)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path):
+    with open(path, 'rb') as stream:
+        magic, size, hashes, built_at, max_pk = HEADER.unpack(stream.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an identifier filter snapshot')
+        bits = bytearray(stream.read())
+    if len(bits) != (size + 7) // 8:
+        raise ValueError(f'{path} is truncated')
+    return BloomFilter(size, hashes, bits), built_at, max_pk
+
+
+def _install(bloom, built_at, max_pk):
+    with _state.lock:
+        _state.filter, _state.built_at, _state.max_pk = bloom, built_at, max_pk
+
+
+def rebuild(write=True):
+    bloom, built_at, max_pk = build()
+    _install(bloom, built_at, max_pk)
+    path = _setting('IDENTIFIER_FILTER_SNAPSHOT', None)
+    if write and path:
+        write_snapshot(path, bloom, built_at, max_pk)
+    return bloom
+
+
+def _rebuild_in_background():
+    with _state.lock:
+        if _state.rebuilding:
+            return
+        _state.rebuilding = True
+
+    def run():
+        try:
+            rebuild()
+        except Exception:
+            logger.exception('Identifier filter rebuild failed')
+        finally:
+            _state.rebuilding = False
+            close_old_connections()
+
+    threading.Thread(target=run, name='identifier-filter', daemon=True).start()
+
+
+def load_snapshot():
+    """Install the snapshot if it is recent enough, catching up on users created since."""
+    path = _setting('IDENTIFIER_FILTER_SNAPSHOT', None)
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        bloom, built_at, max_pk = read_snapshot(path)
+    except (OSError, ValueError, struct.error):
+        logger.exception('Ignoring unreadable identifier filter snapshot')
+        return False
+    if time.time() - built_at >= _setting('IDENTIFIER_FILTER_RECENT_TTL', 86400):
+        return False
+    # Users registered since the snapshot; changes to older users are
+    # covered by the recent markers
+    for identifier in _identifiers(UserModel._default_manager.filter(pk__gt=max_pk)):
+        bloom.add(identifier)
+    _install(bloom, built_at, max_pk)
+    return True
+
+
+def get_filter():
+    """The current filter, or None while there is none recent enough to trust."""
+    if not _setting('IDENTIFIER_FILTER_ENABLED', False):
+        return None
+    if _state.filter is None and not _state.rebuilding:
+        if not load_snapshot():
+            _rebuild_in_background()
+    age = time.time() - _state.built_at
+    if age >= _setting('IDENTIFIER_FILTER_REBUILD_INTERVAL', 3600):
+        _rebuild_in_background()
+    if age >= _setting('IDENTIFIER_FILTER_RECENT_TTL', 86400):
+        return None
+    return _state.filter
+
+
+def might_exist(identifier):
+    bloom = get_filter()
+    if bloom is None or identifier in bloom:
+        return True
+    return get_cache(_setting('IDENTIFIER_FILTER_CACHE', 'default')).get(_recent_key(identifier)) is not None
+
+
+def add(identifiers):
+    bloom = _state.filter
+    if bloom is not None:
+        for identifier in identifiers:
+            bloom.add(identifier)
+    # Other processes don't see this save; the markers cover them until their next rebuild
+    get_cache(_setting('IDENTIFIER_FILTER_CACHE', 'default')).set_many(
+        {_recent_key(identifier): 1 for identifier in identifiers},
+        _setting('IDENTIFIER_FILTER_RECENT_TTL', 86400),
+    )
+
+
+def add_users(users):
+    """Add users written without post_save (bulk_create, bulk_update)."""
+    if not _setting('IDENTIFIER_FILTER_ENABLED', False):
+        return
+    identifiers = [
+        identifier for user in users for identifier in (user.username_lower, user.email_lower) if identifier
+    ]
+    if identifiers:
+        add(identifiers)
+
+
+IDENTIFIER_FIELDS = {'username', 'email', 'username_lower', 'email_lower'}
+
+
+@receiver(post_save, sender=UserModel, dispatch_uid='accounts.identifier_filter.saved')
+def _user_saved(sender, instance, created, update_fields, **kwargs):
+    # Skips the last_login/password updates made on every login
+    if not created and update_fields is not None and not IDENTIFIER_FIELDS & set(update_fields):
+        return
+    add_users([instance])
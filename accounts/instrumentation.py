@@ -0,0 +1,287 @@
+"""
+Per-view request instrumentation exported in Prometheus text format.
+
+InstrumentationMiddleware samples a fraction of requests and, for those,
+collects query/cache/hashing/template/mail counts and times through a
+context variable. DB time comes from a connection execute wrapper,
+template time from InstrumentedDjangoTemplates, cache time from caches
+obtained with get_cache(), and hashing/mail from accounts.hashing and
+accounts.mail.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+KINDS = ('db', 'cache', 'hashing', 'template', 'mail')
+
+_current = ContextVar('accounts_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.seconds = dict.fromkeys(KINDS, 0.0)
+
+
+def observe(kind, seconds=0.0):
+    stats = _current.get()
+    if stats is not None:
+        stats.counts[kind] += 1
+        stats.seconds[kind] += seconds
+
+
+@contextmanager
+def timed(kind):
+    if _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(kind, time.perf_counter() - started)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.sampled = {}
+        self.counters = {}
+        self.histograms = {}
+        self.labelled_histograms = {}
+        self.gauges = {}
+
+    def _histogram(self, key):
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, labels, value):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.labelled_histograms.get(key)
+            if histogram is None:
+                histogram = self.labelled_histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def record_request(self, view, elapsed, stats):
+        with self.lock:
+            self.requests[view] = self.requests.get(view, 0) + 1
+            if stats is None:
+                return
+            self.sampled[view] = self.sampled.get(view, 0) + 1
+            self._histogram((view, 'request')).observe(elapsed)
+            for kind in KINDS:
+                key = ('accounts_' + kind + '_operations_total', (('view', view),))
+                self.counters[key] = self.counters.get(key, 0) + stats.counts[kind]
+                self._histogram((view, kind)).observe(stats.seconds[kind])
+
+    def view_cost(self, view):
+        """Mean seconds and queries of the sampled requests to ``view``; (0, 0) before any."""
+        with self.lock:
+            histogram = self.histograms.get((view, 'request'))
+            if histogram is None or not histogram.count:
+                return 0.0, 0.0
+            queries = self.counters.get(('accounts_db_operations_total', (('view', view),)), 0)
+            return histogram.sum / histogram.count, queries / histogram.count
+
+    def reset(self):
+        with self.lock:
+            self.__init__()
+
+    def render(self):
+        lines = []
+        with self.lock:
+            lines.append('# TYPE accounts_requests_total counter')
+            for view, count in sorted(self.requests.items()):
+                lines.append(f'accounts_requests_total{{view="{view}"}} {count}')
+            lines.append('# TYPE accounts_sampled_requests_total counter')
+            for view, count in sorted(self.sampled.items()):
+                lines.append(f'accounts_sampled_requests_total{{view="{view}"}} {count}')
+            seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in seen:
+                    lines.append(f'# TYPE {name} counter')
+                    seen.add(name)
+                lines.append(f'{name}{{{_labels(labels)}}} {value}')
+            for (name, labels), value in sorted(self.gauges.items()):
+                if name not in seen:
+                    lines.append(f'# TYPE {name} gauge')
+                    seen.add(name)
+                lines.append(f'{name}{{{_labels(labels)}}} {value}')
+            for (view, kind), histogram in sorted(self.histograms.items()):
+                name = f'accounts_{kind}_seconds'
+                if name not in seen:
+                    lines.append(f'# TYPE {name} histogram')
+                    seen.add(name)
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{view="{view}"}} {histogram.count}')
+            for (name, labels), histogram in sorted(self.labelled_histograms.items()):
+                if name not in seen:
+                    lines.append(f'# TYPE {name} histogram')
+                    seen.add(name)
+                label_text = _labels(labels)
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{label_text}}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+registry = Registry()
+
+
+def _db_timer(execute, sql, params, many, context):
+    if _current.get() is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        observe('db', time.perf_counter() - started)
+
+
+@receiver(connection_created, dispatch_uid='accounts.instrumentation.db_timer')
+def _install_db_timer(sender, connection, **kwargs):
+    # Installed on every new connection so ORM calls made from sync_to_async threads are seen too
+    if _db_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_timer)
+
+
+class InstrumentedCache:
+    """Proxy timing every cache call made during a sampled request."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def __getattr__(self, name):
+        attr = getattr(self._cache, name)
+        if not callable(attr):
+            return attr
+        if iscoroutinefunction(attr):
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    observe('cache', time.perf_counter() - started)
+            return timed_async
+
+        def timed_call(*args, **kwargs):
+            with timed('cache'):
+                return attr(*args, **kwargs)
+        return timed_call
+
+    def __contains__(self, key):
+        # Dunder lookups bypass __getattr__
+        return self.has_key(key)
+
+
+def get_cache(alias):
+    return InstrumentedCache(caches[alias])
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+        self.origin = template.origin
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.1)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        if random.random() >= self.sample_rate:
+            return None, None
+        stats = RequestStats()
+        return stats, _current.set(stats)
+
+    def _finish(self, request, started, stats, token):
+        if token is not None:
+            _current.reset(token)
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match is not None and match.url_name else 'unresolved'
+        if getattr(request, 'rate_limited', False):
+            # Refused requests would drag down the view's sampled cost
+            stats = None
+        registry.record_request(view, time.perf_counter() - started, stats)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats, token = self._start()
+        try:
+            return self.get_response(request)
+        finally:
+            self._finish(request, started, stats, token)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        stats, token = self._start()
+        try:
+            return await self.get_response(request)
+        finally:
+            self._finish(request, started, stats, token)
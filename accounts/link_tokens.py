@@ -0,0 +1,132 @@
+"""
+Signed tokens for activation and password-reset links.
+
+A token is a django.core.signing payload holding the user id, an expiry and
+a fingerprint of the user state the link may change (password hash,
+is_active, email), signed with a per-purpose salt. verify() rejects
+tampered, expired, wrong-purpose and already-used tokens without a query.
+Only a token that passes is matched against the user row: after the
+activation or password change the fingerprint no longer matches. Unlike
+Django's token it leaves out last_login, which accounts.login_audit writes
+in batches: a link mailed right after a login would otherwise be built from
+the stale value and stop working once the batch lands.
+
+Used tokens are recorded in LINK_TOKEN_CACHE until they expire, so replays
+are also rejected without a query.
+
+Links sent before these tokens existed carry django.contrib.auth's
+default_token_generator tokens. While LINK_TOKEN_ACCEPT_LEGACY is set they
+are still accepted (checked against the user row, as before) and are
+one-shot too. Turn it off once PASSWORD_RESET_TIMEOUT has passed since
+deploying.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .instrumentation import get_cache
+
+SALT = 'accounts.link_tokens'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _used():
+    return get_cache(getattr(settings, 'LINK_TOKEN_CACHE', 'default'))
+
+
+def _used_key(token):
+    # Tokens run longer than memcached's key limit
+    return 'linktoken:used:' + hashlib.sha256(token.encode()).hexdigest()
+
+
+class _LegacyToken:
+    """Stands in for the fingerprint of a default_token_generator token, which needs the user to check."""
+
+    def __init__(self, token):
+        self.token = token
+
+
+# default_token_generator's "<base36 timestamp>-<hash>"; signed tokens contain ':'
+LEGACY_TOKEN = re.compile(r'^[0-9a-z]{1,13}-[0-9a-f]{32}$')
+
+
+def _is_legacy(token):
+    return getattr(settings, 'LINK_TOKEN_ACCEPT_LEGACY', False) and LEGACY_TOKEN.match(token) is not None
+
+
+class LinkTokenGenerator:
+    """Drop-in for PasswordTokenGenerator (make_token/check_token) plus verify/consume."""
+
+    def __init__(self, purpose, lifetime_setting, default_lifetime):
+        self.purpose = purpose
+        self.salt = f'{SALT}.{purpose}'
+        self.lifetime_setting = lifetime_setting
+        self.default_lifetime = default_lifetime
+
+    @property
+    def lifetime(self):
+        return getattr(settings, self.lifetime_setting, self.default_lifetime)
+
+    def fingerprint(self, user):
+        state = f'{user.pk}{user.password}{user.is_active}{user.email}'
+        return salted_hmac(self.salt, state, algorithm='sha256').hexdigest()[:20]
+
+    def make_token(self, user):
+        return signing.dumps([user.pk, int(time.time() + self.lifetime), self.fingerprint(user)], salt=self.salt)
+
+    def verify(self, token):
+        """Return ``(user_pk, fingerprint)`` for a token that may still be valid; no DB access.
+
+        For a legacy token ``user_pk`` is None: only the user row can tell.
+        """
+        if _is_legacy(token):
+            if _used().get(_used_key(token)):
+                raise InvalidToken('Link already used.')
+            return None, _LegacyToken(token)
+        try:
+            user_pk, expires, fingerprint = signing.loads(token, salt=self.salt)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidToken('Invalid link.')
+        if expires <= time.time():
+            raise InvalidToken('Link expired.')
+        if _used().get(_used_key(token)):
+            raise InvalidToken('Link already used.')
+        return user_pk, fingerprint
+
+    def matches(self, user, fingerprint):
+        if isinstance(fingerprint, _LegacyToken):
+            return default_token_generator.check_token(user, fingerprint.token)
+        return constant_time_compare(self.fingerprint(user), fingerprint)
+
+    def check_token(self, user, token):
+        if user is None or not token:
+            return False
+        try:
+            user_pk, fingerprint = self.verify(token)
+        except InvalidToken:
+            return False
+        return (user_pk is None or str(user_pk) == str(user.pk)) and self.matches(user, fingerprint)
+
+    def consume(self, token):
+        """Mark a token used; False if it already was. add() makes this one-shot."""
+        if _is_legacy(token):
+            expires = time.time() + settings.PASSWORD_RESET_TIMEOUT
+        else:
+            try:
+                _, expires, _ = signing.loads(token, salt=self.salt)
+            except (signing.BadSignature, TypeError, ValueError):
+                return False
+        ttl = max(1, int(expires - time.time()) + 1)
+        return _used().add(_used_key(token), 1, ttl)
+
+
+activation_token = LinkTokenGenerator('activation', 'ACTIVATION_TOKEN_LIFETIME', 3 * 24 * 3600)
+password_reset_token = LinkTokenGenerator('password_reset', 'PASSWORD_RESET_TIMEOUT', 3 * 24 * 3600)
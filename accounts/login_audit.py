@@ -0,0 +1,302 @@
+"""
+Login audit log with write-behind persistence.
+
+Successful, failed and locked-out logins are buffered in-process as
+LoginEvent rows and written with one bulk_create per batch by a background
+thread, as accounts.session_backend does for sessions. The last_login update
+Django makes on every login is folded into the same batch: the
+user_logged_in receiver sets it on the instance and queues it, and a flush
+writes the newest time per user with one bulk_update.
+
+A batch is written every LOGIN_AUDIT_FLUSH_INTERVAL seconds, or as soon as
+LOGIN_AUDIT_BATCH_SIZE events are queued. While the database is unavailable
+up to LOGIN_AUDIT_MAX_PENDING events are kept; older ones are dropped and
+counted in accounts_login_events_dropped_total.
+
+On PostgreSQL accounts_loginevent is range-partitioned by month (migration
+0007). ensure_partitions() creates the coming months and prune() drops whole
+partitions older than LOGIN_AUDIT_RETENTION_DAYS; both run from
+`manage.py prune_login_events`, never from the writer, so a role without
+CREATE or a failing partition never holds up the audit log or last_login.
+Months without a partition go to the default partition. Elsewhere prune()
+deletes in bounded batches through the created_at index.
+"""
+import atexit
+import logging
+import re
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.db import DatabaseError, close_old_connections, connections, router, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import user_cache
+from .instrumentation import registry
+from .models import LoginEvent, normalize_identifier
+from .throttling import client_ip
+
+logger = logging.getLogger(__name__)
+
+UserModel = get_user_model()
+
+TABLE = LoginEvent._meta.db_table
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def _add_months(day, months):
+    years, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + years, month + 1, 1)
+
+
+def ensure_partitions(months_ahead=None, using=None):
+    """Create this month's and the next months' partitions; PostgreSQL only. Returns the ones present."""
+    using = using or router.db_for_write(LoginEvent)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return []
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'LOGIN_AUDIT_PARTITIONS_AHEAD', 2)
+    this_month = timezone.now().date().replace(day=1)
+    names = []
+    for offset in range(months_ahead + 1):
+        lower, upper = _add_months(this_month, offset), _add_months(this_month, offset + 1)
+        name = f'{TABLE}_p{lower:%Y%m}'
+        try:
+            with transaction.atomic(using=using), connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                )
+        except DatabaseError:
+            # E.g. the default partition already holds rows for that month;
+            # they stay there and are pruned row by row
+            logger.exception('Could not create login event partition %s', name)
+            continue
+        names.append(name)
+    return names
+
+
+def _partitions(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON pg_inherits.inhparent = parent.oid '
+            'JOIN pg_class child ON pg_inherits.inhrelid = child.oid '
+            'WHERE parent.relname = %s',
+            [TABLE],
+        )
+        return [name for (name,) in cursor.fetchall()]
+
+
+def prune(before=None, using=None, batch_size=1000):
+    """Remove events older than ``before``; returns ``(partitions_dropped, rows_deleted)``."""
+    if before is None:
+        before = timezone.now() - timedelta(days=getattr(settings, 'LOGIN_AUDIT_RETENTION_DAYS', 90))
+    using = using or router.db_for_write(LoginEvent)
+    connection = connections[using]
+    dropped = 0
+    if connection.vendor == 'postgresql':
+        for name in _partitions(connection):
+            match = PARTITION_NAME.match(name)
+            if match is None:
+                continue  # The default partition
+            upper = _add_months(date(int(match[1]), int(match[2]), 1), 1)
+            if datetime(upper.year, upper.month, 1, tzinfo=dt_timezone.utc) <= before:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE {name}')
+                dropped += 1
+    # What is left: rows in the month the cutoff falls in, in the default
+    # partition, or in the whole table on other databases
+    deleted = 0
+    events = LoginEvent.objects.using(using)
+    while True:
+        ids = list(events.filter(created_at__lt=before).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return dropped, deleted
+        deleted += events.filter(pk__in=ids).delete()[0]
+
+
+class LoginAuditWriter:
+    """Buffers login events and last_login times and persists them in batches."""
+
+    def __init__(self):
+        self._events = []
+        self._last_login = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def interval(self):
+        # None disables the background thread; events are then flushed inline
+        # whenever the batch fills up, or by calling flush()
+        return getattr(settings, 'LOGIN_AUDIT_FLUSH_INTERVAL', 1.0)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'LOGIN_AUDIT_BATCH_SIZE', 500)
+
+    def record(self, event, last_login=None):
+        """Queue a LoginEvent, and optionally ``(user_id, when)`` to store as last_login."""
+        max_pending = getattr(settings, 'LOGIN_AUDIT_MAX_PENDING', 10000)
+        with self._lock:
+            self._events.append(event)
+            dropped = len(self._events) - max_pending
+            if dropped > 0:
+                del self._events[:dropped]
+            if last_login is not None:
+                user_id, when = last_login
+                self._last_login[user_id] = max(when, self._last_login.get(user_id, when))
+            size = len(self._events)
+        registry.inc('accounts_login_events_total', {'outcome': event.outcome})
+        if dropped > 0:
+            registry.inc('accounts_login_events_dropped_total', {'reason': 'backlog'}, dropped)
+        if self.interval is None:
+            if size >= self.batch_size:
+                self.flush()
+            return
+        self._ensure_thread()
+        if size >= self.batch_size:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return list(self._events)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+                last_logins, self._last_login = self._last_login, {}
+            if not events and not last_logins:
+                return 0
+            try:
+                self._write(events, last_logins)
+            except Exception:
+                # Put everything back in front of what was queued meanwhile
+                with self._lock:
+                    self._events[:0] = events
+                    for user_id, when in last_logins.items():
+                        self._last_login[user_id] = max(when, self._last_login.get(user_id, when))
+                raise
+            return len(events)
+
+    def _write(self, events, last_logins):
+        using = router.db_for_write(LoginEvent)
+        with transaction.atomic(using=using):
+            LoginEvent.objects.using(using).bulk_create(events, batch_size=self.batch_size)
+            if last_logins:
+                UserModel._default_manager.db_manager(using).bulk_update(
+                    [UserModel(pk=pk, last_login=when) for pk, when in last_logins.items()],
+                    ['last_login'],
+                    batch_size=self.batch_size,
+                )
+        # bulk_update sends no post_save; drop cached copies as a save() would
+        for pk in last_logins:
+            user_cache.invalidate_user(pk)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='login-audit-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread; the next event starts a new one."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        thread.join(timeout)
+        self._stopping = False
+        self._thread = None
+
+    def clear(self):
+        with self._lock:
+            self._events, self._last_login = [], {}
+
+    def _run(self):
+        while not self._stopping and self.interval is not None:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Login audit flush failed')
+            finally:
+                close_old_connections()
+
+
+writer = LoginAuditWriter()
+
+
+@atexit.register
+def _flush_on_exit():
+    writer.stop(timeout=5)
+    try:
+        writer.flush()
+    except Exception:
+        logger.exception('Could not flush queued login events on exit')
+
+
+def record(request, outcome, identifier, user_id=None, last_login=None):
+    event = LoginEvent(
+        created_at=last_login or timezone.now(),
+        user_id=user_id,
+        identifier=(normalize_identifier(identifier) or '')[:254],
+        ip=client_ip(request) if request is not None else None,
+        outcome=outcome,
+    )
+    writer.record(event, last_login=(user_id, last_login) if last_login else None)
+    return event
+
+
+@receiver(user_logged_in, dispatch_uid='accounts.login_audit.logged_in')
+def _logged_in(sender, request, user, **kwargs):
+    # Replaces django.contrib.auth's update_last_login (disconnected in
+    # AccountsConfig.ready), which saved the user on every login
+    user.last_login = timezone.now()
+    record(request, LoginEvent.SUCCESS, user.get_username(), user_id=user.pk, last_login=user.last_login)
+
+
+@receiver(user_login_failed, dispatch_uid='accounts.login_audit.login_failed')
+def _login_failed(sender, credentials, request=None, **kwargs):
+    record(request, LoginEvent.FAILURE, credentials.get('username'))
+
+
+def _merge_pending(events, matches, limit):
+    pending = [event for event in writer.pending() if matches(event)]
+    if not pending:
+        return events
+    return sorted(pending + events, key=lambda event: event.created_at, reverse=True)[:limit]
+
+
+def recent_logins(user_id, limit=20, outcome=None):
+    """A user's newest events, including ones not written yet; served by accounts_login_user_recent."""
+    events = LoginEvent.objects.filter(user_id=user_id)
+    if outcome is not None:
+        events = events.filter(outcome=outcome)
+    return _merge_pending(
+        list(events.order_by('-created_at')[:limit]),
+        lambda event: event.user_id == user_id and outcome in (None, event.outcome),
+        limit,
+    )
+
+
+def recent_attempts(identifier, limit=20):
+    """Newest events for a submitted username or email, known or not; served by accounts_login_ident_recent."""
+    identifier = normalize_identifier(identifier)
+    return _merge_pending(
+        list(LoginEvent.objects.filter(identifier=identifier).order_by('-created_at')[:limit]),
+        lambda event: event.identifier == identifier,
+        limit,
+    )
@@ -0,0 +1,186 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import BadHeaderError, EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection, transaction
+from django.dispatch import Signal, receiver
+from django.template.loader import select_template
+from django.utils import timezone, translation
+from django.utils.autoreload import file_changed
+from django.utils.html import escape
+
+from . import instrumentation
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Sent after every mail render with template_name, language and duration (seconds)
+mail_rendered = Signal()
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_mail_template(template_name, language=None):
+    """Load and compile a mail template once per locale.
+
+    A locale-specific variant (``accounts/activation_email.de.html``) is used
+    when it exists, otherwise the plain template name.
+    """
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    key = (template_name, language)
+    template = _templates.get(key)
+    if template is None:
+        base, ext = os.path.splitext(template_name)
+        template = select_template([f'{base}.{language}{ext}', template_name])
+        with _templates_lock:
+            _templates[key] = template
+    return template
+
+
+def clear_mail_templates():
+    with _templates_lock:
+        _templates.clear()
+
+
+@receiver(file_changed, dispatch_uid='accounts.mail.clear_mail_templates')
+def _reset_on_template_change(sender, file_path, **kwargs):
+    # Keep runserver's template autoreload working for the compiled mail templates
+    if file_path.suffix in ('.html', '.txt'):
+        clear_mail_templates()
+
+
+def text_to_html(text):
+    # Paragraphs and line breaks are kept and lines holding a bare URL become
+    # links; much cheaper than urlize() for the shape of our mail templates
+    paragraphs = []
+    for block in text.strip().split('\n\n'):
+        lines = []
+        for line in block.strip().splitlines():
+            line = escape(line.strip())
+            if line.startswith(('http://', 'https://')) and ' ' not in line:
+                line = f'<a href="{line}">{line}</a>'
+            lines.append(line)
+        paragraphs.append('<p>' + '<br>'.join(lines) + '</p>')
+    return '\n\n'.join(paragraphs)
+
+
+def render_mail(template_name, context):
+    """Render a mail body once and return ``(text, html)``.
+
+    The templates are plain text; the HTML part is derived from the rendered
+    text instead of rendering a second template.
+    """
+    language = translation.get_language() or settings.LANGUAGE_CODE
+    started = time.perf_counter()
+    text = get_mail_template(template_name, language).render(context)
+    html = text_to_html(text)
+    mail_rendered.send(
+        sender=render_mail, template_name=template_name, language=language,
+        duration=time.perf_counter() - started,
+    )
+    return text, html
+
+
+def enqueue_mail(subject, message, from_email, recipient_list, html_message=None):
+    with instrumentation.timed('mail'):
+        return OutboundEmail.objects.create(
+            subject=subject, body=message, html_body=html_message or '',
+            from_email=from_email or '', to=list(recipient_list),
+        )
+
+
+def enqueue_mails(messages):
+    """Queue ``(subject, message, from_email, recipient_list, html_message)`` tuples with one INSERT."""
+    with instrumentation.timed('mail'):
+        return OutboundEmail.objects.bulk_create([
+            OutboundEmail(
+                subject=subject, body=message, html_body=html_message or '',
+                from_email=from_email or '', to=list(recipient_list),
+            )
+            for subject, message, from_email, recipient_list, html_message in messages
+        ])
+
+
+async def aenqueue_mail(subject, message, from_email, recipient_list, html_message=None):
+    started = time.perf_counter()
+    try:
+        return await OutboundEmail.objects.acreate(
+            subject=subject, body=message, html_body=html_message or '',
+            from_email=from_email or '', to=list(recipient_list),
+        )
+    finally:
+        instrumentation.observe('mail', time.perf_counter() - started)
+
+
+def _claim_batch(batch_size):
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=getattr(settings, 'MAIL_QUEUE_LEASE', 300))
+    due = OutboundEmail.objects.filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+    # Claimed rows are pushed out of reach of other workers; if this one dies they come back after the lease
+    if db_connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            batch = list(due.select_for_update(skip_locked=True).order_by('next_attempt_at', 'pk')[:batch_size])
+            OutboundEmail.objects.filter(pk__in=[mail.pk for mail in batch]).update(next_attempt_at=lease_until)
+        return batch
+    # Without SKIP LOCKED two workers can read the same rows; each one is
+    # claimed with a conditional UPDATE that only one of them matches
+    candidates = list(due.order_by('next_attempt_at', 'pk')[:batch_size])
+    return [mail for mail in candidates if due.filter(pk=mail.pk).update(next_attempt_at=lease_until)]
+
+
+def _record_failure(mail, error, permanent=False):
+    mail.attempts += 1
+    mail.last_error = str(error)
+    if permanent or mail.attempts >= getattr(settings, 'MAIL_QUEUE_MAX_ATTEMPTS', 5):
+        mail.status = OutboundEmail.FAILED
+    else:
+        backoff = getattr(settings, 'MAIL_QUEUE_RETRY_BACKOFF', 60) * 2 ** (mail.attempts - 1)
+        mail.next_attempt_at = timezone.now() + timedelta(seconds=backoff)
+    mail.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_pending(batch_size=100, connection=None):
+    """Send one batch of due mail over a single SMTP connection; returns (sent, failed)."""
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+    connection = connection or get_connection(fail_silently=False)
+    sent, failed = [], 0
+    try:
+        connection.open()
+    except Exception as error:
+        logger.warning('Could not open mail connection: %s', error)
+        for mail in batch:
+            _record_failure(mail, error)
+        return 0, len(batch)
+    try:
+        for mail in batch:
+            message = EmailMultiAlternatives(
+                mail.subject, mail.body, mail.from_email or None, mail.to, connection=connection,
+            )
+            if mail.html_body:
+                message.attach_alternative(mail.html_body, 'text/html')
+            try:
+                connection.send_messages([message])
+            except BadHeaderError as error:
+                # The message itself is invalid; retrying cannot help
+                logger.warning('Queued mail %s has an invalid header: %s', mail.pk, error)
+                _record_failure(mail, error, permanent=True)
+                failed += 1
+            except Exception as error:
+                logger.warning('Sending queued mail %s failed: %s', mail.pk, error)
+                _record_failure(mail, error)
+                failed += 1
+            else:
+                sent.append(mail.pk)
+    finally:
+        connection.close()
+    OutboundEmail.objects.filter(pk__in=sent).update(
+        status=OutboundEmail.SENT, sent_at=timezone.now(), last_error='',
+    )
+    return len(sent), failed
@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts import identifier_filter
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Populate username_lower/email_lower for users written before the lookup columns existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--start-pk', type=int, default=0,
+                            help='Resume after this primary key (printed after every batch).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = options['start_pk']
+        updated = scanned = 0
+        started = time.monotonic()
+        while True:
+            batch = list(
+                UserModel.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'username', 'email', 'username_lower', 'email_lower')[:batch_size]
+            )
+            if not batch:
+                break
+            stale = []
+            for user in batch:
+                username_lower, email_lower = user.username_lower, user.email_lower
+                user.sync_lookup_fields()
+                if (username_lower, email_lower) != (user.username_lower, user.email_lower):
+                    stale.append(user)
+            if stale:
+                UserModel.objects.bulk_update(stale, ['username_lower', 'email_lower'])
+                identifier_filter.add_users(stale)  # bulk_update sends no post_save
+            scanned += len(batch)
+            updated += len(stale)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'last_pk={last_pk} scanned={scanned} updated={updated}')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {updated} of {scanned} users in {elapsed:.1f}s.'
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import identifier_filter
+
+
+class Command(BaseCommand):
+    help = 'Build the login identifier filter and write the snapshot workers load at startup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Snapshot path; defaults to IDENTIFIER_FILTER_SNAPSHOT.')
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'IDENTIFIER_FILTER_SNAPSHOT', None)
+        if not path:
+            raise CommandError('Pass --output or set IDENTIFIER_FILTER_SNAPSHOT.')
+        started = time.monotonic()
+        bloom, built_at, max_pk = identifier_filter.build()
+        identifier_filter.write_snapshot(path, bloom, built_at, max_pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {path}: {len(bloom.bits) / 1024:.0f} KiB, {bloom.hashes} hashes, '
+            f'users up to pk {max_pk}, in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,57 @@
+import pprint
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import hashers
+
+ALGORITHMS = ('scrypt', 'argon2')
+
+
+class Command(BaseCommand):
+    help = (
+        'Find the strongest scrypt/Argon2 parameters whose hash time fits a latency budget '
+        'on this machine, and print them as PASSWORD_HASHER_PARAMS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=getattr(settings, 'PASSWORD_HASH_TARGET_MS', 100))
+        parser.add_argument('--algorithm', choices=ALGORITHMS + ('all',), default='all')
+        parser.add_argument('--samples', type=int, default=5, help='Hashes timed per candidate (median is used).')
+        parser.add_argument('--argon2-memory-kib', type=int, default=65536)
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        algorithms = ALGORITHMS if options['algorithm'] == 'all' else (options['algorithm'],)
+        pool_size = getattr(settings, 'PASSWORD_HASHING_POOL_SIZE', 0) or 1
+        params = {}
+        for algorithm in algorithms:
+            if algorithm == 'argon2':
+                if not hashers.argon2_available():
+                    if options['algorithm'] == 'argon2':
+                        raise CommandError('argon2-cffi is not installed.')
+                    self.stderr.write('Skipping argon2: argon2-cffi is not installed.')
+                    continue
+                chosen, latency = hashers.calibrate_argon2(
+                    target, memory_cost=options['argon2_memory_kib'], samples=options['samples']
+                )
+                memory = chosen['memory_cost'] * 1024
+            else:
+                chosen, latency = hashers.calibrate_scrypt(target, samples=options['samples'])
+                memory = hashers.CalibratedScryptPasswordHasher.memory(
+                    chosen['work_factor'], chosen['block_size'], chosen['parallelism']
+                )
+            if latency > target:
+                self.stderr.write(
+                    f'{algorithm}: even the cheapest parameters take {latency * 1000:.0f}ms, '
+                    f'over the {options["target_ms"]:.0f}ms budget.'
+                )
+            params[algorithm] = chosen
+            self.stdout.write(
+                f'{algorithm}: {chosen} -> {latency * 1000:.1f}ms per hash, '
+                f'{memory / 2 ** 20:.0f} MiB per hash, ~{pool_size / latency:.0f} logins/s '
+                f'with {pool_size} hashing workers'
+            )
+        if not params:
+            raise CommandError('No hasher could be calibrated.')
+        self.stdout.write('\nPASSWORD_HASHER_PARAMS = ' + pprint.pformat(params, sort_dicts=False))
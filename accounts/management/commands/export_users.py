@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from accounts.export import FORMATS, stream_users
+
+
+class Command(BaseCommand):
+    help = 'Stream all users as CSV or JSONL without loading the table into memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write; defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunks = stream_users(options['format'], options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        lines = 0
+        with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+            for chunk in chunks:
+                stream.write(chunk)
+                lines += 1
+        if options['format'] == 'csv':
+            lines -= 1  # Header
+        self.stderr.write(f'Exported {lines} users to {options["output"]}.')
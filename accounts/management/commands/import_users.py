@@ -0,0 +1,210 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from accounts import hashing, identifier_filter
+
+UserModel = get_user_model()
+USERNAME_MAX_LENGTH = UserModel._meta.get_field('username').max_length
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def read_rows(path, fmt):
+    with open(path, newline='', encoding='utf-8') as stream:
+        if fmt == 'csv':
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def as_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-import users from CSV or JSONL. Rows need username and email plus either '
+        'password (already hashed in a Django hasher format) or raw_password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes hashing raw_password values; 0 hashes inline.')
+        parser.add_argument('--active', action='store_true', help='Default is_active for rows without the column.')
+        parser.add_argument('--checkpoint', help='File recording progress; an existing checkpoint is resumed from.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        checkpoint = options['checkpoint']
+        start_row = self.read_checkpoint(checkpoint)
+        if start_row:
+            self.stdout.write(f'Resuming after row {start_row}.')
+        self.default_active = options['active']
+        self.workers = options['workers']
+        self.pool = None  # Started by the first chunk with raw passwords
+
+        rows = enumerate(read_rows(path, fmt), start=1)
+        if start_row:
+            rows = islice(rows, start_row, None)
+        totals = {'created': 0, 'skipped': 0}
+        started = time.monotonic()
+        try:
+            while True:
+                chunk = list(islice(rows, options['batch_size']))
+                if not chunk:
+                    break
+                created, skipped = self.import_chunk(chunk)
+                totals['created'] += created
+                totals['skipped'] += skipped
+                self.write_checkpoint(checkpoint, chunk[-1][0])
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'row={chunk[-1][0]} created={totals["created"]} skipped={totals["skipped"]} '
+                    f'rate={totals["created"] / elapsed:.0f}/s'
+                )
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {totals["created"]} users, skipped {totals["skipped"]} rows '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def read_checkpoint(self, checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as stream:
+            try:
+                return int(stream.read().strip() or 0)
+            except ValueError:
+                raise CommandError(f'Unreadable checkpoint file {checkpoint}')
+
+    def write_checkpoint(self, checkpoint, row_number):
+        if not checkpoint:
+            return
+        tmp = f'{checkpoint}.tmp'
+        with open(tmp, 'w') as stream:
+            stream.write(str(row_number))
+        os.replace(tmp, checkpoint)
+
+    def skip(self, row_number, reason):
+        self.stderr.write(f'row {row_number}: {reason}')
+
+    def validate(self, row_number, row):
+        username = (row.get('username') or '').strip()
+        email = UserModel.objects.normalize_email((row.get('email') or '').strip())
+        if not username or len(username) > USERNAME_MAX_LENGTH:
+            return self.skip(row_number, f'invalid username {username!r}')
+        try:
+            validate_email(email)
+        except ValidationError:
+            return self.skip(row_number, f'invalid email {email!r}')
+        password = row.get('password') or ''
+        raw_password = row.get('raw_password')
+        if password:
+            if not password.startswith(UNUSABLE_PASSWORD_PREFIX):
+                try:
+                    identify_hasher(password)
+                except ValueError:
+                    return self.skip(row_number, 'password is not in a known hasher format')
+        elif not raw_password:
+            return self.skip(row_number, 'missing password or raw_password')
+        user = UserModel(
+            username=username,
+            email=email,
+            password=password,
+            is_active=as_bool(row.get('is_active'), self.default_active),
+            is_staff=as_bool(row.get('is_staff'), False),
+        )
+        user.sync_lookup_fields()
+        return user, raw_password
+
+    def import_chunk(self, chunk):
+        candidates, skipped = [], 0
+        seen_usernames, seen_emails = set(), set()
+        for row_number, row in chunk:
+            result = self.validate(row_number, row)
+            if result is None:
+                skipped += 1
+                continue
+            user, raw_password = result
+            if user.username_lower in seen_usernames or user.email_lower in seen_emails:
+                self.skip(row_number, f'duplicate of an earlier row ({user.username}, {user.email})')
+                skipped += 1
+                continue
+            seen_usernames.add(user.username_lower)
+            seen_emails.add(user.email_lower)
+            candidates.append((row_number, user, raw_password))
+
+        existing = UserModel.objects.filter(
+            Q(username_lower__in=seen_usernames) | Q(email_lower__in=seen_emails)
+        ).values_list('username_lower', 'email_lower')
+        taken_usernames, taken_emails = set(), set()
+        for username_lower, email_lower in existing:
+            taken_usernames.add(username_lower)
+            taken_emails.add(email_lower)
+        accepted = []
+        for row_number, user, raw_password in candidates:
+            if user.username_lower in taken_usernames:
+                self.skip(row_number, f'username {user.username!r} already exists')
+                skipped += 1
+            elif user.email_lower in taken_emails:
+                self.skip(row_number, f'email {user.email!r} already exists')
+                skipped += 1
+            else:
+                accepted.append((row_number, user, raw_password))
+
+        to_hash = [(user, raw) for _, user, raw in accepted if not user.password]
+        if to_hash:
+            raws = [raw for _, raw in to_hash]
+            if self.pool is None and self.workers:
+                self.pool = hashing.create_pool(self.workers)
+            if self.pool is not None:
+                hashed = self.pool.map(make_password, raws, chunksize=max(1, len(raws) // 64))
+            else:
+                hashed = map(make_password, raws)
+            for (user, _), encoded in zip(to_hash, hashed):
+                user.password = encoded
+        created = self.insert(accepted)
+        return created, skipped + len(accepted) - created
+
+    def insert(self, accepted):
+        try:
+            with transaction.atomic():
+                UserModel.objects.bulk_create([user for _, user, _ in accepted])
+            # bulk_create sends no post_save; without this the new users
+            # could not log in until every worker rebuilt its filter
+            identifier_filter.add_users([user for _, user, _ in accepted])
+            return len(accepted)
+        except IntegrityError:
+            # A concurrent writer took some identifiers; fall back to row-by-row for this chunk
+            created = 0
+            for row_number, user, _ in accepted:
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                    created += 1
+                except IntegrityError:
+                    self.skip(row_number, f'{user.username}/{user.email} conflicts with an existing user')
+            return created
@@ -0,0 +1,135 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime. AppConfig.create is
+# wrapped so each app's import, models import and ready() are timed.
+DRIVER = '''
+import json, sys, time
+started = time.perf_counter()
+import django
+from django.apps.config import AppConfig
+
+apps = {}
+create = AppConfig.create.__func__
+
+
+def timed(config, phase):
+    method = getattr(config, phase)
+
+    def wrapper(*args, **kwargs):
+        t = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            apps[config.name][phase] = time.perf_counter() - t
+    setattr(config, phase, wrapper)
+
+
+def timed_create(cls, entry):
+    t = time.perf_counter()
+    config = create(cls, entry)
+    apps[config.name] = {'import': time.perf_counter() - t, 'import_models': 0.0, 'ready': 0.0}
+    timed(config, 'import_models')
+    timed(config, 'ready')
+    return config
+
+
+AppConfig.create = classmethod(timed_create)
+django.setup()
+setup = time.perf_counter() - started
+from django.conf import settings
+settings.WARMUP_ON_STARTUP = False  # Timed separately below
+t = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1])
+handler = time.perf_counter() - t
+warmup = []
+if sys.argv[2] == '1':
+    from accounts.warmup import warm_up
+    warmup = warm_up()
+print(json.dumps({'setup': setup, 'handler': handler, 'apps': apps, 'warmup': warmup}))
+'''
+
+
+def parse_importtime(stderr):
+    """``{module: (self_seconds, cumulative_seconds)}`` from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            own, cumulative = int(fields[0]), int(fields[1])
+        except (IndexError, ValueError):
+            continue  # Header line
+        modules[fields[2].strip()] = (own / 1e6, cumulative / 1e6)
+    return modules
+
+
+def by_package(modules, app_names):
+    """Own import time per installed app, and per top-level package for everything else."""
+    # Longest name first, so django.contrib.auth modules are not counted under django
+    names = sorted(app_names, key=len, reverse=True)
+    totals = {}
+    for module, (own, _) in modules.items():
+        owner = next((name for name in names if module == name or module.startswith(name + '.')), None)
+        owner = owner or module.partition('.')[0]
+        totals[owner] = totals.get(owner, 0.0) + own
+    return totals
+
+
+def _ms(seconds):
+    return f'{seconds * 1000:8.1f}ms'
+
+
+class Command(BaseCommand):
+    help = (
+        'Boot the project in a fresh interpreter and report import time per installed app and '
+        'module, each app\'s models import and ready() cost, and optionally the warm-up steps.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi')
+        parser.add_argument('--limit', type=int, default=15, help='Slowest modules to list.')
+        parser.add_argument('--warmup', action='store_true', help='Also run and time accounts.warmup.')
+
+    def handle(self, *args, **options):
+        module = f'{settings.ROOT_URLCONF.rpartition(".")[0]}.{options["server"]}'
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', DRIVER, module, '1' if options['warmup'] else '0'],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode:
+            raise CommandError(f'Booting {module} failed:\n{result.stderr[-2000:]}')
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+
+        self.stdout.write(f'django.setup() {_ms(report["setup"])}, {module} {_ms(report["handler"])}')
+
+        self.stdout.write('\nApp                                import  models   ready')
+        for name, phases in report['apps'].items():
+            self.stdout.write(
+                f'{name:<30} {_ms(phases["import"])} {_ms(phases["import_models"])} {_ms(phases["ready"])}'
+            )
+
+        self.stdout.write(f'\nImport time by app or package, top {options["limit"]} (own time of its modules)')
+        packages = by_package(modules, list(report['apps']))
+        for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:options['limit']]:
+            self.stdout.write(f'{name:<30} {_ms(seconds)}')
+
+        self.stdout.write(f'\nSlowest {options["limit"]} imports (cumulative)')
+        slowest = sorted(modules.items(), key=lambda item: -item[1][1])[:options['limit']]
+        for name, (own, cumulative) in slowest:
+            self.stdout.write(f'{name:<50} {_ms(cumulative)} (own {_ms(own).strip()})')
+
+        if report['warmup']:
+            self.stdout.write('\nWarm-up')
+            for step, seconds in report['warmup']:
+                self.stdout.write(f'{step:<30} {_ms(seconds)}')
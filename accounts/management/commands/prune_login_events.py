@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts import login_audit
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove login audit events older than LOGIN_AUDIT_RETENTION_DAYS and, on PostgreSQL, '
+        'create the coming monthly partitions. Run it daily.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'LOGIN_AUDIT_RETENTION_DAYS', 90))
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = login_audit.ensure_partitions()
+        if created:
+            self.stdout.write(f'Partitions present: {", ".join(created)}')
+        before = timezone.now() - timedelta(days=options['days'])
+        dropped, deleted = login_audit.prune(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Dropped {dropped} partitions. Deleted {deleted} login events older than {before:%Y-%m-%d %H:%M}.'
+        ))
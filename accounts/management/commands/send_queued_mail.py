@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mail import deliver_pending
+
+
+class Command(BaseCommand):
+    help = 'Deliver mail queued by the accounts views, reusing one SMTP connection per batch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting when empty.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_pending(batch_size=options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'sent={sent} failed={failed}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Delivered {total_sent} mails, {total_failed} failed attempts.'))
@@ -0,0 +1,14 @@
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .hashing import HashingPoolFull
+
+
+class HashingBackpressureMiddleware(MiddlewareMixin):
+    # Shed load quickly instead of queueing unbounded PBKDF2 work behind the pool
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingPoolFull):
+            response = HttpResponse('Service temporarily overloaded, please retry.', status=503)
+            response['Retry-After'] = '1'
+            return response
+        return None
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-17 15:32
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_lookup_fields(apps, schema_editor):
+    # Small tables are filled here; large ones can be migrated empty and
+    # completed online with `manage.py backfill_lookup_fields`.
+    User = apps.get_model('accounts', 'User')
+    last_pk = 0
+    while True:
+        batch = list(User.objects.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        for user in batch:
+            user.username_lower = user.username.lower()
+            user.email_lower = user.email.lower()
+        User.objects.bulk_update(batch, ['username_lower', 'email_lower'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_lower',
+            field=models.EmailField(db_index=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='username_lower',
+            field=models.CharField(db_index=True, editable=False, max_length=30, null=True),
+        ),
+        migrations.RunPython(backfill_lookup_fields, migrations.RunPython.noop),
+    ]
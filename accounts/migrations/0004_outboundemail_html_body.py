@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-17 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='html_body',
+            field=models.TextField(blank=True),
+        ),
+    ]
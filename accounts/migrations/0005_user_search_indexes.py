@@ -0,0 +1,35 @@
+from django.db import migrations
+
+INDEXES = (
+    ('accounts_user_email_lower_trgm', 'email_lower'),
+    ('accounts_user_username_lower_trgm', 'username_lower'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # PostgreSQL only; SQLite gets an FTS5 table after migrate (accounts.search)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON accounts_user USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _column in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_outboundemail_html_body'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.16 on 2026-10-17 17:44
+
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations, models
+import django.utils.timezone
+
+# Same columns and index names as the model. The primary key has to include
+# the partition key; ids stay unique through the identity column.
+PARTITIONED_TABLE = '''
+CREATE TABLE accounts_loginevent (
+    id bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY,
+    created_at timestamp with time zone NOT NULL,
+    user_id bigint NULL,
+    identifier varchar(254) NOT NULL,
+    ip inet NULL,
+    outcome varchar(10) NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at)
+'''
+PARTITIONED_INDEXES = (
+    'CREATE INDEX accounts_login_user_recent ON accounts_loginevent (user_id, created_at DESC)',
+    'CREATE INDEX accounts_login_ident_recent ON accounts_loginevent (identifier, created_at DESC)',
+    'CREATE INDEX accounts_login_created ON accounts_loginevent (created_at)',
+    # Rows for months without a partition yet; prune_login_events adds the monthly ones
+    'CREATE TABLE accounts_loginevent_default PARTITION OF accounts_loginevent DEFAULT',
+)
+
+
+def _month(year, month):
+    years, month = divmod(month - 1, 12)
+    return date(year + years, month + 1, 1)
+
+
+def partition_login_events(apps, schema_editor):
+    # PostgreSQL only: swap the new, empty table for a range-partitioned one
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP TABLE accounts_loginevent')
+    schema_editor.execute(PARTITIONED_TABLE)
+    for statement in PARTITIONED_INDEXES:
+        schema_editor.execute(statement)
+    # The first months, as accounts.login_audit.ensure_partitions() names them
+    today = django.utils.timezone.now().date()
+    for offset in range(getattr(settings, 'LOGIN_AUDIT_PARTITIONS_AHEAD', 2) + 1):
+        lower = _month(today.year, today.month + offset)
+        upper = _month(today.year, today.month + offset + 1)
+        schema_editor.execute(
+            f"CREATE TABLE accounts_loginevent_p{lower:%Y%m} PARTITION OF accounts_loginevent "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_date_joined_archiveduser'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user_id', models.BigIntegerField(null=True)),
+                ('identifier', models.CharField(max_length=254)),
+                ('ip', models.GenericIPAddressField(null=True)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('failure', 'Failure'), ('locked', 'Locked out')], max_length=10)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', '-created_at'], name='accounts_login_user_recent'), models.Index(fields=['identifier', '-created_at'], name='accounts_login_ident_recent'), models.Index(fields=['created_at'], name='accounts_login_created')],
+            },
+        ),
+        # Dropping the model on the way back also drops every partition
+        migrations.RunPython(partition_login_events, migrations.RunPython.noop),
+    ]
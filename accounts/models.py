@@ -1,5 +1,14 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.utils import timezone
+
+from . import hashing
+
+
+def normalize_identifier(value):
+    # Lookup columns hold the lower-cased form so logins can use a plain indexed equality
+    return value.lower() if value else value
+
 
 class UserManager(BaseUserManager):
     def create_user(self, username, email, password=None, **extra_fields):
@@ -18,11 +27,24 @@ class UserManager(BaseUserManager):
         extra_fields.setdefault('is_superuser', True)
         return self.create_user(username, email, password, **extra_fields)
 
+    def get_by_identifier(self, identifier):
+        identifier = normalize_identifier(identifier)
+        return self.get(models.Q(username_lower=identifier) | models.Q(email_lower=identifier))
+
+    async def aget_by_identifier(self, identifier):
+        identifier = normalize_identifier(identifier)
+        return await self.aget(models.Q(username_lower=identifier) | models.Q(email_lower=identifier))
+
 class User(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=30, unique=True)
     email = models.EmailField(unique=True)
+    # Normalized copies of username/email kept in sync by save(); see normalize_identifier
+    username_lower = models.CharField(max_length=30, null=True, editable=False, db_index=True)
+    email_lower = models.EmailField(null=True, editable=False, db_index=True)
     is_active = models.BooleanField(default=False)  # Email confirmation
     is_staff = models.BooleanField(default=False)
+    # Indexed for `manage.py purge_inactive_users`
+    date_joined = models.DateTimeField(default=timezone.now, db_index=True)
 
     objects = UserManager()
 
@@ -30,4 +52,112 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ['username']
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+    # Hashing goes through accounts.hashing so it can run in the bounded process pool
+
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return hashing.check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        async def setter(raw_password):
+            self.password = await hashing.amake_password(raw_password)
+            await self.asave(update_fields=['password'])
+        return await hashing.acheck_password(raw_password, self.password, setter)
+
+    def sync_lookup_fields(self):
+        self.username_lower = normalize_identifier(self.username)
+        self.email_lower = normalize_identifier(self.email)
+
+    def save(self, *args, **kwargs):
+        self.sync_lookup_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'username' in update_fields:
+                update_fields.add('username_lower')
+            if 'email' in update_fields:
+                update_fields.add('email_lower')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+
+class ArchivedUser(models.Model):
+    # Registrations that were never activated, moved here by `manage.py purge_inactive_users --archive`
+    original_id = models.BigIntegerField(db_index=True)
+    username = models.CharField(max_length=30)
+    email = models.EmailField()
+    date_joined = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.email
+
+
+class OutboundEmail(models.Model):
+    # Mail queued by the views and delivered by `manage.py send_queued_mail`
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Doubles as the lease: claimed rows are pushed into the future while being sent
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.to)}'
+
+
+class LoginEvent(models.Model):
+    # Append-only login history, written in batches by accounts.login_audit.
+    # Denormalized on purpose: no foreign key, so rows need no join and
+    # outlive the account. On PostgreSQL the table is partitioned by month.
+    SUCCESS = 'success'
+    FAILURE = 'failure'
+    LOCKED = 'locked'
+    OUTCOME_CHOICES = [
+        (SUCCESS, 'Success'),
+        (FAILURE, 'Failure'),
+        (LOCKED, 'Locked out'),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now)
+    user_id = models.BigIntegerField(null=True)
+    identifier = models.CharField(max_length=254)
+    ip = models.GenericIPAddressField(null=True)
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', '-created_at'], name='accounts_login_user_recent'),
+            models.Index(fields=['identifier', '-created_at'], name='accounts_login_ident_recent'),
+            models.Index(fields=['created_at'], name='accounts_login_created'),
+        ]
+
+    def __str__(self):
+        return f'{self.identifier} {self.outcome} at {self.created_at:%Y-%m-%d %H:%M:%S}'
@@ -0,0 +1,123 @@
+"""
+Cross-request cache of each user's permission names.
+
+Entries are keyed by a per-user version (bumped when the user's groups or
+direct permissions change) and a global version (bumped when any group's
+permissions, or any group or permission itself, change). Superuser status is
+part of the key, so toggling it needs no invalidation.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .instrumentation import get_cache
+
+UserModel = get_user_model()
+
+GLOBAL_VERSION_KEY = 'perms:version'
+
+
+def _cache():
+    return get_cache(getattr(settings, 'PERMISSION_CACHE', 'default'))
+
+
+def _user_version_key(pk):
+    return f'perms:version:{pk}'
+
+
+def _versions(cache, pk):
+    keys = [GLOBAL_VERSION_KEY, _user_version_key(pk)]
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        for key in keys:
+            if key not in versions:
+                cache.add(key, uuid.uuid4().hex, None)
+        versions = cache.get_many(keys)
+    return [versions.get(key) for key in keys]
+
+
+def _names(queryset):
+    return frozenset(f'{app_label}.{codename}' for app_label, codename in queryset)
+
+
+def _load(user):
+    # Read from the primary: a version bump can't tell how far a replica lags,
+    # and an entry loaded from a stale replica would be kept for the full timeout
+    permissions = Permission.objects.db_manager(DEFAULT_DB_ALIAS)
+    if user.is_superuser:
+        names = _names(permissions.values_list('content_type__app_label', 'codename'))
+        return names, names
+    user_perms = _names(
+        permissions.filter(user=user).values_list('content_type__app_label', 'codename')
+    )
+    group_perms = _names(
+        permissions.filter(group__user=user).values_list('content_type__app_label', 'codename')
+    )
+    return user_perms, group_perms
+
+
+def get_permissions(user):
+    """Return ``(user_permissions, group_permissions)`` as frozensets of 'app_label.codename'."""
+    cache = _cache()
+    global_version, user_version = _versions(cache, user.pk)
+    key = f'perms:{user.pk}:{int(user.is_superuser)}:{global_version}:{user_version}'
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = _load(user)
+        cache.set(key, permissions, getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 3600))
+    return permissions
+
+
+def _bump(key):
+    # Fresh random tokens, as in accounts.user_cache: an evicted version
+    # can't come back as one an old entry was stored under
+    cache = _cache()
+    cache.set(key, uuid.uuid4().hex, None)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def invalidate_user_permissions(pk):
+    _bump(_user_version_key(pk))
+
+
+def invalidate_all_permissions():
+    _bump(GLOBAL_VERSION_KEY)
+
+
+def _user_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_user_permissions(instance.pk)
+    elif pk_set:
+        # group.user_set / permission.user_set: pk_set holds the users
+        for pk in pk_set:
+            invalidate_user_permissions(pk)
+    else:
+        # A reverse clear() doesn't say which users were affected
+        invalidate_all_permissions()
+
+
+m2m_changed.connect(_user_m2m_changed, sender=UserModel.groups.through,
+                    dispatch_uid='accounts.permission_cache.user_groups')
+m2m_changed.connect(_user_m2m_changed, sender=UserModel.user_permissions.through,
+                    dispatch_uid='accounts.permission_cache.user_permissions')
+
+
+@receiver(m2m_changed, sender=Group.permissions.through, dispatch_uid='accounts.permission_cache.group_permissions')
+def _group_permissions_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_all_permissions()
+
+
+@receiver(post_save, sender=Group, dispatch_uid='accounts.permission_cache.group_saved')
+@receiver(post_delete, sender=Group, dispatch_uid='accounts.permission_cache.group_deleted')
+@receiver(post_save, sender=Permission, dispatch_uid='accounts.permission_cache.permission_saved')
+@receiver(post_delete, sender=Permission, dispatch_uid='accounts.permission_cache.permission_deleted')
+def _definitions_changed(sender, **kwargs):
+    invalidate_all_permissions()
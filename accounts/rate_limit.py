@@ -0,0 +1,155 @@
+"""
+Token-bucket rate limits per URL name, applied before the view runs.
+
+RATE_LIMITS maps URL names from accounts/urls.py to their buckets:
+
+    'register': {'ip': (5, 60), 'global': (100, 60), 'methods': ('POST',)}
+
+A ``(requests, seconds)`` bucket holds ``requests`` tokens and refills them
+over ``seconds``. 'ip' buckets are per client address, the 'global' bucket is
+shared by every client. Without 'methods' all requests are counted.
+
+Each bucket is kept as a single integer, its theoretical arrival time (GCRA),
+in RATE_LIMIT_CACHE. It only moves through atomic incr()/decr(), so workers
+sharing the cache agree on it. Every process also runs the same buckets
+locally: a client that has emptied a bucket within this process alone is over
+the limit whatever the other workers saw, and is refused without a cache
+round trip.
+
+Refusals get a 429 with Retry-After. They are counted in
+accounts_rate_limited_total; accounts_rate_limit_saved_seconds_total and
+accounts_rate_limit_saved_queries_total estimate the work avoided from the
+sampled cost of each view.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .instrumentation import get_cache, registry
+from .throttling import client_ip
+
+SCOPES = ('ip', 'global')
+# A shared bucket outlives a full refill this many times over; a client kept
+# at its limit gets at most one extra burst per key lifetime
+KEY_LIFETIME_FACTOR = 10
+
+
+class Bucket:
+    def __init__(self, requests, seconds):
+        self.interval = max(1, int(seconds * 1000 / requests))  # ms per token
+        self.tolerance = self.interval * requests  # ms of burst
+
+    def wait(self, tat, now):
+        """ms until a request at ``now`` fits a bucket whose arrival time became ``tat``; 0 if it does."""
+        return max(0, tat - now - self.tolerance)
+
+
+class LocalBuckets:
+    """Per-process buckets, least recently used dropped beyond ``max_keys``."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self.tats = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key, bucket, now):
+        with self.lock:
+            tat = max(self.tats.pop(key, now), now) + bucket.interval
+            wait = bucket.wait(tat, now)
+            # A refused request takes no token
+            self.tats[key] = tat - bucket.interval if wait else tat
+            if len(self.tats) > self.max_keys:
+                self.tats.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self.lock:
+            self.tats.clear()
+
+
+class RateLimiter:
+    def __init__(self, cache_alias=None, clock=time.time):
+        self.cache_alias = cache_alias
+        self.clock = clock
+        self.local = LocalBuckets(getattr(settings, 'RATE_LIMIT_LOCAL_MAX_KEYS', 10000))
+        self._buckets = {}
+
+    @property
+    def cache(self):
+        return get_cache(self.cache_alias or getattr(settings, 'RATE_LIMIT_CACHE', 'default'))
+
+    def _bucket(self, rate):
+        bucket = self._buckets.get(rate)
+        if bucket is None:
+            bucket = self._buckets[rate] = Bucket(*rate)
+        return bucket
+
+    def _take_shared(self, key, bucket, now):
+        cache = self.cache
+        try:
+            tat = cache.incr(key, bucket.interval)
+        except ValueError:
+            tat = None
+        if tat is None or tat - bucket.interval < now:
+            # New or idle bucket: it has refilled completely
+            cache.set(key, now + bucket.interval, bucket.tolerance * KEY_LIFETIME_FACTOR // 1000 + 1)
+            return 0
+        wait = bucket.wait(tat, now)
+        if wait:
+            try:
+                cache.decr(key, bucket.interval)  # Hand back the token that was not granted
+            except ValueError:
+                pass
+        return wait
+
+    def check(self, view, method, ip):
+        """Return ``(scope, stage, retry_after_seconds)`` for a refused request, else None."""
+        limits = getattr(settings, 'RATE_LIMITS', {}).get(view)
+        if not limits or ('methods' in limits and method not in limits['methods']):
+            return None
+        now = int(self.clock() * 1000)
+        scopes = [
+            (scope, f'ratelimit:{view}:{scope}:{ip}' if scope == 'ip' else f'ratelimit:{view}:{scope}',
+             self._bucket(limits[scope]))
+            for scope in SCOPES if scope in limits and (scope != 'ip' or ip)
+        ]
+        for scope, key, bucket in scopes:
+            wait = self.local.take(key, bucket, now)
+            if wait:
+                return scope, 'local', wait / 1000
+        for scope, key, bucket in scopes:
+            wait = self._take_shared(key, bucket, now)
+            if wait:
+                return scope, 'shared', wait / 1000
+        return None
+
+    def reset(self):
+        self.local.clear()
+
+
+limiter = RateLimiter()
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    # process_view runs once the URL name is known, before the view touches
+    # sessions, the database or the hashing pool
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = request.resolver_match.url_name
+        refused = limiter.check(view, request.method, client_ip(request))
+        if refused is None:
+            return None
+        scope, stage, retry_after = refused
+        request.rate_limited = True
+        registry.inc('accounts_rate_limited_total', {'view': view, 'scope': scope, 'stage': stage})
+        seconds, queries = registry.view_cost(view)
+        if seconds:
+            registry.inc('accounts_rate_limit_saved_seconds_total', {'view': view}, seconds)
+            registry.inc('accounts_rate_limit_saved_queries_total', {'view': view}, queries)
+        response = HttpResponse('Too many requests, please retry later.', status=429)
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
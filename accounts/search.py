@@ -0,0 +1,103 @@
+"""
+Indexed user search for the admin.
+
+Terms are matched against the normalized username_lower/email_lower
+columns so every strategy can use an index:
+
+* PostgreSQL: substring match served by GIN trigram indexes (migration
+  0005), or a prefix match on the varchar_pattern_ops indexes for terms too
+  short to have trigrams.
+* SQLite: an FTS5 trigram table kept in sync by triggers, installed after
+  migrate (install_sqlite_fts) since table rebuilds drop triggers.
+* Anything else: a prefix match written as a range, which any B-tree serves.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import normalize_identifier
+
+FTS_TABLE = 'accounts_user_fts'
+TRIGRAM = 3
+
+SQLITE_FTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "email_lower, username_lower, content='accounts_user', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON accounts_user BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, email_lower, username_lower) "
+    "VALUES (new.id, new.email_lower, new.username_lower); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON accounts_user BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email_lower, username_lower) "
+    "VALUES ('delete', old.id, old.email_lower, old.username_lower); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF email_lower, username_lower "
+    f"ON accounts_user BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email_lower, username_lower) "
+    "VALUES ('delete', old.id, old.email_lower, old.username_lower); "
+    f"INSERT INTO {FTS_TABLE}(rowid, email_lower, username_lower) "
+    "VALUES (new.id, new.email_lower, new.username_lower); END",
+]
+
+
+def _sqlite_triggers(cursor):
+    cursor.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [f'{FTS_TABLE}_%'],
+    )
+    return cursor.fetchone()[0]
+
+
+def install_sqlite_fts(using='default'):
+    """Create the FTS5 table and its triggers; rebuild it if triggers were missing."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        if _sqlite_triggers(cursor) == 3:
+            return False
+        try:
+            for statement in SQLITE_FTS:
+                cursor.execute(statement)
+        except Exception:
+            # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+            return False
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def _has_sqlite_fts(using):
+    with connections[using].cursor() as cursor:
+        return _sqlite_triggers(cursor) == 3
+
+
+def _prefix(column, term):
+    # A half-open range rather than LIKE, which SQLite can't serve from a
+    # binary-collated index
+    upper = term[:-1] + chr(ord(term[-1]) + 1)
+    return Q(**{f'{column}__gte': term, f'{column}__lt': upper})
+
+
+def search_users(queryset, term):
+    term = normalize_identifier(term.strip())
+    if not term:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        lookup = 'contains' if len(term) >= TRIGRAM else 'startswith'
+        return queryset.filter(Q(**{f'email_lower__{lookup}': term}) | Q(**{f'username_lower__{lookup}': term}))
+    if vendor == 'sqlite' and len(term) >= TRIGRAM and _has_sqlite_fts(queryset.db):
+        match = '"' + term.replace('"', '""') + '"'
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+    return queryset.filter(_prefix('email_lower', term) | _prefix('username_lower', term))
+
+
+def estimated_user_count(using='default'):
+    """Planner row estimate for accounts_user, or None where it isn't available."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = 'accounts_user'")
+        row = cursor.fetchone()
+    return row[0] if row and row[0] > 0 else None
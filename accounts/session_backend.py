@@ -0,0 +1,246 @@
+"""
+Cache-first session engine with write-behind persistence.
+
+Enable with SESSION_ENGINE = 'accounts.session_backend'. Reads and writes go
+to SESSION_CACHE_ALIAS; database writes are queued and flushed in batches by
+a background thread, and expired rows are purged a bounded batch at a time
+on the same thread. The cache must be shared by every server process
+(Redis/memcached), since a session lives only there until the next flush.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.db import close_old_connections, connections, router, transaction
+from django.utils import timezone
+
+from .instrumentation import get_cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'accounts.session_backend'
+
+
+def _session_model():
+    from django.contrib.sessions.models import Session
+
+    return Session
+
+
+def purge_expired(limit=None):
+    """Delete up to ``limit`` expired sessions; returns the number deleted."""
+    Session = _session_model()
+    limit = limit or getattr(settings, 'SESSION_PURGE_BATCH_SIZE', 1000)
+    using = router.db_for_write(Session)
+    # expire_date is indexed, so each pass touches at most ``limit`` rows
+    keys = list(
+        Session.objects.using(using)
+        .filter(expire_date__lt=timezone.now())
+        .values_list('pk', flat=True)[:limit]
+    )
+    if keys:
+        Session.objects.using(using).filter(pk__in=keys).delete()
+    return len(keys)
+
+
+class SessionWriter:
+    """Coalesces session writes per key and persists them in batches."""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self._last_purge = time.monotonic()
+
+    @property
+    def interval(self):
+        # None disables the background thread; writes are then flushed inline
+        # whenever the batch fills up, or by calling flush()
+        return getattr(settings, 'SESSION_WRITE_BEHIND_INTERVAL', 1.0)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'SESSION_WRITE_BEHIND_BATCH_SIZE', 500)
+
+    def enqueue(self, session_key, row):
+        """Queue ``(session_data, expire_date)`` for a key, or None to delete it."""
+        with self._lock:
+            self._pending[session_key] = row
+            size = len(self._pending)
+        if self.interval is None:
+            if size >= self.batch_size:
+                self.flush()
+            return
+        self._ensure_thread()
+        if size >= self.batch_size:
+            self._wake.set()
+
+    def pending(self, session_key):
+        """Return ``(queued, row)`` for a key that has not reached the database yet."""
+        with self._lock:
+            if session_key in self._pending:
+                return True, self._pending[session_key]
+        return False, None
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception:
+                # Keep the rows for the next flush unless newer writes replaced them
+                with self._lock:
+                    for session_key, row in batch.items():
+                        self._pending.setdefault(session_key, row)
+                raise
+            return len(batch)
+
+    def _write(self, batch):
+        Session = _session_model()
+        using = router.db_for_write(Session)
+        deletes = [key for key, row in batch.items() if row is None]
+        rows = [
+            Session(session_key=key, session_data=row[0], expire_date=row[1])
+            for key, row in batch.items() if row is not None
+        ]
+        with transaction.atomic(using=using):
+            if deletes:
+                Session.objects.using(using).filter(pk__in=deletes).delete()
+            if rows and connections[using].features.supports_update_conflicts_with_target:
+                Session.objects.using(using).bulk_create(
+                    rows,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['session_key'],
+                    update_fields=['session_data', 'expire_date'],
+                )
+            else:
+                for row in rows:
+                    row.save(using=using)
+
+    def maybe_purge(self):
+        interval = getattr(settings, 'SESSION_PURGE_INTERVAL', 60)
+        if interval is None or time.monotonic() - self._last_purge < interval:
+            return 0
+        self._last_purge = time.monotonic()
+        return purge_expired()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='session-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread; the next write starts a new one."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        thread.join(timeout)
+        self._stopping = False
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping and self.interval is not None:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.maybe_purge()
+            except Exception:
+                logger.exception('Session write-behind flush failed')
+            finally:
+                close_old_connections()
+
+
+writer = SessionWriter()
+
+
+@atexit.register
+def _flush_on_exit():
+    writer.stop(timeout=5)
+    try:
+        writer.flush()
+    except Exception:
+        logger.exception('Could not flush queued sessions on exit')
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = get_cache(settings.SESSION_CACHE_ALIAS)
+
+    def load(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            data = None
+        if data is not None:
+            return data
+        # Evicted from the cache before its row was written
+        queued, row = writer.pending(self.session_key)
+        if queued:
+            if row is None or row[1] <= timezone.now():
+                self._session_key = None
+                return {}
+            data = self.decode(row[0])
+            self._cache.set(self.cache_key, data, self.get_expiry_age(expiry=row[1]))
+            return data
+        session = self._get_session_from_db()
+        if session is None:
+            return {}
+        data = self.decode(session.session_data)
+        self._cache.set(self.cache_key, data, self.get_expiry_age(expiry=session.expire_date))
+        return data
+
+    def exists(self, session_key):
+        if session_key and (self.cache_key_prefix + session_key) in self._cache:
+            return True
+        queued, row = writer.pending(session_key)
+        if queued:
+            return row is not None
+        return self.model.objects.filter(session_key=session_key).exists()
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        age = self.get_expiry_age()
+        if must_create:
+            # add() claims the key atomically; a clash with a key that is only
+            # in the database is as unlikely as any session key collision
+            if writer.pending(self.session_key)[0] or not self._cache.add(self.cache_key, data, age):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, age)
+        writer.enqueue(self.session_key, (self.encode(data), self.get_expiry_date()))
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+        writer.enqueue(session_key, None)
+
+    @classmethod
+    def clear_expired(cls):
+        # clearsessions deletes in bounded batches instead of one large DELETE
+        while purge_expired():
+            pass
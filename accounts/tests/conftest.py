@@ -0,0 +1,23 @@
+import pytest
+from django.core.cache import caches
+
+from accounts.login_audit import writer as login_audit_writer
+from accounts.rate_limit import limiter
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Throttle counters and other cached state must not leak between tests
+    for cache in caches.all():
+        cache.clear()
+    limiter.reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def login_audit_inline(settings):
+    # No background writer thread; tests flush the login audit explicitly
+    settings.LOGIN_AUDIT_FLUSH_INTERVAL = None
+    login_audit_writer.clear()
+    yield
+    login_audit_writer.clear()
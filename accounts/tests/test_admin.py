@@ -0,0 +1,93 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from accounts.search import search_users
+
+User = get_user_model()
+
+CHANGELIST = 'admin:accounts_user_changelist'
+
+
+@pytest.fixture
+def users(db):
+    return User.objects.bulk_create([
+        User(username=f'member{i:02d}', email=f'member{i:02d}@example.com', username_lower=f'member{i:02d}',
+             email_lower=f'member{i:02d}@example.com')
+        for i in range(25)
+    ] + [
+        User(username='JaneDoe', email='Jane.Doe@Example.org', username_lower='janedoe',
+             email_lower='jane.doe@example.org'),
+    ])
+
+
+@pytest.fixture
+def admin_client(client, db):
+    admin = User.objects.create_user(
+        username='admin', email='admin@example.com', password='AdminPass123',
+        is_active=True, is_staff=True, is_superuser=True
+    )
+    client.force_login(admin)
+    return client
+
+
+def emails(response):
+    return [user.email for user in response.context['cl'].result_list]
+
+
+@pytest.mark.django_db
+class TestUserSearch:
+    def test_substring_match(self, users):
+        assert [u.username for u in search_users(User.objects.all(), 'doe@exam')] == ['JaneDoe']
+
+    def test_search_is_case_insensitive(self, users):
+        assert search_users(User.objects.all(), 'JANEDOE').get().username == 'JaneDoe'
+
+    def test_short_terms_match_prefixes(self, users):
+        assert search_users(User.objects.all(), 'ja').get().username == 'JaneDoe'
+        assert not search_users(User.objects.all(), 'oe').exists()
+
+    def test_index_follows_updates_and_deletes(self, users):
+        user = User.objects.get(username='JaneDoe')
+        user.email = 'renamed@example.net'
+        user.save()
+        assert not search_users(User.objects.all(), 'jane.doe').exists()
+        assert search_users(User.objects.all(), 'renamed').get() == user
+        user.delete()
+        assert not search_users(User.objects.all(), 'renamed').exists()
+
+
+@pytest.mark.django_db
+class TestUserAdminChangelist:
+    def test_pages_without_count(self, admin_client, users, monkeypatch):
+        from accounts.admin import UserAdmin
+
+        monkeypatch.setattr(UserAdmin, 'list_per_page', 10)
+        seen = []
+        url = reverse(CHANGELIST)
+        with CaptureQueriesContext(connection) as captured:
+            response = admin_client.get(url)
+        assert not [q for q in captured.captured_queries if 'COUNT(' in q['sql'].upper()]
+        while True:
+            seen += emails(response)
+            next_url = response.context['cl'].next_url
+            if not next_url:
+                break
+            response = admin_client.get(url + next_url)
+        assert seen == sorted(User.objects.values_list('email', flat=True))
+
+    def test_descending_pages(self, admin_client, users, monkeypatch):
+        from accounts.admin import UserAdmin
+
+        monkeypatch.setattr(UserAdmin, 'list_per_page', 10)
+        url = reverse(CHANGELIST)
+        response = admin_client.get(url, {'o': '-1'})
+        second = admin_client.get(url + response.context['cl'].next_url)
+        expected = sorted(User.objects.values_list('email', flat=True), reverse=True)
+        assert emails(response) + emails(second) == expected[:20]
+
+    def test_search(self, admin_client, users):
+        response = admin_client.get(reverse(CHANGELIST), {'q': 'jane'})
+        assert emails(response) == ['Jane.Doe@Example.org']
+        assert b'Next page' not in response.content
@@ -0,0 +1,135 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from accounts import api_auth
+
+User = get_user_model()
+
+
+@pytest.fixture
+def api_user(db):
+    return User.objects.create_user(
+        username='apiuser',
+        email='api@example.com',
+        password='ApiPass123',
+        is_active=True
+    )
+
+
+def obtain(client):
+    response = client.post(reverse('api_token'), {'username': 'apiuser', 'password': 'ApiPass123'})
+    assert response.status_code == 200
+    return response.json()
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+@pytest.mark.django_db
+class TestApiTokens:
+    def test_issue_tokens(self, client, api_user):
+        tokens = obtain(client)
+        assert set(tokens) == {'access', 'refresh', 'expires_in'}
+        claims = api_auth.verify_token(tokens['access'])
+        assert claims['sub'] == api_user.pk
+        assert claims['name'] == 'api@example.com'
+
+    def test_invalid_credentials(self, client, api_user):
+        response = client.post(reverse('api_token'), {'username': 'apiuser', 'password': 'wrong'})
+        assert response.status_code == 401
+
+    def test_accepts_json_body(self, client, api_user):
+        response = client.post(
+            reverse('api_token'),
+            {'username': 'api@example.com', 'password': 'ApiPass123'},
+            content_type='application/json'
+        )
+        assert response.status_code == 200
+
+    def test_bearer_request_needs_no_queries(self, client, api_user):
+        tokens = obtain(client)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(reverse('api_me'), **bearer(tokens['access']))
+        assert response.status_code == 200
+        assert response.json()['username'] == 'api@example.com'
+        assert len(captured) == 0
+
+    def test_permission_claims(self, api_user):
+        api_user.is_superuser = True
+        api_user.save()
+        user = api_auth.TokenUser(api_auth.verify_token(api_auth.issue_tokens(api_user)['access']))
+        assert user.has_perm('accounts.change_user')
+        assert user.has_module_perms('accounts')
+
+    def test_refresh_rotates(self, client, api_user):
+        tokens = obtain(client)
+        response = client.post(reverse('api_token_refresh'), {'refresh': tokens['refresh']})
+        assert response.status_code == 200
+        assert response.json()['refresh'] != tokens['refresh']
+        # The old refresh token is spent
+        response = client.post(reverse('api_token_refresh'), {'refresh': tokens['refresh']})
+        assert response.status_code == 401
+
+    def test_refresh_rejects_inactive_user(self, client, api_user):
+        tokens = obtain(client)
+        User.objects.filter(pk=api_user.pk).update(is_active=False)
+        response = client.post(reverse('api_token_refresh'), {'refresh': tokens['refresh']})
+        assert response.status_code == 401
+
+    def test_password_change_revokes_refresh(self, client, api_user):
+        tokens = obtain(client)
+        api_user.set_password('ChangedPass123')
+        api_user.save()
+        response = client.post(reverse('api_token_refresh'), {'refresh': tokens['refresh']})
+        assert response.status_code == 401
+        # Tokens issued for the new password work
+        response = client.post(reverse('api_token_refresh'), {'refresh': api_auth.issue_tokens(api_user)['refresh']})
+        assert response.status_code == 200
+
+    def test_access_token_cannot_refresh(self, client, api_user):
+        tokens = obtain(client)
+        response = client.post(reverse('api_token_refresh'), {'refresh': tokens['access']})
+        assert response.status_code == 401
+
+    def test_revoke(self, client, api_user):
+        tokens = obtain(client)
+        response = client.post(
+            reverse('api_token_revoke'), {'refresh': tokens['refresh']}, **bearer(tokens['access'])
+        )
+        assert response.json() == {'revoked': 2}
+        assert client.get(reverse('api_me'), **bearer(tokens['access'])).status_code == 401
+        response = client.post(reverse('api_token_refresh'), {'refresh': tokens['refresh']})
+        assert response.status_code == 401
+
+    def test_expired_token(self, client, api_user, settings):
+        settings.API_ACCESS_TOKEN_LIFETIME = -1
+        tokens = api_auth.issue_tokens(api_user)
+        response = client.get(reverse('api_me'), **bearer(tokens['access']))
+        assert response.status_code == 401
+        assert response.json()['detail'] == 'Token expired.'
+
+    def test_tampered_token(self, client, api_user):
+        claims = api_auth.verify_token(api_auth.issue_tokens(api_user)['access'])
+        claims['su'] = True
+        forged = signing.dumps(claims, key='not-the-secret', salt=api_auth.SALT, compress=True)
+        response = client.get(reverse('api_me'), **bearer(forged))
+        assert response.status_code == 401
+
+    def test_session_users_still_work(self, client, api_user):
+        client.login(username='apiuser', password='ApiPass123')
+        assert client.get(reverse('api_me')).json()['username'] == 'api@example.com'
+        assert client.get(reverse('api_me'), HTTP_AUTHORIZATION='').status_code == 200
+
+    def test_bearer_token_is_ignored_by_html_views(self, client, api_user):
+        token = obtain(client)['access']
+        response = client.get(reverse('profile_update'), **bearer(token))
+        assert response.status_code == 302  # Anonymous: sent to the login page
+        assert reverse('login') in response['Location']
+        # CSRF still applies
+        csrf_client = type(client)(enforce_csrf_checks=True)
+        response = csrf_client.post(reverse('profile_update'), {'username': 'x'}, **bearer(token))
+        assert response.status_code == 403
@@ -0,0 +1,81 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from django.core import mail
+from accounts.mail import deliver_pending
+from django.contrib.auth import get_user_model
+from accounts.link_tokens import activation_token
+from django.utils.http import urlsafe_base64_encode
+from django.utils.encoding import force_bytes
+from accounts.auth_backend import aauthenticate
+
+User = get_user_model()
+
+def run(awaitable):
+    async def wrapper():
+        return await awaitable
+    return async_to_sync(wrapper)()
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    def test_registration(self, async_client):
+        response = run(async_client.post(reverse('aregister'), {
+            'username': 'asyncuser',
+            'email': 'asyncuser@example.com',
+            'password1': 'TestPass123',
+            'password2': 'TestPass123',
+        }))
+        assert response.status_code == 302
+        user = User.objects.get(email='asyncuser@example.com')
+        assert not user.is_active
+        assert deliver_pending() == (1, 0)
+        assert len(mail.outbox) == 1
+
+    def test_activation(self, async_client):
+        user = User.objects.create_user(
+            username='asyncuser',
+            email='asyncuser@example.com',
+            password='TestPass123',
+        )
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = activation_token.make_token(user)
+        response = run(async_client.get(reverse('aactivate', kwargs={'uidb64': uid, 'token': token})))
+        assert response.status_code == 302
+        user.refresh_from_db()
+        assert user.is_active
+
+    def test_login_with_email(self, async_client):
+        User.objects.create_user(
+            username='asyncuser',
+            email='asyncuser@example.com',
+            password='TestPass123',
+            is_active=True
+        )
+        response = run(async_client.post(reverse('alogin'), {
+            'username': 'AsyncUser@example.com',
+            'password': 'TestPass123',
+        }))
+        assert response.status_code == 302
+        assert '_auth_user_id' in async_client.session
+
+    def test_login_invalid_credentials(self, async_client):
+        User.objects.create_user(
+            username='asyncuser',
+            email='asyncuser@example.com',
+            password='TestPass123',
+            is_active=True
+        )
+        response = run(async_client.post(reverse('alogin'), {
+            'username': 'asyncuser',
+            'password': 'WrongPass123',
+        }))
+        assert response.status_code == 200
+        assert 'Invalid credentials.' in response.content.decode()
+
+    def test_aauthenticate_rejects_inactive_user(self):
+        User.objects.create_user(
+            username='inactive',
+            email='inactive@example.com',
+            password='TestPass123',
+        )
+        assert run(aauthenticate(username='inactive', password='TestPass123')) is None
@@ -0,0 +1,156 @@
+import json
+from datetime import timedelta
+from io import StringIO
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.utils import timezone
+from accounts import hashing
+from accounts.models import ArchivedUser
+
+User = get_user_model()
+
+
+def run_command(*args, **options):
+    stdout, stderr = StringIO(), StringIO()
+    call_command(*args, stdout=stdout, stderr=stderr, **options)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportUsers:
+    def test_import_csv_with_hashed_and_raw_passwords(self, tmp_path):
+        hashed = make_password('HashedPass123')
+        path = tmp_path / 'users.csv'
+        path.write_text(
+            'username,email,password,raw_password,is_active\n'
+            f'alice,Alice@Example.com,{hashed},,true\n'
+            'bob,bob@example.com,,RawPass123,false\n'
+        )
+        run_command('import_users', str(path), '--workers', '0')
+        alice = User.objects.get(username='alice')
+        assert alice.email == 'Alice@example.com'
+        assert alice.email_lower == 'alice@example.com'
+        assert alice.is_active
+        assert alice.check_password('HashedPass123')
+        bob = User.objects.get(username='bob')
+        assert not bob.is_active
+        assert bob.check_password('RawPass123')
+
+    def test_duplicates_and_invalid_rows_are_reported(self, tmp_path):
+        User.objects.create_user(username='taken', email='taken@example.com', password='x')
+        path = tmp_path / 'users.jsonl'
+        rows = [
+            {'username': 'TAKEN', 'email': 'new1@example.com', 'raw_password': 'Pass12345'},
+            {'username': 'new2', 'email': 'Taken@example.com', 'raw_password': 'Pass12345'},
+            {'username': 'new3', 'email': 'new3@example.com', 'raw_password': 'Pass12345'},
+            {'username': 'New3', 'email': 'other@example.com', 'raw_password': 'Pass12345'},
+            {'username': 'new4', 'email': 'not-an-email', 'raw_password': 'Pass12345'},
+            {'username': 'new5', 'email': 'new5@example.com', 'password': 'plaintext'},
+        ]
+        path.write_text('\n'.join(json.dumps(row) for row in rows))
+        stdout, stderr = run_command('import_users', str(path), '--workers', '0')
+        assert list(User.objects.order_by('username').values_list('username', flat=True)) == ['new3', 'taken']
+        assert "row 1: username 'TAKEN' already exists" in stderr
+        assert "row 2: email 'Taken@example.com' already exists" in stderr
+        assert 'row 4: duplicate of an earlier row' in stderr
+        assert "row 5: invalid email" in stderr
+        assert 'row 6: password is not in a known hasher format' in stderr
+        assert 'Imported 1 users, skipped 5 rows' in stdout
+
+    def test_resume_from_checkpoint(self, tmp_path):
+        path = tmp_path / 'users.csv'
+        lines = ['username,email,password']
+        lines += [f'user{i},user{i}@example.com,!' for i in range(5)]
+        path.write_text('\n'.join(lines) + '\n')
+        checkpoint = tmp_path / 'import.checkpoint'
+        checkpoint.write_text('3')
+        run_command('import_users', str(path), '--checkpoint', str(checkpoint), '--workers', '0')
+        assert sorted(User.objects.values_list('username', flat=True)) == ['user3', 'user4']
+        assert checkpoint.read_text() == '5'
+
+    def test_pool_is_only_started_for_raw_passwords(self, tmp_path, monkeypatch):
+        def no_pool(size):
+            raise AssertionError('hashing pool started')
+
+        monkeypatch.setattr(hashing, 'create_pool', no_pool)
+        path = tmp_path / 'users.csv'
+        path.write_text(f'username,email,password\nhashed,hashed@example.com,{make_password("HashedPass123")}\n')
+        run_command('import_users', str(path), '--workers', '4')
+        assert User.objects.filter(username='hashed').exists()
+
+
+@pytest.mark.django_db
+class TestExportUsers:
+    def test_export_csv(self):
+        User.objects.create_user(username='alice', email='alice@example.com', password='x', is_active=True)
+        User.objects.create_user(username='bob', email='bob@example.com', password='x')
+        stdout, _ = run_command('export_users', '--chunk-size', '1')
+        lines = stdout.splitlines()
+        assert lines[0] == 'id,username,email,is_active,is_staff,is_superuser,last_login'
+        assert lines[1].split(',')[1:4] == ['alice', 'alice@example.com', 'True']
+        assert lines[2].split(',')[1:3] == ['bob', 'bob@example.com']
+        assert 'pbkdf2' not in stdout
+
+    def test_export_jsonl_to_file(self, tmp_path):
+        User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        output = tmp_path / 'users.jsonl'
+        _, stderr = run_command('export_users', '--format', 'jsonl', '--output', str(output))
+        record = json.loads(output.read_text())
+        assert record['username'] == 'alice'
+        assert 'password' not in record
+        assert 'Exported 1 users' in stderr
+
+
+@pytest.mark.django_db
+class TestPurgeInactiveUsers:
+    @pytest.fixture
+    def users(self):
+        old = timezone.now() - timedelta(days=30)
+        stale = [
+            User.objects.create(username=f'stale{i}', email=f'stale{i}@example.com', date_joined=old)
+            for i in range(5)
+        ]
+        kept = [
+            User.objects.create(username='active', email='active@example.com', is_active=True, date_joined=old),
+            User.objects.create(username='staff', email='staff@example.com', is_staff=True, date_joined=old),
+            User.objects.create(username='lapsed', email='lapsed@example.com', last_login=old, date_joined=old),
+            User.objects.create(username='recent', email='recent@example.com'),
+        ]
+        return stale, kept
+
+    def test_deletes_stale_registrations_in_batches(self, users):
+        stale, kept = users
+        stdout, _ = run_command('purge_inactive_users', '--batch-size', '2')
+        assert 'Deleted 5 inactive users' in stdout
+        assert stdout.count('last_pk=') == 4  # pk ranges up to the first recent user
+        assert set(User.objects.values_list('username', flat=True)) == {user.username for user in kept}
+        assert not User.objects.filter(pk__in=[user.pk for user in stale]).exists()
+
+    def test_archive(self, users):
+        stale, _ = users
+        run_command('purge_inactive_users', '--archive')
+        archived = ArchivedUser.objects.order_by('original_id')
+        assert [a.original_id for a in archived] == [user.pk for user in stale]
+        assert archived[0].email == 'stale0@example.com'
+
+    def test_dry_run(self, users):
+        stdout, _ = run_command('purge_inactive_users', '--dry-run')
+        assert 'Would remove 5 inactive users' in stdout
+        assert User.objects.count() == 9
+
+    def test_days(self, users):
+        stdout, _ = run_command('purge_inactive_users', '--days', '60')
+        assert 'Nothing to purge.' in stdout
+
+    def test_resume_from_checkpoint(self, users, tmp_path):
+        stale, _ = users
+        checkpoint = tmp_path / 'purge.checkpoint'
+        checkpoint.write_text(str(stale[2].pk))
+        stdout, _ = run_command('purge_inactive_users', '--checkpoint', str(checkpoint))
+        assert f'Resuming after pk {stale[2].pk}.' in stdout
+        assert set(User.objects.filter(username__startswith='stale').values_list('username', flat=True)) == {
+            'stale0', 'stale1', 'stale2'
+        }
+        assert int(checkpoint.read_text()) > stale[-1].pk
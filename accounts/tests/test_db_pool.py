@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+from django.db.utils import ConnectionHandler
+
+from accounts import db_pool
+from accounts.instrumentation import registry
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        if not self.healthy:
+            raise RuntimeError('connection lost')
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def test_released_connection_is_reused():
+    pool = db_pool.ConnectionPool('test', max_size=2)
+    first = pool.acquire(FakeConnection)
+    pool.release(first)
+    assert pool.acquire(FakeConnection) is first
+    assert first.rollbacks == 1
+    assert registry.counters[('accounts_db_pool_connects_total', (('alias', 'test'),))] == 1
+
+
+def test_checkout_waits_for_a_free_connection():
+    pool = db_pool.ConnectionPool('test', max_size=1, timeout=5)
+    held = pool.acquire(FakeConnection)
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    assert pool.acquire(FakeConnection) is held
+
+
+def test_exhausted_pool_times_out():
+    pool = db_pool.ConnectionPool('test', max_size=1, timeout=0.01)
+    pool.acquire(FakeConnection)
+    with pytest.raises(db_pool.PoolTimeout):
+        pool.acquire(FakeConnection)
+    assert registry.counters[('accounts_db_pool_timeouts_total', (('alias', 'test'),))] == 1
+
+
+def test_unusable_idle_connection_is_replaced():
+    pool = db_pool.ConnectionPool('test', max_size=1)
+    stale = pool.acquire(FakeConnection)
+    pool.release(stale)
+    fresh = pool.acquire(FakeConnection, check=lambda conn: conn is not stale)
+    assert fresh is not stale
+    assert stale.closed
+    assert pool.size == 1
+
+
+def test_connection_failing_rollback_is_discarded():
+    pool = db_pool.ConnectionPool('test', max_size=1)
+    broken = pool.acquire(lambda: FakeConnection(healthy=False))
+    pool.release(broken)
+    assert broken.closed
+    assert pool.size == 0 and pool.idle == []
+
+
+def test_failed_connect_frees_its_slot():
+    pool = db_pool.ConnectionPool('test', max_size=1)
+
+    def refuse():
+        raise OSError('refused')
+
+    with pytest.raises(OSError):
+        pool.acquire(refuse)
+    assert pool.size == 0
+
+
+def test_metrics_are_exported():
+    pool = db_pool.ConnectionPool('test', max_size=3)
+    pool.acquire(FakeConnection)
+    text = registry.render()
+    assert 'accounts_db_pool_connections{alias="test",state="in_use"} 1' in text
+    assert 'accounts_db_pool_max_size{alias="test"} 3' in text
+    assert 'accounts_db_pool_wait_seconds_count{alias="test"} 1' in text
+
+
+@pytest.mark.django_db
+def test_pooled_backend_shares_connections_between_threads(tmp_path):
+    handler = ConnectionHandler({
+        'default': {
+            'ENGINE': 'accounts.db_backends.sqlite3',
+            'NAME': str(tmp_path / 'pooled.sqlite3'),
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 5},
+        },
+    })
+    raw = []
+
+    def request_cycle():
+        connection = handler['default']
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw.append(connection.connection)
+        connection.close_if_unusable_or_obsolete()  # As at the end of a request
+        raw.append(connection.connection)
+
+    try:
+        for _ in range(2):
+            thread = threading.Thread(target=request_cycle)
+            thread.start()
+            thread.join()
+        first, after_first, second, after_second = raw
+        assert first is second
+        assert after_first is None and after_second is None
+    finally:
+        db_pool._pools.pop('default').close_idle()
@@ -0,0 +1,110 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts import db_router, user_cache
+
+User = get_user_model()
+
+# 'default' is the primary and 'replica' a separate SQLite database standing
+# in for a replica. Nothing copies rows between them, so a row written only
+# to the primary is exactly what a lagging replica looks like.
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'])
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+
+
+def make_user(username='replicated', is_active=True, replicate=True):
+    user = User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='ReplicaPass123',
+        is_active=is_active,
+    )
+    if replicate:
+        User.objects.filter(pk=user.pk).first().save(using='replica', force_insert=True)
+    return user
+
+
+def user_queries(captured):
+    return [q['sql'] for q in captured.captured_queries if 'FROM "accounts_user"' in q['sql']]
+
+
+class TestReplicaRouter:
+    def test_reads_use_replicas_only_inside_requests(self):
+        router = db_router.ReplicaRouter()
+        assert router.db_for_read(User) is None
+        token = db_router._state.set(db_router.RoutingState())
+        try:
+            assert router.db_for_read(User) == 'replica'
+        finally:
+            db_router._state.reset(token)
+
+    def test_write_pins_the_rest_of_the_request(self):
+        router = db_router.ReplicaRouter()
+        state = db_router.RoutingState()
+        token = db_router._state.set(state)
+        try:
+            assert router.db_for_write(User) == 'default'
+            assert router.db_for_read(User) is None
+            assert state.wrote
+        finally:
+            db_router._state.reset(token)
+
+
+class TestReplicaReads:
+    def test_login_looks_up_credentials_on_the_replica(self, client):
+        make_user()
+        with CaptureQueriesContext(connections['replica']) as replica:
+            with CaptureQueriesContext(connections['default']) as primary:
+                response = client.post(reverse('login'), {'username': 'replicated', 'password': 'ReplicaPass123'})
+        assert response.status_code == 302
+        assert user_queries(replica)
+        # The primary only records the session; last_login is written in batches
+        assert not any(sql.startswith('SELECT') for sql in user_queries(primary))
+
+    def test_user_registered_moments_ago_can_log_in(self, client):
+        make_user(replicate=False)
+        response = client.post(reverse('login'), {'username': 'replicated', 'password': 'ReplicaPass123'})
+        assert response.status_code == 302
+
+    def test_user_activated_moments_ago_can_log_in(self, client):
+        user = make_user(is_active=False)
+        user.is_active = True
+        user.save()  # Not replicated yet
+        response = client.post(reverse('login'), {'username': 'replicated', 'password': 'ReplicaPass123'})
+        assert response.status_code == 302
+
+    def test_writing_client_keeps_reading_from_the_primary(self, client):
+        make_user(replicate=False)
+        response = client.post(reverse('login'), {'username': 'replicated', 'password': 'ReplicaPass123'})
+        assert db_router.PIN_COOKIE in response.cookies
+        # The session and user rows exist only on the primary
+        assert client.get(reverse('profile_update')).status_code == 200
+        del client.cookies[db_router.PIN_COOKIE]
+        assert client.get(reverse('profile_update')).status_code == 302
+
+    def test_register_is_served_from_the_primary(self, client):
+        make_user(replicate=False)
+        # Uniqueness must be checked against the primary
+        response = client.post(reverse('register'), {
+            'username': 'replicated',
+            'email': 'other@example.com',
+            'password1': 'ReplicaPass123',
+            'password2': 'ReplicaPass123',
+        })
+        assert response.status_code == 200
+        assert 'username' in response.context['form'].errors
+
+    def test_recently_changed_user_is_loaded_from_the_primary(self):
+        user = make_user(replicate=False)
+        token = db_router._state.set(db_router.RoutingState())
+        try:
+            assert user_cache.get_cached_user(user.pk) == user
+        finally:
+            db_router._state.reset(token)
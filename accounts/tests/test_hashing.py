@@ -0,0 +1,97 @@
+import threading
+import pytest
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from accounts import hashing
+from accounts.hashers import CalibratedScryptPasswordHasher
+from accounts.tests.test_commands import run_command
+
+User = get_user_model()
+
+
+@pytest.fixture
+def hashing_pool(settings):
+    # Off by default; these tests exercise the pool itself
+    settings.PASSWORD_HASHING_POOL_SIZE = 2
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('hashing_pool')
+class TestHashingPool:
+    def test_pool_hashes_and_verifies(self):
+        encoded = hashing.make_password('PoolPass123')
+        assert encoded.startswith('scrypt$')
+        assert hashing.check_password('PoolPass123', encoded)
+        assert not hashing.check_password('WrongPass123', encoded)
+
+    def test_async_verify(self):
+        encoded = hashing.make_password('PoolPass123')
+        assert async_to_sync(hashing.acheck_password)('PoolPass123', encoded)
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        user = User.objects.create_user(
+            username='legacyhash',
+            email='legacyhash@example.com',
+            is_active=True
+        )
+        User.objects.filter(pk=user.pk).update(password=make_password('LegacyPass123', hasher='pbkdf2_sha1'))
+        user.refresh_from_db()
+        assert user.check_password('LegacyPass123')
+        user.refresh_from_db()
+        assert user.password.startswith('scrypt$')
+
+    def test_full_queue_returns_503(self, client, monkeypatch):
+        User.objects.create_user(
+            username='busyuser',
+            email='busy@example.com',
+            password='BusyPass123',
+            is_active=True
+        )
+        hashing._get_executor()
+        exhausted = threading.BoundedSemaphore(1)
+        exhausted.acquire()
+        monkeypatch.setattr(hashing, '_slots', exhausted)
+        response = client.post(reverse('login'), {
+            'username': 'busyuser',
+            'password': 'BusyPass123',
+        })
+        assert response.status_code == 503
+        assert response['Retry-After'] == '1'
+
+
+@pytest.mark.django_db
+class TestCalibratedHashers:
+    @pytest.mark.usefixtures('hashing_pool')
+    def test_parameter_change_rehashes_on_login(self, client, settings):
+        settings.PASSWORD_HASHER_PARAMS = {'scrypt': {'work_factor': 2 ** 12, 'block_size': 8, 'parallelism': 1}}
+        User.objects.create_user(
+            username='rehash', email='rehash@example.com', password='RehashPass123', is_active=True
+        )
+        assert User.objects.get(username='rehash').password.startswith('scrypt$4096$')
+        settings.PASSWORD_HASHER_PARAMS = {'scrypt': {'work_factor': 2 ** 13, 'block_size': 8, 'parallelism': 1}}
+        response = client.post(reverse('login'), {'username': 'rehash', 'password': 'RehashPass123'})
+        assert response.status_code == 302
+        # Hashed in the pool, whose workers still have the old settings
+        assert User.objects.get(username='rehash').password.startswith('scrypt$8192$')
+
+    def test_failed_login_does_not_rehash(self, settings):
+        user = User.objects.create_user(username='norehash', email='norehash@example.com', password='NoRehash123')
+        encoded = user.password
+        settings.PASSWORD_HASHER_PARAMS = {'scrypt': {'work_factor': 2 ** 13}}
+        assert not user.check_password('WrongPass123')
+        user.refresh_from_db()
+        assert user.password == encoded
+
+    def test_large_work_factor_needs_no_maxmem(self):
+        hasher = CalibratedScryptPasswordHasher(work_factor=2 ** 15)
+        encoded = hasher.encode('BigPass123', hasher.salt())
+        assert hasher.verify('BigPass123', encoded)
+
+    def test_pool_is_off_by_default(self):
+        assert hashing._get_executor() is None
+
+    def test_calibrate_command(self):
+        stdout, _ = run_command('calibrate_hashers', '--algorithm', 'scrypt', '--target-ms', '1', '--samples', '1')
+        assert "PASSWORD_HASHER_PARAMS = {'scrypt': {'work_factor': 4096" in stdout
@@ -0,0 +1,121 @@
+import time
+import pytest
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from accounts import identifier_filter
+from accounts.identifier_filter import BloomFilter
+from accounts.tests import test_views
+from accounts.tests.test_commands import run_command
+
+User = get_user_model()
+
+
+@pytest.fixture
+def enabled(settings, tmp_path):
+    settings.IDENTIFIER_FILTER_ENABLED = True
+    settings.IDENTIFIER_FILTER_SNAPSHOT = str(tmp_path / 'filter.bin')
+    yield settings
+    identifier_filter._install(None, 0.0, 0)
+
+
+@pytest.fixture
+def member(db):
+    return User.objects.create_user(
+        username='FilterUser', email='filter@example.com', password='FilterPass123', is_active=True
+    )
+
+
+def test_bloom_filter():
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f'user{i}')
+    assert all(f'user{i}' in bloom for i in range(1000))
+    false_positives = sum(f'other{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.django_db
+class TestIdentifierFilter:
+    def test_unknown_identifier_skips_the_database(self, enabled, member):
+        identifier_filter.rebuild()
+        with CaptureQueriesContext(connection) as captured:
+            assert authenticate(username='nobody@example.com', password='whatever') is None
+        assert len(captured) == 0
+        assert authenticate(username='filteruser', password='FilterPass123') == member
+
+    def test_new_users_are_added(self, enabled, member):
+        identifier_filter.rebuild()
+        User.objects.create_user(username='late', email='late@example.com', password='LatePass123', is_active=True)
+        assert authenticate(username='late@example.com', password='LatePass123') is not None
+
+    def test_imported_users_can_log_in(self, enabled, member, tmp_path):
+        identifier_filter.rebuild()
+        path = tmp_path / 'users.csv'
+        path.write_text('username,email,raw_password,is_active\nimported,imported@example.com,ImportPass123,true\n')
+        run_command('import_users', str(path), '--workers', '0')
+        assert authenticate(username='imported@example.com', password='ImportPass123') is not None
+        assert authenticate(username='Imported', password='ImportPass123') is not None
+
+    def test_backfilled_identifiers_are_added(self, enabled, member):
+        identifier_filter.rebuild()
+        User.objects.filter(pk=member.pk).update(username_lower='', email_lower='')
+        identifier_filter._install(BloomFilter.for_capacity(10, 0.01), time.time(), 0)
+        cache.clear()
+        run_command('backfill_lookup_fields')
+        assert authenticate(username='filter@example.com', password='FilterPass123') == member
+
+    def test_saves_in_other_processes_are_seen_through_the_cache(self, enabled, member):
+        identifier_filter.rebuild()
+        # Another worker's save: its filter isn't ours, only the cache is shared
+        stale = identifier_filter._state.filter
+        User.objects.filter(pk=member.pk).update(email='changed@example.com', email_lower='changed@example.com')
+        identifier_filter.add(['changed@example.com'])
+        identifier_filter._install(stale, time.time(), 0)
+        assert identifier_filter.might_exist('changed@example.com')
+
+    def test_snapshot_warm_start(self, enabled, member):
+        run_command('build_identifier_filter')
+        identifier_filter._install(None, 0.0, 0)
+        User.objects.create_user(username='after', email='after@example.com', password='x')
+        cache.clear()  # Only the snapshot and the catch-up query can know about the users
+        assert identifier_filter.load_snapshot()
+        assert identifier_filter.might_exist('filteruser')
+        assert identifier_filter.might_exist('after@example.com')
+        assert not identifier_filter.might_exist('nobody@example.com')
+
+    def test_stale_snapshot_is_ignored(self, enabled, member):
+        identifier_filter.rebuild()
+        enabled.IDENTIFIER_FILTER_RECENT_TTL = 0
+        identifier_filter._install(None, 0.0, 0)
+        assert not identifier_filter.load_snapshot()
+
+    def test_old_filter_is_not_trusted(self, enabled, member, monkeypatch):
+        identifier_filter.rebuild()
+        monkeypatch.setattr(identifier_filter, '_rebuild_in_background', lambda: None)
+        identifier_filter._state.built_at -= enabled.IDENTIFIER_FILTER_RECENT_TTL
+        assert identifier_filter.get_filter() is None
+        assert identifier_filter.might_exist('nobody@example.com')
+
+    def test_unknown_identifier_still_runs_the_hasher(self, enabled, member, monkeypatch):
+        identifier_filter.rebuild()
+        hashed = []
+        monkeypatch.setattr(User, 'set_password', lambda self, raw: hashed.append(raw))
+        authenticate(username='nobody@example.com', password='whatever')
+        assert hashed == ['whatever']
+
+
+class FilterOn:
+    @pytest.fixture(autouse=True)
+    def filter_on(self, enabled, db):
+        identifier_filter.rebuild()
+        assert identifier_filter.get_filter() is not None
+
+
+class TestRegistrationViewWithFilter(FilterOn, test_views.TestRegistrationView):
+    pass
+
+
+class TestLoginViewWithFilter(FilterOn, test_views.TestLoginView):
+    pass
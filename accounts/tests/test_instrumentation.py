@@ -0,0 +1,125 @@
+import pytest
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from accounts.link_tokens import activation_token
+from django.utils.http import urlsafe_base64_encode
+from django.utils.encoding import force_bytes
+from accounts.instrumentation import registry
+
+User = get_user_model()
+
+# Exact query counts per view. Changing one should be a deliberate decision, not an N+1 slipping in.
+# A new session costs 7 queries: key check, then insert and save, each inside a savepoint.
+REGISTER_QUERIES = 5  # 3 uniqueness checks, user insert, queued mail insert
+ACTIVATE_QUERIES = 9  # user fetch, user save, new session; last_login is batched (accounts.login_audit)
+LOGIN_QUERIES = 8  # credential lookup, new session; last_login is batched (accounts.login_audit)
+FAILED_LOGIN_QUERIES = 1  # credential lookup; the audit event is batched
+PASSWORD_RESET_QUERIES = 2  # user lookup, one insert for all queued mail
+PROFILE_VIEW_QUERIES = 1  # session only; the user comes from the user cache
+PROFILE_UPDATE_QUERIES = 4  # session, 2 uniqueness checks, user save
+
+
+@pytest.fixture
+def active_user():
+    return User.objects.create_user(
+        username='budgetuser',
+        email='budget@example.com',
+        password='BudgetPass123',
+        is_active=True
+    )
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    def test_register(self, client, django_assert_num_queries):
+        with django_assert_num_queries(REGISTER_QUERIES):
+            response = client.post(reverse('register'), {
+                'username': 'newuser',
+                'email': 'newuser@example.com',
+                'password1': 'TestPass123',
+                'password2': 'TestPass123',
+            })
+        assert response.status_code == 302
+
+    def test_activate(self, client, django_assert_num_queries):
+        user = User.objects.create_user(username='inactive', email='inactive@example.com', password='TestPass123')
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = activation_token.make_token(user)
+        with django_assert_num_queries(ACTIVATE_QUERIES):
+            response = client.get(reverse('activate', kwargs={'uidb64': uid, 'token': token}))
+        assert response.status_code == 302
+
+    def test_login(self, client, active_user, django_assert_num_queries):
+        with django_assert_num_queries(LOGIN_QUERIES):
+            response = client.post(reverse('login'), {'username': 'budgetuser', 'password': 'BudgetPass123'})
+        assert response.status_code == 302
+
+    def test_failed_login(self, client, active_user, django_assert_num_queries):
+        with django_assert_num_queries(FAILED_LOGIN_QUERIES):
+            response = client.post(reverse('login'), {'username': 'budgetuser', 'password': 'WrongPass123'})
+        assert response.status_code == 200
+
+    def test_password_reset_request(self, client, active_user, django_assert_num_queries):
+        with django_assert_num_queries(PASSWORD_RESET_QUERIES):
+            response = client.post(reverse('password_reset'), {'email': 'budget@example.com'})
+        assert response.status_code == 302
+
+    def test_profile_update(self, client, active_user, django_assert_num_queries):
+        client.force_login(active_user)
+        client.get(reverse('profile_update'))  # Warm the user cache
+        with django_assert_num_queries(PROFILE_VIEW_QUERIES):
+            response = client.get(reverse('profile_update'))
+        assert response.status_code == 200
+        with django_assert_num_queries(PROFILE_UPDATE_QUERIES):
+            response = client.post(reverse('profile_update'), {'username': 'renamed', 'email': 'renamed@example.com'})
+        assert response.status_code == 302
+
+
+@pytest.mark.django_db
+class TestInstrumentation:
+    @pytest.fixture(autouse=True)
+    def sample_everything(self, settings):
+        settings.INSTRUMENTATION_SAMPLE_RATE = 1.0
+        settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+        registry.reset()
+
+    def test_login_is_recorded(self, client, active_user):
+        client.post(reverse('login'), {'username': 'budgetuser', 'password': 'BudgetPass123'})
+        output = client.get(reverse('metrics')).content.decode()
+        assert 'accounts_requests_total{view="login"} 1' in output
+        assert 'accounts_sampled_requests_total{view="login"} 1' in output
+        assert 'accounts_hashing_operations_total{view="login"} 1' in output
+        assert 'accounts_request_seconds_count{view="login"} 1' in output
+        db_ops = [line for line in output.splitlines() if line.startswith('accounts_db_operations_total{view="login"}')]
+        assert int(db_ops[0].split()[-1]) > 0
+
+    def test_templates_and_cache_are_timed(self, client):
+        client.get(reverse('login'))
+        client.post(reverse('login'), {'username': 'nobody', 'password': 'WrongPass123'})
+        output = registry.render()
+        assert 'accounts_template_operations_total{view="login"} 2' in output
+        assert 'accounts_cache_operations_total{view="login"}' in output
+
+    def test_unsampled_requests_are_only_counted(self, client, settings):
+        settings.INSTRUMENTATION_SAMPLE_RATE = 0.0
+        client.get(reverse('login'))
+        output = registry.render()
+        assert 'accounts_requests_total{view="login"} 1' in output
+        assert 'accounts_sampled_requests_total{view="login"}' not in output
+
+    def test_metrics_hidden_from_external_clients(self, client):
+        response = client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9')
+        assert response.status_code == 404
+
+    def test_local_addresses_are_not_trusted_by_default(self, client, settings):
+        # Behind a reverse proxy on the same host every client arrives from 127.0.0.1
+        settings.METRICS_ALLOWED_IPS = []
+        assert client.get(reverse('metrics')).status_code == 404
+
+    def test_metrics_for_staff(self, client, settings):
+        settings.METRICS_ALLOWED_IPS = []
+        staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='x', is_staff=True, is_active=True
+        )
+        client.force_login(staff)
+        assert client.get(reverse('metrics')).status_code == 200
@@ -0,0 +1,167 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core import signing
+from django.db import DatabaseError
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from accounts import link_tokens
+from accounts.link_tokens import InvalidToken, activation_token, password_reset_token
+
+User = get_user_model()
+
+
+@pytest.fixture
+def inactive_user(db):
+    return User.objects.create_user(username='linkuser', email='link@example.com', password='LinkPass123')
+
+
+def activation_url(user, token):
+    return reverse('activate', kwargs={'uidb64': urlsafe_base64_encode(force_bytes(user.pk)), 'token': token})
+
+
+def reset_url(user, token):
+    return reverse('password_reset_confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)), 'token': token,
+    })
+
+
+class TestLinkTokenGenerator:
+    def test_valid_token(self, inactive_user):
+        assert activation_token.check_token(inactive_user, activation_token.make_token(inactive_user))
+
+    def test_tokens_are_bound_to_their_purpose(self, inactive_user):
+        assert not password_reset_token.check_token(inactive_user, activation_token.make_token(inactive_user))
+
+    def test_expired_token_is_rejected(self, inactive_user, settings):
+        settings.ACTIVATION_TOKEN_LIFETIME = -1
+        with pytest.raises(InvalidToken, match='expired'):
+            activation_token.verify(activation_token.make_token(inactive_user))
+
+    def test_tampered_token_is_rejected(self, inactive_user):
+        token = activation_token.make_token(inactive_user)
+        forged = signing.dumps([inactive_user.pk, 2 ** 40, 'x' * 20], salt='wrong')
+        with pytest.raises(InvalidToken):
+            activation_token.verify(token[:-2] + 'xx')
+        with pytest.raises(InvalidToken):
+            activation_token.verify(forged)
+
+    def test_state_change_invalidates_token(self, inactive_user):
+        token = password_reset_token.make_token(inactive_user)
+        inactive_user.set_password('ChangedPass123')
+        assert not password_reset_token.check_token(inactive_user, token)
+
+    def test_consume_is_one_shot(self, inactive_user):
+        token = activation_token.make_token(inactive_user)
+        assert activation_token.consume(token)
+        assert not activation_token.consume(token)
+        with pytest.raises(InvalidToken, match='used'):
+            activation_token.verify(token)
+
+    def test_used_marker_expires_with_the_token(self, inactive_user, monkeypatch):
+        token = activation_token.make_token(inactive_user)
+        ttls = []
+        cache = link_tokens._used()
+        monkeypatch.setattr(link_tokens, '_used', lambda: type('C', (), {
+            'add': lambda self, key, value, ttl: ttls.append(ttl) or cache.add(key, value, ttl),
+        })())
+        activation_token.consume(token)
+        assert 0 < ttls[0] <= activation_token.lifetime + 1
+
+
+@pytest.mark.django_db
+class TestLinkViews:
+    def test_invalid_activation_link_runs_no_queries(self, client, inactive_user, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            response = client.get(activation_url(inactive_user, 'not-a-token'))
+        assert response.status_code == 200
+        assert 'invalid' in response.content.decode()
+
+    def test_replayed_activation_link_runs_no_queries(self, client, inactive_user, django_assert_num_queries):
+        url = activation_url(inactive_user, activation_token.make_token(inactive_user))
+        assert client.get(url).status_code == 302
+        client.logout()
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response.status_code == 200
+
+    def test_link_for_another_user_is_rejected(self, client, inactive_user):
+        other = User.objects.create_user(username='other', email='other@example.com', password='OtherPass123')
+        response = client.get(activation_url(other, activation_token.make_token(inactive_user)))
+        assert response.status_code == 200
+        other.refresh_from_db()
+        assert not other.is_active
+
+    def test_password_reset_link_works_once(self, client, inactive_user):
+        url = reset_url(inactive_user, password_reset_token.make_token(inactive_user))
+        response = client.get(url)
+        assert response.status_code == 302  # To the set-password form
+        response = client.post(response.url, {'new_password1': 'NewLinkPass123', 'new_password2': 'NewLinkPass123'})
+        assert response.status_code == 302
+        inactive_user.refresh_from_db()
+        assert inactive_user.check_password('NewLinkPass123')
+        response = client.get(url)
+        assert response.status_code == 200
+        assert not response.context['validlink']
+
+    def test_expired_reset_link_runs_no_queries(self, client, inactive_user, settings, django_assert_num_queries):
+        settings.PASSWORD_RESET_TIMEOUT = -1
+        url = reset_url(inactive_user, password_reset_token.make_token(inactive_user))
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response.status_code == 200
+        assert not response.context['validlink']
+
+    def test_failed_activation_save_keeps_the_link(self, client, inactive_user, monkeypatch):
+        token = activation_token.make_token(inactive_user)
+
+        def broken_save(self, *args, **kwargs):
+            raise DatabaseError('database down')
+
+        monkeypatch.setattr(User, 'save', broken_save)
+        with pytest.raises(DatabaseError):
+            client.get(activation_url(inactive_user, token))
+        monkeypatch.undo()
+        assert client.get(activation_url(inactive_user, token)).status_code == 302
+        inactive_user.refresh_from_db()
+        assert inactive_user.is_active
+
+    def test_stale_link_does_not_log_in_an_active_user(self, client, inactive_user):
+        token = activation_token.make_token(inactive_user)
+        User.objects.filter(pk=inactive_user.pk).update(is_active=True)
+        response = client.get(activation_url(inactive_user, token))
+        assert response.status_code == 200
+        assert '_auth_user_id' not in client.session
+
+
+@pytest.mark.django_db
+class TestLegacyLinks:
+    def test_legacy_activation_link_works_once(self, client, inactive_user):
+        url = activation_url(inactive_user, default_token_generator.make_token(inactive_user))
+        assert client.get(url).status_code == 302
+        inactive_user.refresh_from_db()
+        assert inactive_user.is_active
+        client.logout()
+        assert client.get(url).status_code == 200  # activation_invalid
+
+    def test_legacy_reset_link(self, client, inactive_user):
+        response = client.get(reset_url(inactive_user, default_token_generator.make_token(inactive_user)))
+        assert response.status_code == 302
+        response = client.post(response.url, {'new_password1': 'NewLinkPass123', 'new_password2': 'NewLinkPass123'})
+        assert response.status_code == 302
+        inactive_user.refresh_from_db()
+        assert inactive_user.check_password('NewLinkPass123')
+
+    def test_legacy_link_with_bad_uid(self, client, inactive_user):
+        token = default_token_generator.make_token(inactive_user)
+        url = reverse('activate', kwargs={'uidb64': urlsafe_base64_encode(b'abc'), 'token': token})
+        assert client.get(url).status_code == 200
+
+    def test_legacy_links_can_be_turned_off(self, client, inactive_user, settings):
+        settings.LINK_TOKEN_ACCEPT_LEGACY = False
+        url = activation_url(inactive_user, default_token_generator.make_token(inactive_user))
+        assert client.get(url).status_code == 200
+        inactive_user.refresh_from_db()
+        assert not inactive_user.is_active
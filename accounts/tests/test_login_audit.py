@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import login_audit
+from accounts.link_tokens import password_reset_token
+from accounts.login_audit import writer
+from accounts.models import LoginEvent
+from accounts.tests.test_commands import run_command
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(
+        username='audited', email='audited@example.com', password='AuditPass123', is_active=True
+    )
+
+
+def log_in(client, password='AuditPass123', username='audited'):
+    return client.post(reverse('login'), {'username': username, 'password': password})
+
+
+@pytest.mark.django_db
+class TestLoginEvents:
+    def test_success_is_buffered_then_written(self, client, user):
+        assert log_in(client).status_code == 302
+        assert not LoginEvent.objects.exists()
+        user.refresh_from_db()
+        assert user.last_login is None  # No UPDATE during the request
+        assert writer.flush() == 1
+        event = LoginEvent.objects.get()
+        assert (event.user_id, event.identifier, event.ip, event.outcome) == (
+            user.pk, 'audited@example.com', '127.0.0.1', LoginEvent.SUCCESS,
+        )
+        user.refresh_from_db()
+        assert user.last_login == event.created_at
+
+    def test_failures_and_lockouts_are_recorded(self, client, user, settings):
+        settings.MAX_FAILED_ATTEMPTS = 2
+        for _ in range(3):
+            log_in(client, password='WrongPass123', username='Audited')
+        writer.flush()
+        events = LoginEvent.objects.order_by('pk')
+        assert set(events.values_list('identifier', 'user_id')) == {('audited', None)}
+        # The locked-out request still renders (and so authenticates) the bound form
+        assert list(events.values_list('outcome', flat=True)) == [
+            LoginEvent.FAILURE, LoginEvent.FAILURE, LoginEvent.LOCKED, LoginEvent.FAILURE,
+        ]
+
+    def test_async_login_is_recorded(self, user):
+        response = async_to_sync(AsyncClient().post)(
+            reverse('alogin'), {'username': 'audited', 'password': 'AuditPass123'}
+        )
+        assert response.status_code == 302
+        assert [event.outcome for event in writer.pending()] == [LoginEvent.SUCCESS]
+
+    def test_batch_is_one_insert_and_one_update(self, user, django_assert_max_num_queries):
+        other = User.objects.create_user(username='other', email='other@example.com', password='OtherPass123')
+        now = timezone.now()
+        for i, account in enumerate([user, other, user]):
+            when = now + timedelta(seconds=i)
+            login_audit.record(None, LoginEvent.SUCCESS, account.username, user_id=account.pk, last_login=when)
+        # Savepoint, INSERT, UPDATE, release
+        with django_assert_max_num_queries(4):
+            assert writer.flush() == 3
+        user.refresh_from_db()
+        assert user.last_login == now + timedelta(seconds=2)  # The newest of the batch
+
+    def test_full_batch_is_flushed_inline(self, user, settings):
+        settings.LOGIN_AUDIT_BATCH_SIZE = 2
+        login_audit.record(None, LoginEvent.FAILURE, 'someone')
+        assert not LoginEvent.objects.exists()
+        login_audit.record(None, LoginEvent.FAILURE, 'someone')
+        assert LoginEvent.objects.count() == 2 and not writer.pending()
+
+    def test_failed_flush_keeps_events(self, user, monkeypatch):
+        login_audit.record(None, LoginEvent.FAILURE, 'someone')
+
+        def broken(events, last_logins):
+            raise RuntimeError('database down')
+
+        monkeypatch.setattr(writer, '_write', broken)
+        with pytest.raises(RuntimeError):
+            writer.flush()
+        assert len(writer.pending()) == 1
+
+    def test_flush_runs_no_partition_ddl(self, user, monkeypatch):
+        def no_ddl(*args, **kwargs):
+            raise AssertionError('partition DDL in the write path')
+
+        monkeypatch.setattr(login_audit, 'ensure_partitions', no_ddl)
+        login_audit.record(None, LoginEvent.SUCCESS, 'audited', user_id=user.pk, last_login=timezone.now())
+        assert writer.flush() == 1
+        user.refresh_from_db()
+        assert user.last_login is not None
+
+    def test_reset_link_survives_the_last_login_flush(self, client, user):
+        log_in(client)
+        token = password_reset_token.make_token(User.objects.get(pk=user.pk))  # Built before the flush lands
+        writer.flush()
+        user.refresh_from_db()
+        assert user.last_login is not None
+        assert password_reset_token.check_token(user, token)
+
+    def test_backlog_is_bounded(self, settings):
+        settings.LOGIN_AUDIT_MAX_PENDING = 2
+        for name in ('first', 'second', 'third'):
+            login_audit.record(None, LoginEvent.FAILURE, name)
+        assert [event.identifier for event in writer.pending()] == ['second', 'third']
+
+
+@pytest.mark.django_db
+class TestHistory:
+    def test_recent_logins_newest_first_including_pending(self, user):
+        now = timezone.now()
+        LoginEvent.objects.bulk_create([
+            LoginEvent(created_at=now - timedelta(minutes=i), user_id=user.pk, identifier='audited',
+                       outcome=LoginEvent.SUCCESS)
+            for i in range(1, 4)
+        ])
+        login_audit.record(None, LoginEvent.FAILURE, 'audited', user_id=user.pk)
+        events = login_audit.recent_logins(user.pk, limit=3)
+        assert [event.outcome for event in events] == [LoginEvent.FAILURE, LoginEvent.SUCCESS, LoginEvent.SUCCESS]
+        assert [event.created_at for event in events[1:]] == [now - timedelta(minutes=1), now - timedelta(minutes=2)]
+        assert len(login_audit.recent_logins(user.pk, outcome=LoginEvent.SUCCESS)) == 3
+
+    def test_recent_attempts_by_identifier(self, client, user):
+        log_in(client, password='WrongPass123', username='Nobody@Example.com')
+        assert [event.outcome for event in login_audit.recent_attempts('nobody@example.com')] == [LoginEvent.FAILURE]
+
+    def test_history_is_served_from_the_index(self):
+        if connection.vendor != 'sqlite':
+            pytest.skip('Checks the SQLite query plan')
+        plan = LoginEvent.objects.filter(user_id=1).order_by('-created_at')[:20].explain()
+        assert 'accounts_login_user_recent' in plan
+        assert 'TEMP B-TREE' not in plan  # No sort step
+
+
+@pytest.mark.django_db
+class TestPrune:
+    def test_old_events_are_deleted_in_batches(self):
+        now = timezone.now()
+        LoginEvent.objects.bulk_create([
+            LoginEvent(created_at=now - timedelta(days=days), identifier='someone', outcome=LoginEvent.FAILURE)
+            for days in (1, 100, 200, 300)
+        ])
+        assert login_audit.prune(now - timedelta(days=90), batch_size=2) == (0, 3)
+        assert LoginEvent.objects.count() == 1
+
+    def test_command(self, settings):
+        settings.LOGIN_AUDIT_RETENTION_DAYS = 30
+        LoginEvent.objects.create(
+            created_at=timezone.now() - timedelta(days=31), identifier='someone', outcome=LoginEvent.FAILURE
+        )
+        stdout, _ = run_command('prune_login_events')
+        assert 'Deleted 1 login events' in stdout
+        assert not LoginEvent.objects.exists()
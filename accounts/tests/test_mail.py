@@ -0,0 +1,200 @@
+import socketserver
+import threading
+from datetime import timedelta
+import pytest
+from django.core import mail
+from django.core.mail import get_connection
+from django.db import connection
+from django.utils import timezone, translation
+from accounts.mail import (
+    _claim_batch, clear_mail_templates, deliver_pending, enqueue_mail, enqueue_mails, mail_rendered, render_mail,
+)
+from accounts.models import OutboundEmail
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough SMTP to accept mail from Django's smtp backend."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.reject_rcpt = set()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.reply('250 localhost')
+            elif command == b'RCPT' and any(r.encode() in line for r in self.server.reject_rcpt):
+                self.reply('550 No such user')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(line)
+                self.server.messages.append(b''.join(data))
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def smtp_connection(server):
+    return get_connection(
+        'django.core.mail.backends.smtp.EmailBackend',
+        host='127.0.0.1', port=server.server_address[1],
+        use_tls=False, username='', password='', fail_silently=False,
+    )
+
+
+@pytest.mark.django_db
+class TestMailQueue:
+    def test_enqueue_does_not_send(self):
+        enqueue_mail('Subject', 'Body', 'from@example.com', ['to@example.com'])
+        assert len(mail.outbox) == 0
+        assert OutboundEmail.objects.get().status == OutboundEmail.PENDING
+
+    def test_enqueue_many_with_one_insert(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            enqueue_mails(
+                (f'Subject {i}', 'Body', 'from@example.com', [f'to{i}@example.com'], None) for i in range(3)
+            )
+        assert deliver_pending() == (3, 0)
+        assert sorted(m.to[0] for m in mail.outbox) == ['to0@example.com', 'to1@example.com', 'to2@example.com']
+
+    def test_deliver_with_locmem_backend(self):
+        for i in range(3):
+            enqueue_mail(f'Subject {i}', 'Body', 'from@example.com', [f'to{i}@example.com'])
+        assert deliver_pending() == (3, 0)
+        assert [m.subject for m in mail.outbox] == ['Subject 0', 'Subject 1', 'Subject 2']
+        assert OutboundEmail.objects.filter(status=OutboundEmail.SENT).count() == 3
+        assert deliver_pending() == (0, 0)
+
+    def test_batch_reuses_one_smtp_connection(self, smtp_server):
+        for i in range(5):
+            enqueue_mail(f'Subject {i}', 'Body', 'from@example.com', [f'to{i}@example.com'])
+        assert deliver_pending(connection=smtp_connection(smtp_server)) == (5, 0)
+        assert smtp_server.connections == 1
+        assert len(smtp_server.messages) == 5
+
+    def test_failed_mail_is_retried_with_backoff(self, smtp_server, settings):
+        settings.MAIL_QUEUE_RETRY_BACKOFF = 60
+        settings.MAIL_QUEUE_MAX_ATTEMPTS = 2
+        smtp_server.reject_rcpt.add('bounce@example.com')
+        enqueue_mail('Good', 'Body', 'from@example.com', ['ok@example.com'])
+        bad = enqueue_mail('Bad', 'Body', 'from@example.com', ['bounce@example.com'])
+        assert deliver_pending(connection=smtp_connection(smtp_server)) == (1, 1)
+        bad.refresh_from_db()
+        assert bad.status == OutboundEmail.PENDING
+        assert bad.attempts == 1
+        assert bad.next_attempt_at > timezone.now() + timedelta(seconds=50)
+        # Not due yet
+        assert deliver_pending(connection=smtp_connection(smtp_server)) == (0, 0)
+        OutboundEmail.objects.filter(pk=bad.pk).update(next_attempt_at=timezone.now())
+        assert deliver_pending(connection=smtp_connection(smtp_server)) == (0, 1)
+        bad.refresh_from_db()
+        assert bad.status == OutboundEmail.FAILED
+
+    def test_invalid_header_fails_without_retry(self):
+        bad = enqueue_mail('Injected\nBcc: victim@example.com', 'Body', 'from@example.com', ['to@example.com'])
+        assert deliver_pending() == (0, 1)
+        bad.refresh_from_db()
+        assert (bad.status, bad.attempts) == (OutboundEmail.FAILED, 1)
+
+    def test_rows_claimed_by_another_worker_are_skipped(self):
+        if connection.features.has_select_for_update_skip_locked:
+            pytest.skip('Claims with SELECT ... FOR UPDATE SKIP LOCKED')
+        first, second = (enqueue_mail(f'Subject {i}', 'Body', '', ['to@example.com']) for i in range(2))
+        claimed_elsewhere = []
+
+        def other_worker(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if sql.startswith('SELECT') and not claimed_elsewhere:
+                # Another worker claims the first row between our SELECT and UPDATE
+                lease_until = timezone.now() + timedelta(minutes=5)
+                claimed_elsewhere.append(OutboundEmail.objects.filter(pk=first.pk).update(next_attempt_at=lease_until))
+            return result
+
+        with connection.execute_wrapper(other_worker):
+            batch = _claim_batch(10)
+        assert [mail.pk for mail in batch] == [second.pk]
+        assert _claim_batch(10) == []
+
+
+class TestMailRendering:
+    def setup_method(self):
+        clear_mail_templates()
+
+    def test_renders_text_and_html_parts(self):
+        text, html = render_mail('accounts/password_reset_email.html', {
+            'user': {'username': 'bob'}, 'domain': 'testserver', 'uid': 'MQ', 'token': 'abc-123',
+        })
+        assert 'Hi bob,' in text
+        assert 'http://testserver/reset/MQ/abc-123/' in text
+        assert '<a href="http://testserver/reset/MQ/abc-123/"' in html
+        assert html.startswith('<p>')
+
+    def test_template_is_compiled_once_per_language(self, monkeypatch):
+        from accounts import mail as mail_module
+        loads = []
+        original = mail_module.select_template
+
+        def counting_select_template(names):
+            loads.append(names)
+            return original(names)
+
+        monkeypatch.setattr(mail_module, 'select_template', counting_select_template)
+        context = {'user': {'username': 'bob'}, 'domain': 'testserver', 'uid': 'MQ', 'token': 't'}
+        for _ in range(3):
+            render_mail('accounts/activation_email.html', context)
+        with translation.override('de'):
+            render_mail('accounts/activation_email.html', context)
+        assert loads == [
+            ['accounts/activation_email.en-us.html', 'accounts/activation_email.html'],
+            ['accounts/activation_email.de.html', 'accounts/activation_email.html'],
+        ]
+
+    def test_render_timing_hook(self):
+        durations = []
+
+        def on_rendered(sender, template_name, language, duration, **kwargs):
+            durations.append((template_name, duration))
+
+        mail_rendered.connect(on_rendered)
+        try:
+            render_mail('accounts/activation_email.html', {'user': {}, 'domain': 'd', 'uid': 'u', 'token': 't'})
+        finally:
+            mail_rendered.disconnect(on_rendered)
+        assert durations[0][0] == 'accounts/activation_email.html'
+        assert durations[0][1] >= 0
+
+    @pytest.mark.django_db
+    def test_queued_mail_carries_html_alternative(self):
+        enqueue_mail('Subject', 'Body', 'from@example.com', ['to@example.com'], '<p>Body</p>')
+        deliver_pending()
+        assert mail.outbox[0].alternatives == [('<p>Body</p>', 'text/html')]
@@ -1,4 +1,6 @@
 import pytest
+from io import StringIO
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -38,3 +40,39 @@ class TestUserModel:
             password='password'
         )
         assert str(user) == 'stringtest@example.com'
+
+    def test_lookup_fields_follow_username_and_email(self):
+        user = User.objects.create_user(
+            username='MixedCase',
+            email='Mixed.Case@Example.com',
+            password='password'
+        )
+        assert user.username_lower == 'mixedcase'
+        assert user.email_lower == 'mixed.case@example.com'
+        user.username = 'Renamed'
+        user.save(update_fields=['username'])
+        user.refresh_from_db()
+        assert user.username_lower == 'renamed'
+
+    def test_get_by_identifier_is_case_insensitive(self):
+        user = User.objects.create_user(
+            username='LookupUser',
+            email='lookup@example.com',
+            password='password'
+        )
+        assert User.objects.get_by_identifier('lookupuser') == user
+        assert User.objects.get_by_identifier('LOOKUP@EXAMPLE.COM') == user
+        with pytest.raises(User.DoesNotExist):
+            User.objects.get_by_identifier('missing')
+
+    def test_backfill_lookup_fields_command(self):
+        user = User.objects.create_user(
+            username='Legacy',
+            email='Legacy@example.com',
+            password='password'
+        )
+        User.objects.filter(pk=user.pk).update(username_lower=None, email_lower=None)
+        call_command('backfill_lookup_fields', stdout=StringIO())
+        user.refresh_from_db()
+        assert user.username_lower == 'legacy'
+        assert user.email_lower == 'legacy@example.com'
@@ -0,0 +1,79 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+
+@pytest.fixture
+def member(db):
+    return User.objects.create_user(
+        username='permuser', email='perm@example.com', password='PermPass123', is_active=True
+    )
+
+
+@pytest.fixture
+def editors(db):
+    group = Group.objects.create(name='editors')
+    group.permissions.add(Permission.objects.get(codename='change_user'))
+    return group
+
+
+def fresh(user):
+    # A new instance, as each request gets from the session
+    return User.objects.get(pk=user.pk)
+
+
+@pytest.mark.django_db
+class TestPermissionCache:
+    def test_warm_checks_run_no_queries(self, member, editors):
+        member.groups.add(editors)
+        assert fresh(member).has_perm('accounts.change_user')
+        user = fresh(member)
+        with CaptureQueriesContext(connection) as captured:
+            assert user.has_perm('accounts.change_user')
+            assert not user.has_perm('accounts.delete_user')
+            assert user.get_all_permissions() == {'accounts.change_user'}
+        assert len(captured) == 0
+
+    def test_adding_group(self, member, editors):
+        assert not fresh(member).has_perm('accounts.change_user')
+        member.groups.add(editors)
+        assert fresh(member).has_perm('accounts.change_user')
+        member.groups.remove(editors)
+        assert not fresh(member).has_perm('accounts.change_user')
+
+    def test_adding_user_through_group(self, member, editors):
+        assert not fresh(member).has_perm('accounts.change_user')
+        editors.user_set.add(member)
+        assert fresh(member).has_perm('accounts.change_user')
+        editors.user_set.clear()
+        assert not fresh(member).has_perm('accounts.change_user')
+
+    def test_direct_permissions(self, member):
+        permission = Permission.objects.get(codename='view_user')
+        assert not fresh(member).has_perm('accounts.view_user')
+        member.user_permissions.add(permission)
+        assert fresh(member).get_user_permissions() == {'accounts.view_user'}
+
+    def test_group_permission_change(self, member, editors):
+        member.groups.add(editors)
+        assert not fresh(member).has_perm('accounts.delete_user')
+        editors.permissions.add(Permission.objects.get(codename='delete_user'))
+        assert fresh(member).has_perm('accounts.delete_user')
+
+    def test_group_deleted(self, member, editors):
+        member.groups.add(editors)
+        assert fresh(member).has_perm('accounts.change_user')
+        editors.delete()
+        assert not fresh(member).has_perm('accounts.change_user')
+
+    def test_superuser_and_inactive(self, member):
+        member.is_superuser = True
+        member.save()
+        assert fresh(member).has_perm('accounts.delete_user')
+        member.is_active = False
+        member.save()
+        assert not fresh(member).has_perm('accounts.delete_user')
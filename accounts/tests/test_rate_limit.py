@@ -0,0 +1,102 @@
+import pytest
+from django.urls import reverse
+
+from accounts.instrumentation import registry
+from accounts.rate_limit import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def limits(settings):
+    settings.RATE_LIMITS = {'register': {'ip': (3, 60), 'global': (5, 60), 'methods': ('POST',)}}
+    return settings.RATE_LIMITS
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_bucket_allows_a_burst_then_refills(limits, clock):
+    limiter = RateLimiter(clock=clock)
+    assert [limiter.check('register', 'POST', '10.0.0.1') for _ in range(3)] == [None] * 3
+    scope, stage, retry_after = limiter.check('register', 'POST', '10.0.0.1')
+    assert (scope, stage) == ('ip', 'local')
+    assert 0 < retry_after <= 20
+    clock.now += 20  # One token back
+    assert limiter.check('register', 'POST', '10.0.0.1') is None
+    assert limiter.check('register', 'POST', '10.0.0.1') is not None
+
+
+def test_unlisted_views_and_methods_are_not_limited(limits, clock):
+    limiter = RateLimiter(clock=clock)
+    for _ in range(10):
+        assert limiter.check('register', 'GET', '10.0.0.1') is None
+        assert limiter.check('home', 'POST', '10.0.0.1') is None
+
+
+def test_shared_bucket_spans_processes(limits, clock):
+    first, second = RateLimiter(clock=clock), RateLimiter(clock=clock)
+    for limiter in (first, second, first):
+        assert limiter.check('register', 'POST', '10.0.0.1') is None
+    # Neither process has seen three requests, the shared bucket has
+    assert second.check('register', 'POST', '10.0.0.1')[:2] == ('ip', 'shared')
+
+
+def test_global_bucket_covers_all_clients(limits, clock):
+    limiter = RateLimiter(clock=clock)
+    for i in range(5):
+        assert limiter.check('register', 'POST', f'10.0.0.{i}') is None
+    assert limiter.check('register', 'POST', '10.0.0.9')[0] == 'global'
+
+
+def test_refused_requests_take_no_shared_token(limits, clock):
+    first, second = RateLimiter(clock=clock), RateLimiter(clock=clock)
+    for _ in range(3):
+        first.check('register', 'POST', '10.0.0.1')
+    for _ in range(5):
+        assert second.check('register', 'POST', '10.0.0.1') is not None
+    clock.now += 20
+    assert second.check('register', 'POST', '10.0.0.1') is None
+
+
+@pytest.mark.django_db
+class TestRateLimitMiddleware:
+    @pytest.fixture(autouse=True)
+    def sample_everything(self, settings):
+        settings.INSTRUMENTATION_SAMPLE_RATE = 1.0
+        registry.reset()
+
+    def post_register(self, client, n, **extra):
+        return client.post(reverse('register'), {
+            'username': f'limited{n}', 'email': f'limited{n}@example.com',
+            'password1': 'LimitPass123', 'password2': 'LimitPass123',
+        }, **extra)
+
+    def test_over_limit_request_is_refused_before_the_view(self, client, limits, django_assert_num_queries):
+        for n in range(3):
+            assert self.post_register(client, n).status_code == 302
+        with django_assert_num_queries(0):
+            response = self.post_register(client, 3)
+        assert response.status_code == 429
+        assert int(response['Retry-After']) >= 1
+        assert self.post_register(client, 4, REMOTE_ADDR='10.0.0.2').status_code == 302
+        assert client.get(reverse('register')).status_code == 200
+
+    def test_refusals_and_saved_cost_are_exported(self, client, limits, settings):
+        settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+        for n in range(4):
+            self.post_register(client, n)
+        output = client.get(reverse('metrics')).content.decode()
+        assert 'accounts_rate_limited_total{scope="ip",stage="local",view="register"} 1' in output
+        assert 'accounts_rate_limit_saved_seconds_total{view="register"}' in output
+        assert 'accounts_rate_limit_saved_queries_total{view="register"}' in output
+        # The refusal is counted but not sampled as a register request
+        assert 'accounts_sampled_requests_total{view="register"} 3' in output
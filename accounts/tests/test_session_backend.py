@@ -0,0 +1,157 @@
+import threading
+from datetime import timedelta
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from accounts import session_backend
+from accounts.session_backend import SessionStore, purge_expired, writer
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def write_behind(settings):
+    settings.SESSION_ENGINE = 'accounts.session_backend'
+    settings.SESSION_WRITE_BEHIND_INTERVAL = None
+    settings.SESSION_WRITE_BEHIND_BATCH_SIZE = 100
+    yield
+    writer._pending.clear()
+
+
+def new_session(**data):
+    store = SessionStore()
+    store.update(data)
+    store.save()
+    return store
+
+
+@pytest.mark.django_db
+class TestWriteBehindSessions:
+    def test_save_is_deferred(self):
+        store = new_session(foo='bar')
+        assert not Session.objects.filter(session_key=store.session_key).exists()
+        assert SessionStore(store.session_key)['foo'] == 'bar'
+        assert writer.flush() == 1
+        assert Session.objects.get(session_key=store.session_key).get_decoded() == {'foo': 'bar'}
+
+    def test_writes_are_coalesced(self):
+        store = new_session(count=0)
+        for count in range(1, 5):
+            store['count'] = count
+            store.save()
+        assert writer.flush() == 1
+        assert Session.objects.get(session_key=store.session_key).get_decoded() == {'count': 4}
+
+    def test_full_batch_flushes(self, settings):
+        settings.SESSION_WRITE_BEHIND_BATCH_SIZE = 3
+        for _ in range(3):
+            new_session(foo='bar')
+        assert Session.objects.count() == 3
+        assert writer._pending == {}
+
+    def test_load_survives_cache_eviction(self):
+        store = new_session(foo='bar')
+        cache.clear()
+        assert SessionStore(store.session_key)['foo'] == 'bar'
+        writer.flush()
+        cache.clear()
+        assert SessionStore(store.session_key)['foo'] == 'bar'
+
+    def test_delete(self):
+        store = new_session(foo='bar')
+        writer.flush()
+        store.delete()
+        cache.clear()
+        assert SessionStore(store.session_key).load() == {}
+        assert not store.exists(store.session_key)
+        writer.flush()
+        assert not Session.objects.filter(session_key=store.session_key).exists()
+
+    def test_create_refuses_taken_key(self):
+        store = new_session(foo='bar')
+        clash = SessionStore(store.session_key)
+        with pytest.raises(session_backend.CreateError):
+            clash.save(must_create=True)
+
+    def test_login_and_logout(self, client):
+        User.objects.create_user(
+            username='sessionuser', email='session@example.com', password='SessionPass123', is_active=True
+        )
+        response = client.post(reverse('login'), {'username': 'sessionuser', 'password': 'SessionPass123'})
+        assert response.status_code == 302
+        assert client.get(reverse('profile_update')).status_code == 200
+        writer.flush()
+        session_key = client.session.session_key
+        assert Session.objects.filter(session_key=session_key).exists()
+        client.get(reverse('logout'))
+        writer.flush()
+        assert not Session.objects.filter(session_key=session_key).exists()
+
+
+@pytest.mark.django_db
+class TestPurgeExpired:
+    def make_rows(self, expired, live):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i:025d}', session_data='', expire_date=now - timedelta(days=1)) for i in range(expired)]
+            + [Session(session_key=f'live{i:028d}', session_data='', expire_date=now + timedelta(days=1)) for i in range(live)]
+        )
+
+    def test_purge_is_bounded(self):
+        self.make_rows(expired=5, live=2)
+        assert purge_expired(limit=3) == 3
+        assert purge_expired(limit=3) == 2
+        assert purge_expired(limit=3) == 0
+        assert Session.objects.count() == 2
+
+    def test_clear_expired(self, settings):
+        settings.SESSION_PURGE_BATCH_SIZE = 2
+        self.make_rows(expired=5, live=1)
+        SessionStore.clear_expired()
+        assert Session.objects.count() == 1
+
+    def test_purge_interval(self, settings):
+        settings.SESSION_PURGE_INTERVAL = 0
+        self.make_rows(expired=2, live=0)
+        assert writer.maybe_purge() == 2
+        settings.SESSION_PURGE_INTERVAL = None
+        self.make_rows(expired=0, live=0)
+        assert writer.maybe_purge() == 0
+
+
+def test_background_flush(settings, monkeypatch):
+    # Exercises the thread without a second DB connection racing the test's
+    settings.SESSION_WRITE_BEHIND_INTERVAL = 0.01
+    settings.SESSION_PURGE_INTERVAL = None
+    flushed = threading.Event()
+    monkeypatch.setattr(writer, '_write', lambda batch: flushed.set())
+    try:
+        writer.enqueue('k' * 32, ('data', timezone.now()))
+        assert flushed.wait(5)
+    finally:
+        writer.stop()
+    assert writer.pending('k' * 32) == (False, None)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_flush_from_another_thread_persists():
+    # What the writer thread does, on its own DB connection, joined before the
+    # test's connection reads so the two never hold SQLite locks at once
+    store = new_session(foo='bar')
+    flushed = []
+
+    def flush():
+        try:
+            flushed.append(writer.flush())
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=flush)
+    thread.start()
+    thread.join(5)
+    assert flushed == [1]
+    assert Session.objects.get(session_key=store.session_key).get_decoded() == {'foo': 'bar'}
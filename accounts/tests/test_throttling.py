@@ -0,0 +1,82 @@
+import threading
+import pytest
+from accounts.throttling import LoginThrottle
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestLoginThrottle:
+    @pytest.fixture(autouse=True)
+    def limits(self, settings):
+        settings.MAX_FAILED_ATTEMPTS = 5
+        settings.MAX_FAILED_ATTEMPTS_PER_IP = 20
+        settings.LOCKOUT_TIME = 15
+
+    def test_locks_exactly_at_limit(self):
+        throttle = LoginThrottle(clock=FakeClock())
+        for _ in range(4):
+            throttle.register_failure('user', '10.0.0.1')
+        assert not throttle.is_locked('user', '10.0.0.1')
+        throttle.register_failure('user', '10.0.0.1')
+        assert throttle.is_locked('user', '10.0.0.1')
+
+    def test_username_key_is_case_insensitive(self):
+        throttle = LoginThrottle(clock=FakeClock())
+        for name in ['User', 'USER', 'user', 'uSer', 'usEr']:
+            throttle.register_failure(name)
+        assert throttle.is_locked('user')
+
+    def test_ip_limit_spans_usernames(self):
+        throttle = LoginThrottle(clock=FakeClock())
+        for i in range(20):
+            throttle.register_failure(f'user{i}', '10.0.0.2')
+        assert throttle.is_locked('fresh-user', '10.0.0.2')
+        assert not throttle.is_locked('fresh-user', '10.0.0.3')
+
+    def test_reset_clears_username_only(self):
+        throttle = LoginThrottle(clock=FakeClock())
+        for _ in range(20):
+            throttle.register_failure('user', '10.0.0.4')
+        throttle.reset('user')
+        assert not throttle.is_locked('user')
+        assert throttle.is_locked('user', '10.0.0.4')
+
+    def test_sliding_window_decays(self):
+        clock = FakeClock(now=900 * 1000)  # Start of a bucket
+        throttle = LoginThrottle(clock=clock)
+        for _ in range(5):
+            throttle.register_failure('user')
+        clock.now += 900  # Next bucket: previous counts fully weighted
+        assert throttle.is_locked('user')
+        clock.now += 450  # Half of the previous bucket still overlaps
+        assert not throttle.is_locked('user')
+        for _ in range(3):
+            throttle.register_failure('user')
+        assert throttle.is_locked('user')  # 3 + 5 * 0.5
+        clock.now += 900
+        assert not throttle.is_locked('user')
+
+    def test_concurrent_failures_are_counted_exactly(self):
+        clock = FakeClock()
+        throttle = LoginThrottle(clock=clock)
+        threads_count, per_thread = 16, 25
+        barrier = threading.Barrier(threads_count)
+
+        def attack():
+            barrier.wait()
+            for _ in range(per_thread):
+                throttle.register_failure('victim', '10.0.0.5')
+
+        threads = [threading.Thread(target=attack) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        key = throttle._buckets(throttle._scopes('victim', None)[0][0], clock())[0]
+        assert throttle.cache.get(key) == threads_count * per_thread
@@ -0,0 +1,75 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from accounts import user_cache
+
+User = get_user_model()
+
+
+def user_queries(captured):
+    return [q['sql'] for q in captured.captured_queries if 'FROM "accounts_user"' in q['sql']]
+
+
+@pytest.fixture
+def logged_in(client):
+    user = User.objects.create_user(
+        username='cacheduser',
+        email='cached@example.com',
+        password='CachedPass123',
+        is_active=True
+    )
+    client.login(username='cacheduser', password='CachedPass123')
+    return user
+
+
+@pytest.mark.django_db
+class TestUserCache:
+    def test_steady_state_needs_no_user_query(self, client, logged_in):
+        client.get(reverse('profile_update'))  # Warms the cache
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(reverse('profile_update'))
+        assert response.status_code == 200
+        assert user_queries(captured) == []
+
+    def test_password_change_logs_out_other_sessions(self, client, logged_in):
+        client.get(reverse('profile_update'))
+        user = User.objects.get(pk=logged_in.pk)
+        user.set_password('ChangedPass123')
+        user.save()
+        response = client.get(reverse('profile_update'))
+        assert response.status_code == 302  # Session hash no longer matches
+        assert '_auth_user_id' not in client.session
+
+    def test_deactivation_takes_effect_immediately(self, client, logged_in):
+        client.get(reverse('profile_update'))
+        logged_in.is_active = False
+        logged_in.save(update_fields=['is_active'])
+        response = client.get(reverse('profile_update'))
+        assert response.status_code == 302
+
+    def test_profile_update_is_visible_on_next_request(self, client, logged_in):
+        client.post(reverse('profile_update'), {'username': 'renamed', 'email': 'renamed@example.com'})
+        assert user_cache.get_cached_user(logged_in.pk).username == 'renamed'
+
+    def test_load_racing_a_password_change_is_never_served(self, logged_in):
+        # A reader picks up the version, then loads the row before the password change lands
+        cache = user_cache._cache()
+        stale_version = user_cache._current_version(cache, logged_in.pk)
+        stale = User.objects.get(pk=logged_in.pk)
+        logged_in.set_password('ChangedPass123')
+        logged_in.save()
+        # ...and writes its stale copy after the change
+        cache.set(user_cache._entry_key(logged_in.pk, stale_version), stale)
+        assert user_cache.get_cached_user(logged_in.pk).check_password('ChangedPass123')
+
+    def test_evicted_version_does_not_resurrect_stale_entries(self, logged_in):
+        cache = user_cache._cache()
+        version = user_cache._current_version(cache, logged_in.pk)
+        stale = User.objects.get(pk=logged_in.pk)
+        cache.set(user_cache._entry_key(logged_in.pk, version), stale)
+        logged_in.set_password('ChangedPass123')
+        logged_in.save()
+        cache.delete(user_cache._version_key(logged_in.pk))  # Evicted
+        assert user_cache.get_cached_user(logged_in.pk).check_password('ChangedPass123')
@@ -1,6 +1,8 @@
 import pytest
 from django.urls import reverse
 from django.core import mail
+from accounts.mail import deliver_pending
+from accounts.models import OutboundEmail
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.conf import settings
@@ -20,7 +22,8 @@ class TestRegistrationView:
         assert response.status_code == 302  # Redirect after registration
         user = User.objects.get(email='testuser@example.com')
         assert not user.is_active
-        # Check that an email was sent
+        # Check that an email was queued and goes out with the next worker batch
+        assert deliver_pending() == (1, 0)
         assert len(mail.outbox) == 1
 
     def test_activation(self, client):
@@ -33,9 +36,9 @@ class TestRegistrationView:
         # Generate activation token
         from django.utils.http import urlsafe_base64_encode
         from django.utils.encoding import force_bytes
-        from django.contrib.auth.tokens import default_token_generator
+        from accounts.link_tokens import activation_token
         uid = urlsafe_base64_encode(force_bytes(user.pk))
-        token = default_token_generator.make_token(user)
+        token = activation_token.make_token(user)
         activation_url = reverse('activate', kwargs={'uidb64': uid, 'token': token})
         response = client.get(activation_url)
         assert response.status_code == 302  # Redirect after activation
@@ -112,6 +115,7 @@ class TestPasswordResetView:
             'email': 'reset@example.com',
         })
         assert response.status_code == 302  # Redirect after requesting password reset
+        assert deliver_pending() == (1, 0)
         assert len(mail.outbox) == 1
         # Extract reset link from email
         email_body = mail.outbox[0].body
@@ -133,6 +137,28 @@ class TestPasswordResetView:
         assert response.status_code == 302
         assert '_auth_user_id' in client.session
 
+    def test_repeated_requests_are_coalesced(self, client, django_assert_num_queries):
+        User.objects.create_user(username='floodeduser', email='flood@example.com', password='OldPass123')
+        client.post(reverse('password_reset'), {'email': 'flood@example.com'})
+        for email in ('flood@example.com', 'FLOOD@example.com'):
+            with django_assert_num_queries(0):
+                response = client.post(reverse('password_reset'), {'email': email})
+            assert response.status_code == 302
+        assert OutboundEmail.objects.count() == 1
+
+    def test_address_case_does_not_matter(self, client):
+        User.objects.create_user(username='mixedcase', email='mixed@example.com', password='OldPass123')
+        client.post(reverse('password_reset'), {'email': 'Mixed@Example.com'})
+        # The retry with the stored casing is coalesced with the mail already queued
+        client.post(reverse('password_reset'), {'email': 'mixed@example.com'})
+        assert list(OutboundEmail.objects.values_list('to', flat=True)) == [['mixed@example.com']]
+
+    def test_unknown_email_gets_the_same_answer(self, client):
+        response = client.post(reverse('password_reset'), {'email': 'nobody@example.com'})
+        assert response.status_code == 302
+        assert response.url == reverse('password_reset_done')
+        assert not OutboundEmail.objects.exists()
+
 @pytest.mark.django_db
 class TestProfileUpdateView:
     def test_profile_update(self, client):
@@ -183,3 +209,32 @@ class TestLogoutView:
         assert response.status_code == 302  # Redirect after logout
         assert '_auth_user_id' not in client.session
 
+
+@pytest.mark.django_db
+class TestExportUsersView:
+    def test_staff_can_stream_export(self, client):
+        staff = User.objects.create_user(
+            username='staffuser',
+            email='staff@example.com',
+            password='StaffPass123',
+            is_active=True,
+            is_staff=True
+        )
+        client.force_login(staff)
+        response = client.get(reverse('export_users'), {'format': 'jsonl'})
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'application/x-ndjson'
+        body = b''.join(response.streaming_content).decode()
+        assert '"username": "staffuser"' in body
+
+    def test_non_staff_is_redirected(self, client):
+        user = User.objects.create_user(
+            username='plainuser',
+            email='plain@example.com',
+            password='PlainPass123',
+            is_active=True
+        )
+        client.force_login(user)
+        response = client.get(reverse('export_users'))
+        assert response.status_code == 302
@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+from django.conf import settings
+
+from accounts import hashing, mail, warmup
+from accounts.instrumentation import registry
+from accounts.management.commands.profile_startup import by_package, parse_importtime
+from accounts.tests.test_commands import run_command
+
+
+@pytest.mark.django_db
+class TestWarmUp:
+    def test_runs_every_step(self):
+        registry.reset()
+        mail.clear_mail_templates()
+        timings = warmup.warm_up()
+        assert [step for step, _ in timings] == [step for step, _ in warmup.STEPS]
+        assert ('accounts/password_reset_email.html', settings.LANGUAGE_CODE) in mail._templates
+        assert ('accounts_warmup_seconds', (('step', 'hashers'),)) in registry.gauges
+
+    def test_hashing_pool_workers_are_started(self, settings):
+        settings.PASSWORD_HASHING_POOL_SIZE = 2
+        assert hashing.warm_up() == 2
+
+    def test_failed_step_does_not_stop_the_others(self, monkeypatch, caplog):
+        def broken():
+            raise RuntimeError('cache down')
+
+        monkeypatch.setattr(warmup, 'STEPS', (('caches', broken), ('urls', warmup.warm_urls)))
+        with caplog.at_level(logging.ERROR, logger='accounts.warmup'):
+            timings = warmup.warm_up()
+        assert [step for step, _ in timings] == ['caches', 'urls']
+        assert 'Warm-up step caches failed' in caplog.text
+
+    def test_only_runs_when_enabled(self, settings, monkeypatch):
+        monkeypatch.setattr(warmup, 'STEPS', ())
+        settings.WARMUP_ON_STARTUP = False
+        assert warmup.warm_up_if_enabled() is None
+        settings.WARMUP_ON_STARTUP = True
+        assert warmup.warm_up_if_enabled() == []
+
+
+class TestProfileStartup:
+    def test_importtime_is_grouped_by_app(self):
+        modules = parse_importtime(
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:      1000 |       1000 |   django.contrib.auth.models\n'
+            'import time:      2000 |       3000 | django.contrib.auth\n'
+            'import time:       500 |        500 | django.utils\n'
+        )
+        assert modules['django.contrib.auth'] == (0.002, 0.003)
+        assert by_package(modules, ['django.contrib.auth', 'accounts']) == {
+            'django.contrib.auth': 0.003, 'django': 0.0005,
+        }
+
+    def test_reports_app_costs(self):
+        stdout, _ = run_command('profile_startup', '--limit', '3')
+        assert 'django.setup()' in stdout
+        for app in ('django.contrib.admin', 'accounts'):
+            assert app in stdout
+        assert 'Slowest 3 imports' in stdout
@@ -0,0 +1,93 @@
+import hashlib
+import time
+
+from django.conf import settings
+
+from .instrumentation import get_cache
+from .models import normalize_identifier
+
+
+def client_ip(request):
+    # Only REMOTE_ADDR is trusted; put a proxy-aware middleware in front if needed
+    return request.META.get('REMOTE_ADDR')
+
+
+class LoginThrottle:
+    """
+    Failed-login counters keyed on username and on client IP.
+
+    Each scope uses a sliding window approximated from two fixed buckets: the
+    current bucket plus the previous one weighted by how much of it still
+    overlaps the window. Counters only ever change through atomic cache
+    add()/incr(), so every worker sharing the cache (Redis, memcached) sees
+    exact counts; checking the lockout is a single get_many() round trip.
+    """
+
+    def __init__(self, cache_alias=None, clock=time.time):
+        self.cache = get_cache(cache_alias or getattr(settings, 'LOGIN_THROTTLE_CACHE', 'default'))
+        self.limit = settings.MAX_FAILED_ATTEMPTS
+        self.ip_limit = settings.MAX_FAILED_ATTEMPTS_PER_IP
+        self.window = settings.LOCKOUT_TIME * 60
+        self.clock = clock
+
+    def _scopes(self, username, ip):
+        scopes = []
+        if username:
+            digest = hashlib.sha256(normalize_identifier(username).encode()).hexdigest()[:32]
+            scopes.append((f'throttle:user:{digest}', self.limit))
+        if ip:
+            scopes.append((f'throttle:ip:{ip}', self.ip_limit))
+        return scopes
+
+    def _buckets(self, prefix, now):
+        bucket = int(now // self.window)
+        return f'{prefix}:{bucket}', f'{prefix}:{bucket - 1}'
+
+    def _is_locked(self, scopes, counts, now):
+        overlap = 1 - (now % self.window) / self.window
+        for prefix, limit in scopes:
+            current, previous = self._buckets(prefix, now)
+            if counts.get(current, 0) + counts.get(previous, 0) * overlap >= limit:
+                return True
+        return False
+
+    def _keys(self, scopes, now):
+        return [key for prefix, _ in scopes for key in self._buckets(prefix, now)]
+
+    def is_locked(self, username, ip=None):
+        now = self.clock()
+        scopes = self._scopes(username, ip)
+        return self._is_locked(scopes, self.cache.get_many(self._keys(scopes, now)), now)
+
+    async def ais_locked(self, username, ip=None):
+        now = self.clock()
+        scopes = self._scopes(username, ip)
+        return self._is_locked(scopes, await self.cache.aget_many(self._keys(scopes, now)), now)
+
+    def register_failure(self, username, ip=None):
+        now = self.clock()
+        for prefix, _ in self._scopes(username, ip):
+            key = self._buckets(prefix, now)[0]
+            # Buckets live for two windows so they can serve as the "previous" bucket
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                if not self.cache.add(key, 1, self.window * 2):
+                    self.cache.incr(key)
+
+    async def aregister_failure(self, username, ip=None):
+        now = self.clock()
+        for prefix, _ in self._scopes(username, ip):
+            key = self._buckets(prefix, now)[0]
+            try:
+                await self.cache.aincr(key)
+            except ValueError:
+                if not await self.cache.aadd(key, 1, self.window * 2):
+                    await self.cache.aincr(key)
+
+    def reset(self, username):
+        # A successful login clears the username counters; per-IP counters keep running
+        self.cache.delete_many(self._keys(self._scopes(username, None), self.clock()))
+
+    async def areset(self, username):
+        await self.cache.adelete_many(self._keys(self._scopes(username, None), self.clock()))
@@ -14,4 +14,15 @@ urlpatterns = [
     path('reset/<uidb64>/<token>/', views.password_reset_confirm, name='password_reset_confirm'),
     path('reset/done/', views.password_reset_complete_view, name='password_reset_complete'),
     path('profile/', views.profile_update, name='profile_update'),
+    path('users/export/', views.export_users, name='export_users'),
+    path('metrics/', views.metrics, name='metrics'),
+    # Signed-token API authentication
+    path('api/token/', views.api_token, name='api_token'),
+    path('api/token/refresh/', views.api_token_refresh, name='api_token_refresh'),
+    path('api/token/revoke/', views.api_token_revoke, name='api_token_revoke'),
+    path('api/me/', views.api_me, name='api_me'),
+    # Async views for ASGI deployments
+    path('async/register/', views.aregister, name='aregister'),
+    path('async/activate/<uidb64>/<token>/', views.aactivate, name='aactivate'),
+    path('async/login/', views.alogin_view, name='alogin'),
 ]
\ No newline at end of file
@@ -0,0 +1,82 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import db_router
+from .instrumentation import get_cache
+
+UserModel = get_user_model()
+
+
+def _cache():
+    return get_cache(getattr(settings, 'USER_CACHE', 'default'))
+
+
+def _version_key(pk):
+    return f'user:version:{pk}'
+
+
+def _entry_key(pk, version):
+    return f'user:{pk}:{version}'
+
+
+def _new_version():
+    # Random token plus the time of the change it stands for
+    return f'{uuid.uuid4().hex}:{time.time():.0f}'
+
+
+def _changed_at(version):
+    _, _, changed_at = version.partition(':')
+    return float(changed_at or 0)
+
+
+def _current_version(cache, pk):
+    version = cache.get(_version_key(pk))
+    if version is None:
+        cache.add(_version_key(pk), _new_version(), None)
+        version = cache.get(_version_key(pk))
+    return version
+
+
+def get_cached_user(pk):
+    """
+    Load a user for the session middleware without touching the DB when warm.
+
+    Entries live under a per-user version token that every save replaces.
+    The version is read before the DB, so a load racing with a save can only
+    ever be stored under the token that save has already retired. Misses are
+    loaded from a replica unless the user changed too recently for replicas
+    to have caught up.
+    """
+    cache = _cache()
+    version = _current_version(cache, pk)
+    user = cache.get(_entry_key(pk, version))
+    if user is None:
+        manager = UserModel._default_manager
+        if db_router.may_lag(_changed_at(version)):
+            manager = manager.db_manager(DEFAULT_DB_ALIAS)
+        try:
+            user = manager.get(pk=pk)
+        except UserModel.DoesNotExist:
+            return None
+        cache.set(_entry_key(pk, version), user, getattr(settings, 'USER_CACHE_TIMEOUT', 300))
+    return user
+
+
+def invalidate_user(pk):
+    # A fresh random token rather than incr(): an evicted version key can't come back as an old value
+    _cache().set(_version_key(pk), _new_version(), None)
+
+
+@receiver(post_save, sender=UserModel, dispatch_uid='accounts.user_cache.saved')
+@receiver(post_delete, sender=UserModel, dispatch_uid='accounts.user_cache.deleted')
+def _invalidate_on_change(sender, instance, **kwargs):
+    # Once now, and again after commit so a load that read the
+    # uncommitted-away old row can't be served afterwards
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
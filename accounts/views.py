@@ -1,29 +1,76 @@
+import hashlib
+import json
+
 from django.shortcuts import render, redirect
 from django.contrib.auth import get_user_model, login, logout, authenticate
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.tokens import default_token_generator
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.core.mail import send_mail, BadHeaderError
-from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.conf import settings
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, ProfileUpdateForm
 from django.contrib.auth import views as auth_views
+from asgiref.sync import sync_to_async
+from .auth_backend import alogin
+from .mail import enqueue_mail, enqueue_mails, aenqueue_mail, render_mail
+from .db_router import use_primary
+from .models import LoginEvent, normalize_identifier
+from .link_tokens import InvalidToken, activation_token, password_reset_token
+from .export import FORMATS, stream_users
+from . import api_auth, instrumentation, login_audit
 
 
 UserModel = get_user_model()
 
-# Account lockout settings
-from django.core.cache import cache
+from .throttling import LoginThrottle, client_ip
 
-MAX_FAILED_ATTEMPTS = 5
-LOCKOUT_TIME = 15  # minutes
+LOCKED_MESSAGE = 'Your account is locked due to multiple failed login attempts. Please try again later.'
 
 def main_site(request):
     return render(request, 'accounts/base_generic.html')
 
+def _activation_email(request, user):
+    current_site = request.get_host()
+    subject = 'Activate your account'
+    message, html_message = render_mail('accounts/activation_email.html', {
+        'user': user,
+        'domain': current_site,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': activation_token.make_token(user),
+    })
+    return subject, message, html_message
+
+def _decode_uid(uidb64):
+    try:
+        return force_str(urlsafe_base64_decode(uidb64))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _verify_link(uidb64, token, generator):
+    # Tampered, expired and already used links are turned away before any query
+    try:
+        user_pk, fingerprint = generator.verify(token)
+    except InvalidToken:
+        return None, None
+    uid = _decode_uid(uidb64)
+    if user_pk is None:
+        # A link sent before signed tokens; only the user row can check it
+        try:
+            return UserModel._meta.pk.to_python(uid), fingerprint
+        except ValidationError:
+            return None, None
+    if uid != str(user_pk):
+        return None, None
+    return user_pk, fingerprint
+
+@use_primary
 def register(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -31,19 +78,9 @@ def register(request):
             user = form.save(commit=False)
             user.is_active = False  # Deactivate until email confirmation
             user.save()
-            # Send activation email
-            current_site = request.get_host()
-            subject = 'Activate your account'
-            message = render_to_string('accounts/activation_email.html', {
-                'user': user,
-                'domain': current_site,
-                'uid': urlsafe_base64_encode(force_bytes(user.pk)),
-                'token': default_token_generator.make_token(user),
-            })
-            try:
-                send_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
-            except BadHeaderError:
-                return HttpResponse('Invalid header found.')
+            # Queue activation email; send_queued_mail delivers it
+            subject, message, html_message = _activation_email(request, user)
+            enqueue_mail(subject, message, settings.EMAIL_HOST_USER, [user.email], html_message)
             return redirect('activation_sent')
     else:
         form = CustomUserCreationForm()
@@ -52,15 +89,17 @@ def register(request):
 def activation_sent(request):
     return render(request, 'accounts/activation_sent.html')
 
+@use_primary
 def activate(request, uidb64, token):
-    try:
-        uid = force_str(urlsafe_base64_decode(uidb64))
-        user = UserModel.objects.get(pk=uid)
-    except (TypeError, ValueError, OverflowError, UserModel.DoesNotExist):
-        user = None
-    if user is not None and default_token_generator.check_token(user, token):
+    user_pk, fingerprint = _verify_link(uidb64, token, activation_token)
+    user = UserModel.objects.filter(pk=user_pk).first() if user_pk is not None else None
+    valid = user is not None and activation_token.matches(user, fingerprint)
+    if valid:
         user.is_active = True
         user.save()
+    # Consumed only after the save, so a failed save leaves the link usable;
+    # of concurrent clicks only one logs in
+    if valid and activation_token.consume(token):
         # Specify the backend
         backend = settings.AUTHENTICATION_BACKENDS[0]  # or choose the appropriate backend
         login(request, user, backend=backend)
@@ -72,52 +111,122 @@ def login_view(request):
     if request.method == 'POST':
         form = CustomAuthenticationForm(request, data=request.POST)
         username = request.POST.get('username')
-        cache_key = f'login_attempts_{username}'
-        attempts = cache.get(cache_key, 0)
-        if attempts >= MAX_FAILED_ATTEMPTS:
-            messages.error(request, 'Your account is locked due to multiple failed login attempts. Please try again later.')
+        ip = client_ip(request)
+        throttle = LoginThrottle()
+        if throttle.is_locked(username, ip):
+            login_audit.record(request, LoginEvent.LOCKED, username)
+            messages.error(request, LOCKED_MESSAGE)
             return render(request, 'accounts/login.html', {'form': form})
         if form.is_valid():
             user = form.get_user()
             login(request, user)
-            cache.delete(cache_key)  # Reset attempts
+            throttle.reset(username)  # Reset attempts
             return redirect('home')
         else:
-            attempts += 1
-            cache.set(cache_key, attempts, LOCKOUT_TIME * 60)
-            if attempts >= MAX_FAILED_ATTEMPTS:
-                messages.error(request, 'Your account is locked due to multiple failed login attempts. Please try again later.')
+            throttle.register_failure(username, ip)
+            if throttle.is_locked(username, ip):
+                messages.error(request, LOCKED_MESSAGE)
             else:
                 messages.error(request, 'Invalid credentials.')
     else:
         form = CustomAuthenticationForm()
     return render(request, 'accounts/login.html', {'form': form})
 
+# Async variants of the views above for ASGI deployments. They use the async
+# ORM and cache APIs directly; CPU-bound work (hashing, template rendering) and
+# the blocking session calls are handed to a thread.
+
+@use_primary
+async def aregister(request):
+    if request.method == 'POST':
+        form = CustomUserCreationForm(request.POST)
+        # Uniqueness validation queries the DB
+        if await sync_to_async(form.is_valid)():
+            user = await sync_to_async(form.save)(commit=False)  # Hashes the password
+            user.is_active = False  # Deactivate until email confirmation
+            await user.asave()
+            subject, message, html_message = await sync_to_async(_activation_email)(request, user)
+            await aenqueue_mail(subject, message, settings.EMAIL_HOST_USER, [user.email], html_message)
+            return redirect('activation_sent')
+    else:
+        form = CustomUserCreationForm()
+    return await sync_to_async(render)(request, 'accounts/register.html', {'form': form})
+
+@use_primary
+async def aactivate(request, uidb64, token):
+    user_pk, fingerprint = _verify_link(uidb64, token, activation_token)
+    user = await UserModel.objects.filter(pk=user_pk).afirst() if user_pk is not None else None
+    valid = user is not None and activation_token.matches(user, fingerprint)
+    if valid:
+        user.is_active = True
+        await user.asave()
+    if valid and await sync_to_async(activation_token.consume)(token):
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+        await alogin(request, user, backend=backend)
+        return redirect('home')
+    return await sync_to_async(render)(request, 'accounts/activation_invalid.html')
+
+async def alogin_view(request):
+    if request.method == 'POST':
+        form = CustomAuthenticationForm(request, data=request.POST)
+        username = request.POST.get('username')
+        ip = client_ip(request)
+        throttle = LoginThrottle()
+        if await throttle.ais_locked(username, ip):
+            await sync_to_async(login_audit.record)(request, LoginEvent.LOCKED, username)
+            messages.error(request, LOCKED_MESSAGE)
+            return await sync_to_async(render)(request, 'accounts/login.html', {'form': form})
+        if await form.ais_valid():
+            user = form.get_user()
+            await alogin(request, user)
+            await throttle.areset(username)  # Reset attempts
+            return redirect('home')
+        else:
+            await throttle.aregister_failure(username, ip)
+            if await throttle.ais_locked(username, ip):
+                messages.error(request, LOCKED_MESSAGE)
+            else:
+                messages.error(request, 'Invalid credentials.')
+    else:
+        form = CustomAuthenticationForm()
+    return await sync_to_async(render)(request, 'accounts/login.html', {'form': form})
+
 def logout_view(request):
     logout(request)
     return redirect('home')
 
+# Only what the reset mail and its token fingerprint need
+RESET_MAIL_FIELDS = ('pk', 'username', 'email', 'password', 'is_active')
+
+def _reset_already_requested(email):
+    # The first request for an address within the window does the work;
+    # repeats, e.g. a flood of resubmits, only get the "done" page
+    key = 'pwreset:' + hashlib.sha256(normalize_identifier(email).encode()).hexdigest()
+    cache = instrumentation.get_cache(getattr(settings, 'PASSWORD_RESET_COALESCE_CACHE', 'default'))
+    return not cache.add(key, 1, getattr(settings, 'PASSWORD_RESET_COALESCE_WINDOW', 60))
+
+def _password_reset_emails(request, users):
+    domain = request.get_host()
+    for user in users:
+        message, html_message = render_mail('accounts/password_reset_email.html', {
+            'user': user,
+            'domain': domain,
+            'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': password_reset_token.make_token(user),
+        })
+        yield 'Password Reset Requested', message, settings.EMAIL_HOST_USER, [user.email], html_message
+
 def password_reset_request(request):
     if request.method == "POST":
         form = auth_views.PasswordResetForm(request.POST)
         if form.is_valid():
             email = form.cleaned_data['email']
-            associated_users = UserModel.objects.filter(email=email)
-            if associated_users.exists():
-                for user in associated_users:
-                    current_site = request.get_host()
-                    subject = 'Password Reset Requested'
-                    message = render_to_string('accounts/password_reset_email.html', {
-                        'user': user,
-                        'domain': current_site,
-                        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
-                        'token': default_token_generator.make_token(user),
-                    })
-                    try:
-                        send_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
-                    except BadHeaderError:
-                        return HttpResponse('Invalid header found.')
-                return redirect('password_reset_done')
+            if not _reset_already_requested(email):
+                # Same normalization as the coalescing key, via the indexed column
+                users = UserModel.objects.filter(email_lower=normalize_identifier(email)).only(*RESET_MAIL_FIELDS)
+                enqueue_mails(_password_reset_emails(request, users))
+            # Same answer whether or not the address is known
+            return redirect('password_reset_done')
     else:
         form = auth_views.PasswordResetForm()
     return render(request, 'accounts/password_reset.html', {'form': form})
@@ -125,13 +234,120 @@ def password_reset_request(request):
 def password_reset_done_view(request):
     return render(request, 'accounts/password_reset_done.html')
 
+class PasswordResetConfirmView(auth_views.PasswordResetConfirmView):
+    template_name = 'accounts/password_reset_confirm.html'
+    token_generator = password_reset_token
+
+    @method_decorator(never_cache)
+    def dispatch(self, *args, **kwargs):
+        token = kwargs['token']
+        if token == self.reset_url_token:
+            token = self.request.session.get(auth_views.INTERNAL_RESET_SESSION_TOKEN, '')
+        try:
+            password_reset_token.verify(token)
+        except InvalidToken:
+            # Rejected before the user is looked up
+            self.validlink, self.user = False, None
+            return self.render_to_response(self.get_context_data())
+        return super().dispatch(*args, **kwargs)
+
+    def form_valid(self, form):
+        token = self.request.session.get(auth_views.INTERNAL_RESET_SESSION_TOKEN)
+        response = super().form_valid(form)
+        password_reset_token.consume(token)
+        return response
+
+@use_primary
 def password_reset_confirm(request, uidb64, token):
-    return auth_views.PasswordResetConfirmView.as_view(template_name='accounts/password_reset_confirm.html')(request, uidb64=uidb64, token=token)
+    return PasswordResetConfirmView.as_view()(request, uidb64=uidb64, token=token)
 
 def password_reset_complete_view(request):
     return render(request, 'accounts/password_reset_complete.html')
 
+@staff_member_required
+def export_users(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    response = StreamingHttpResponse(stream_users(fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="users.{fmt}"'
+    return response
+
+# Token API for mobile/API clients (accounts.api_auth)
+
+def _api_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+    return request.POST
+
+@csrf_exempt
+@require_POST
+def api_token(request):
+    data = _api_data(request)
+    username, password = data.get('username'), data.get('password')
+    ip = client_ip(request)
+    throttle = LoginThrottle()
+    if throttle.is_locked(username, ip):
+        return JsonResponse({'detail': LOCKED_MESSAGE}, status=429)
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        throttle.register_failure(username, ip)
+        return JsonResponse({'detail': 'Invalid credentials.'}, status=401)
+    throttle.reset(username)
+    return JsonResponse(api_auth.issue_tokens(user))
+
+@csrf_exempt
+@require_POST
+def api_token_refresh(request):
+    try:
+        claims = api_auth.verify_token(_api_data(request).get('refresh', ''), api_auth.REFRESH)
+    except api_auth.InvalidToken as error:
+        return JsonResponse({'detail': str(error)}, status=401)
+    user = UserModel.objects.filter(pk=claims['sub'], is_active=True).first()
+    if user is None or not api_auth.password_unchanged(user, claims):
+        return JsonResponse({'detail': 'Invalid token.'}, status=401)
+    # Rotate: each refresh token is good for exactly one refresh
+    if not api_auth.revoke(claims):
+        return JsonResponse({'detail': 'Invalid token.'}, status=401)
+    return JsonResponse(api_auth.issue_tokens(user))
+
+@csrf_exempt
+@require_POST
+@api_auth.token_authentication
+def api_token_revoke(request):
+    revoked = 0
+    if getattr(request, 'auth', None):
+        revoked += api_auth.revoke(request.auth)
+    refresh = _api_data(request).get('refresh')
+    if refresh:
+        try:
+            revoked += api_auth.revoke(api_auth.verify_token(refresh, api_auth.REFRESH))
+        except api_auth.InvalidToken:
+            pass
+    return JsonResponse({'revoked': revoked})
+
+@api_auth.token_authentication
+def api_me(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication required.'}, status=401)
+    return JsonResponse({
+        'id': request.user.pk,
+        'username': request.user.get_username(),
+        'permissions': sorted(request.user.get_all_permissions()),
+    })
+
+def metrics(request):
+    # Internal scrape endpoint: METRICS_ALLOWED_IPS or staff only
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not request.user.is_staff:
+        raise Http404
+    return HttpResponse(instrumentation.registry.render(), content_type='text/plain; version=0.0.4')
+
 @login_required
+@use_primary
 def profile_update(request):
     if request.method == 'POST':
         form = ProfileUpdateForm(request.POST, instance=request.user)
@@ -0,0 +1,133 @@
+"""
+Warm-up run by a worker before it accepts traffic.
+
+Without it the first requests a worker serves pay for work Django and this
+app do lazily: populating the URL resolver, compiling templates, loading
+hashers and spawning the hashing pool, connecting to the databases and
+caches, and loading the identifier filter. warm_up() does all of that up
+front and returns the time each step took, also exported as
+accounts_warmup_seconds.
+
+wsgi.py and asgi.py call warm_up_if_enabled() once the application is built,
+so it runs when WARMUP_ON_STARTUP is set. Under a pre-forking server that
+imports the application before forking (gunicorn --preload) call warm_up()
+from the worker instead, e.g. gunicorn's post_worker_init hook, so no
+connections or hashing workers are shared between processes.
+"""
+# Each step imports what it warms, so import costs count towards its time
+# pylint: disable=import-outside-toplevel
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+
+from .instrumentation import registry
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    from django.urls import get_resolver, reverse
+
+    # Reading reverse_dict populates and compiles every pattern
+    get_resolver().reverse_dict.getlist('login')
+    reverse('login')
+
+
+def warm_templates():
+    from django.template.loader import get_template
+
+    from .forms import CustomAuthenticationForm, CustomUserCreationForm
+    from .mail import get_mail_template
+
+    root = os.path.join(apps.get_app_config('accounts').path, 'templates')
+    for directory, _, files in os.walk(root):
+        for name in files:
+            template_name = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/')
+            if template_name.endswith('_email.html'):
+                get_mail_template(template_name)
+            else:
+                get_template(template_name)
+    # Form widgets render through their own templates, as in login.html and register.html
+    CustomAuthenticationForm().as_p()
+    CustomUserCreationForm().as_p()
+
+
+def warm_hashers():
+    from django.contrib.auth import hashers
+
+    from . import hashing
+
+    hashers.get_hashers()
+    hashers.get_hasher('default')
+    hashing.warm_up()
+
+
+def warm_databases():
+    """Connect to the primary and the replicas.
+
+    Django connections belong to the thread that opened them. Without a
+    pooled engine (accounts.db_backends) only a server that handles requests
+    on the importing thread, such as gunicorn's sync workers, reuses these.
+    Threaded WSGI workers and ASGI servers connect again per thread, so
+    there this step only checks that the databases are reachable.
+    """
+    from django.db import connections
+
+    from . import db_router
+    from .db_pool import PooledDatabaseWrapperMixin
+
+    for alias in ['default', *db_router.replicas()]:
+        connection = connections[alias]
+        connection.ensure_connection()
+        if isinstance(connection, PooledDatabaseWrapperMixin):
+            # Hand it to the pool, where any thread can pick it up
+            connection.close()
+
+
+def warm_caches():
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        caches[alias].get('accounts:warmup')
+
+
+def warm_identifier_filter():
+    from . import identifier_filter
+
+    identifier_filter.get_filter()
+
+
+STEPS = (
+    ('urls', warm_urls),
+    ('templates', warm_templates),
+    ('hashers', warm_hashers),
+    ('databases', warm_databases),
+    ('caches', warm_caches),
+    ('identifier_filter', warm_identifier_filter),
+)
+
+
+def warm_up():
+    """Run every warm-up step; returns ``[(step, seconds), ...]``."""
+    timings = []
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            # A worker that could not warm up can still serve, just slower at first
+            logger.exception('Warm-up step %s failed', name)
+        elapsed = time.perf_counter() - started
+        registry.set_gauge('accounts_warmup_seconds', {'step': name}, elapsed)
+        timings.append((name, elapsed))
+    logger.info('Warm-up took %.1fms', sum(elapsed for _, elapsed in timings) * 1000)
+    return timings
+
+
+def warm_up_if_enabled():
+    if getattr(settings, 'WARMUP_ON_STARTUP', False):
+        return warm_up()
+    return None
@@ -0,0 +1,80 @@
+"""Admin user listing: OFFSET pagination + COUNT vs keyset + indexed search.
+
+    python benchmarks/bench_admin_search.py [--rows 1000000] [--repeat 20]
+
+"offset" reproduces what the stock changelist does for a page deep in the
+table (COUNT(*) plus LIMIT/OFFSET) and for a search (icontains on email and
+username, plus its COUNT). "keyset" is what UserAdmin now runs. The last
+lines time full changelist requests through the admin.
+"""
+import argparse
+
+from common import report, setup_django, Timer
+from bench_lookup import populate
+
+PER_PAGE = 100
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        with Timer() as t:
+            fn()
+        samples.append(t.elapsed)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database', help='SQLite file to use instead of an in-memory database.')
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.contrib.auth import get_user_model
+    from django.db.models import Q
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from accounts.search import install_sqlite_fts, search_users
+
+    User = get_user_model()
+    with Timer() as t:
+        populate(User, args.rows, batch_size=5000)
+        install_sqlite_fts()
+    print(f'populated {args.rows} rows in {t.elapsed:.1f}s')
+
+    users = User.objects.order_by('email')
+    middle = args.rows // 2
+    cursor = users.values_list('email', flat=True)[middle]
+    term = f'user{args.rows - 7}'
+
+    def offset_page():
+        users.count()
+        list(users[middle:middle + PER_PAGE])
+
+    def offset_search():
+        matches = users.filter(Q(email__icontains=term) | Q(username__icontains=term))
+        matches.count()
+        list(matches[:PER_PAGE])
+
+    report('offset: deep page + COUNT', timed(offset_page, args.repeat))
+    report('keyset: deep page', timed(lambda: list(users.filter(email__gt=cursor)[:PER_PAGE + 1]), args.repeat))
+    report('offset: icontains search + COUNT', timed(offset_search, args.repeat))
+    report('keyset: indexed search', timed(lambda: list(search_users(users, term)[:PER_PAGE + 1]), args.repeat))
+
+    setup_test_environment()
+    admin = User.objects.create_user(
+        username='benchadmin', email='benchadmin@example.com', password='x', is_active=True,
+        is_staff=True, is_superuser=True,
+    )
+    client = Client()
+    client.force_login(admin)
+    url = reverse('admin:accounts_user_changelist')
+    report('changelist: deep page', timed(lambda: client.get(url, {'after': cursor}), args.repeat))
+    report('changelist: search', timed(lambda: client.get(url, {'q': term}), args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Streaming user export: throughput and peak RSS.
+
+    python benchmarks/bench_export.py [--rows 1000000] [--format csv|jsonl]
+
+Peak RSS is sampled before the export (after populating the table) and
+after it; a constant-memory export leaves the peak where populating put it.
+"""
+import argparse
+import resource
+
+from common import Timer, setup_django
+from bench_lookup import populate
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--database', help='SQLite file to use instead of an in-memory database.')
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.contrib.auth import get_user_model
+    from accounts.export import stream_users
+
+    with Timer() as t:
+        populate(get_user_model(), args.rows, batch_size=5000)
+    print(f'populated {args.rows} rows in {t.elapsed:.1f}s, peak RSS {peak_rss_mb():.0f} MB')
+
+    before = peak_rss_mb()
+    written = 0
+    with Timer() as t, open('/dev/null', 'w') as sink:
+        for chunk in stream_users(args.format):
+            sink.write(chunk)
+            written += len(chunk)
+    after = peak_rss_mb()
+    print(
+        f'exported {args.rows} rows ({written / 1e6:.0f} MB {args.format}) in {t.elapsed:.1f}s '
+        f'({args.rows / t.elapsed:.0f} rows/s); peak RSS {before:.0f} MB -> {after:.0f} MB'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Per-hasher cost: latency, memory and login throughput.
+
+    python benchmarks/bench_hashers.py [--verifies 50] [--logins 200]
+
+Compares stock PBKDF2 with the calibrated scrypt (and Argon2, when
+argon2-cffi is installed) hashers at the current PASSWORD_HASHER_PARAMS.
+Memory is the peak RSS growth of a fresh process doing one hash. Logins/sec
+run verifications through accounts.hashing's pool from twice as many
+threads as it has workers.
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import report, setup_django
+
+HASHERS = {
+    'pbkdf2_sha256': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.CalibratedScryptPasswordHasher',
+    'argon2': 'accounts.hashers.CalibratedArgon2PasswordHasher',
+}
+
+
+def _high_water_mark():
+    # VmHWM rather than ru_maxrss, which Linux carries over from the parent
+    # across the fork/exec that spawns the child
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _peak_rss_growth(hasher, queue):
+    before = _high_water_mark()
+    hasher.encode('BenchPass123', hasher.salt())
+    queue.put(_high_water_mark() - before)
+
+
+def peak_rss_growth(hasher):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_peak_rss_growth, args=(hasher, queue))
+    process.start()
+    growth = queue.get()
+    process.join()
+    return growth
+
+
+def describe(hasher):
+    if hasattr(hasher, 'current_params'):
+        params = hasher.current_params()
+    else:
+        params = {'iterations': hasher.iterations}
+    return ' '.join(f'{name}={value}' for name, value in params.items())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--verifies', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.hashers import get_hasher
+    from django.test.utils import override_settings
+    from django.utils.module_loading import import_string
+    from accounts import hashers, hashing
+
+    pool_size = settings.PASSWORD_HASHING_POOL_SIZE or 1
+    for algorithm, path in HASHERS.items():
+        if algorithm == 'argon2' and not hashers.argon2_available():
+            print('argon2: skipped, argon2-cffi is not installed')
+            continue
+        hasher = import_string(path)()
+        if hasattr(hasher, 'frozen'):
+            hasher = hasher.frozen()
+        encoded = hasher.encode('BenchPass123', hasher.salt())
+
+        samples = []
+        for _ in range(args.verifies):
+            started = time.perf_counter()
+            assert hasher.verify('BenchPass123', encoded)
+            samples.append(time.perf_counter() - started)
+        report(f'{algorithm} verify', samples)
+
+        # check_password() goes through the pool; make this hasher the
+        # preferred one so successful logins don't trigger rehashes
+        with override_settings(PASSWORD_HASHERS=[path] + [p for p in HASHERS.values() if p != path]):
+            assert get_hasher('default').algorithm == algorithm
+            started = time.perf_counter()
+            with ThreadPoolExecutor(pool_size * 2) as executor:
+                checks = executor.map(lambda _: hashing.check_password('BenchPass123', encoded), range(args.logins))
+                assert all(checks)
+            elapsed = time.perf_counter() - started
+        print(
+            f'{algorithm:<14} {describe(hasher)} memory={peak_rss_growth(hasher) / 2 ** 20:.1f} MiB '
+            f'logins/s={args.logins / elapsed:.1f} ({pool_size} workers)'
+        )
+    hashing.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Login hashing throughput with and without the process pool.
+
+Request threads verify passwords concurrently, either inline (GIL-bound) or
+through accounts.hashing's pool. A probe thread measures how long a trivial
+request waits for the GIL meanwhile.
+
+    python benchmarks/bench_hashing.py [--threads 16] [--logins 200]
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import percentile, setup_django
+
+
+def run(label, check, encoded, threads, logins):
+    stop = threading.Event()
+    probe_delays = []
+
+    def probe():
+        # Stand-in for a cheap request sharing the worker with the logins
+        while not stop.is_set():
+            started = time.perf_counter()
+            sum(range(1000))
+            probe_delays.append(time.perf_counter() - started)
+            time.sleep(0.005)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(lambda _: check('BenchPass123', encoded), range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    assert all(results)
+    cores = os.cpu_count() or 1
+    print(
+        f'{label:<12} logins/s={logins / elapsed:8.1f} per core={logins / elapsed / cores:7.1f} '
+        f'probe p99={percentile(probe_delays, 99) * 1000:7.2f}ms'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import hashers
+    from accounts import hashing
+
+    settings.PASSWORD_HASHING_POOL_SIZE = os.cpu_count() or 1
+    settings.PASSWORD_HASHING_QUEUE_LIMIT = args.logins
+    encoded = hashers.make_password('BenchPass123')
+    hashing.check_password('BenchPass123', encoded)  # Start the workers outside the timing
+
+    run('inline', hashers.check_password, encoded, args.threads, args.logins)
+    run('pool', hashing.check_password, encoded, args.threads, args.logins)
+    hashing.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Unknown-identifier logins: DB queries skipped and timing equalization.
+
+    python benchmarks/bench_identifier_filter.py [--users 100000] [--attempts 200]
+
+Times authenticate() for wrong passwords on real users and for identifiers
+that don't exist, with the identifier filter off and on, and counts the
+queries each path issues. With the filter on, unknown identifiers should
+cost no queries and take as long as a wrong password (one hash).
+"""
+import argparse
+import time
+
+from common import report, setup_django, Timer
+from bench_lookup import populate
+
+
+def attempts(identifiers, password):
+    from django.contrib.auth import authenticate
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples = []
+    with CaptureQueriesContext(connection) as captured:
+        for identifier in identifiers:
+            started = time.perf_counter()
+            assert authenticate(username=identifier, password=password) is None
+            samples.append(time.perf_counter() - started)
+    return samples, len(captured)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--attempts', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from accounts import identifier_filter
+
+    User = get_user_model()
+    populate(User, args.users, batch_size=5000)
+    # populate() writes unusable passwords; give the sampled users a real hash
+    # so wrong-password checks do the same work as the dummy hash
+    known = [f'user{i}@example.com' for i in range(0, args.users, max(1, args.users // args.attempts))][:args.attempts]
+    for user in User.objects.filter(email_lower__in=known):
+        user.set_password('RealPass123')
+        user.save(update_fields=['password'])
+    unknown = [f'nobody{i}@example.com' for i in range(args.attempts)]
+
+    settings.IDENTIFIER_FILTER_ENABLED = True
+    settings.IDENTIFIER_FILTER_SNAPSHOT = None
+    with Timer() as t:
+        bloom = identifier_filter.rebuild()
+    print(f'built filter over {args.users} users in {t.elapsed:.1f}s ({len(bloom.bits) / 1024:.0f} KiB)')
+
+    for enabled in (False, True):
+        settings.IDENTIFIER_FILTER_ENABLED = enabled
+        label = 'filter on' if enabled else 'filter off'
+        samples, queries = attempts(known, 'WrongPass123')
+        report(f'{label}: wrong password ({queries} queries)', samples)
+        samples, queries = attempts(unknown, 'WrongPass123')
+        report(f'{label}: unknown identifier ({queries} queries)', samples)
+
+
+if __name__ == '__main__':
+    main()
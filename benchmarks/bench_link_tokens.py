@@ -0,0 +1,87 @@
+"""Cost of turning away bad activation and reset links.
+
+    python benchmarks/bench_link_tokens.py [--requests 2000]
+
+Compares Django's default_token_generator, which loads the user before it can
+check a token, with accounts.link_tokens, which rejects expired, tampered and
+replayed tokens from the signature alone. Each case reports latency and the
+queries run per check.
+"""
+import argparse
+import time
+from datetime import datetime
+
+from common import report, setup_django
+
+
+def measure(check, n):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(n):
+            started = time.perf_counter()
+            assert not check()
+            samples.append(time.perf_counter() - started)
+    return samples, len(queries) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.tokens import default_token_generator
+    from django.utils import timezone
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+    from accounts import views
+    from accounts.link_tokens import activation_token
+
+    UserModel = get_user_model()
+    user = UserModel.objects.create_user(username='bench', email='bench@example.com', password='BenchPass123')
+    uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
+
+    def django_check(token):
+        # What the views did before: decode the uid, load the user, check
+        def check():
+            pk = urlsafe_base64_decode(uidb64).decode()
+            candidate = UserModel.objects.filter(pk=pk).first()
+            return candidate is not None and default_token_generator.check_token(candidate, token)
+        return check
+
+    def signed_check(token):
+        return lambda: views._verify_link(uidb64, token, activation_token) != (None, None)
+
+    # Django's token carries its issue date, ours the expiry
+    default_token_generator._now = lambda: datetime(2001, 1, 1)
+    lifetime, settings.ACTIVATION_TOKEN_LIFETIME = settings.ACTIVATION_TOKEN_LIFETIME, -1
+    expired = {'django': default_token_generator.make_token(user), 'signed': activation_token.make_token(user)}
+    del default_token_generator._now
+    settings.ACTIVATION_TOKEN_LIFETIME = lifetime
+
+    valid = default_token_generator.make_token(user)
+    tampered = {'django': valid[:-2] + 'xx', 'signed': activation_token.make_token(user)[:-2] + 'xx'}
+
+    # A replayed link is one whose user has since been activated and logged in
+    replayed_django = default_token_generator.make_token(user)
+    user.is_active = True
+    user.last_login = timezone.now()
+    user.save()
+    replayed_signed = activation_token.make_token(user)
+    activation_token.consume(replayed_signed)
+    replayed = {'django': replayed_django, 'signed': replayed_signed}
+
+    for case, tokens in (('expired', expired), ('tampered', tampered), ('replayed', replayed)):
+        for name, make in (('django', django_check), ('signed', signed_check)):
+            samples, queries = measure(make(tokens[name]), args.requests)
+            report(f'{case} / {name} ({queries:.0f} queries)', samples)
+
+
+if __name__ == '__main__':
+    main()
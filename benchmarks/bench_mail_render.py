@@ -0,0 +1,42 @@
+"""Mail rendering: compiled per-locale templates vs. render_to_string per call.
+
+    python benchmarks/bench_mail_render.py [--messages 100000]
+"""
+import argparse
+
+from common import Timer, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=100000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.template.loader import render_to_string
+    from django.utils.html import linebreaks, urlize
+    from accounts.mail import render_mail
+
+    contexts = [
+        {'user': {'username': f'user{i}'}, 'domain': 'example.com', 'uid': f'uid{i}', 'token': f'token-{i}'}
+        for i in range(1000)
+    ]
+    for template_name in ('accounts/activation_email.html', 'accounts/password_reset_email.html'):
+        print(f'-- {template_name}, {args.messages} messages')
+        with Timer() as t:
+            for i in range(args.messages):
+                render_to_string(template_name, contexts[i % 1000])
+        print(f'render_to_string (text only)  {t.elapsed:7.2f}s {args.messages / t.elapsed:10.0f} msg/s')
+        with Timer() as t:
+            for i in range(args.messages):
+                text = render_to_string(template_name, contexts[i % 1000])
+                linebreaks(urlize(text, autoescape=True))
+        print(f'render_to_string + urlize     {t.elapsed:7.2f}s {args.messages / t.elapsed:10.0f} msg/s')
+        with Timer() as t:
+            for i in range(args.messages):
+                render_mail(template_name, contexts[i % 1000])
+        print(f'render_mail (text + html)     {t.elapsed:7.2f}s {args.messages / t.elapsed:10.0f} msg/s')
+
+
+if __name__ == '__main__':
+    main()
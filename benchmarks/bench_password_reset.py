@@ -0,0 +1,57 @@
+"""Cost of a password reset flood.
+
+    python benchmarks/bench_password_reset.py [--requests 1000] [--addresses 10]
+
+Posts the reset form through the test client, cycling over a few registered
+addresses, as a client hammering "resend" would. Only the first request per
+address within PASSWORD_RESET_COALESCE_WINDOW renders and queues a mail; the
+rest are answered without a query. ``--window 0`` turns coalescing off for
+comparison.
+"""
+import argparse
+import time
+
+from common import report, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--addresses', type=int, default=10)
+    parser.add_argument('--window', type=int, help='Override PASSWORD_RESET_COALESCE_WINDOW (seconds).')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, setup_test_environment
+    from django.urls import reverse
+
+    from accounts.models import OutboundEmail
+
+    setup_test_environment()  # Allows the test client's 'testserver' host
+    settings.RATE_LIMITS = {}  # All requests come from one address
+    if args.window is not None:
+        settings.PASSWORD_RESET_COALESCE_WINDOW = args.window
+    UserModel = get_user_model()
+    for i in range(args.addresses):
+        UserModel.objects.create_user(username=f'bench{i}', email=f'bench{i}@example.com', password='BenchPass123')
+
+    client = Client()
+    url = reverse('password_reset')
+    samples = []
+    with CaptureQueriesContext(connection) as queries:
+        for i in range(args.requests):
+            started = time.perf_counter()
+            response = client.post(url, {'email': f'bench{i % args.addresses}@example.com'})
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 302, response.status_code
+    report('password reset request', samples)
+    print(f'queries per request: {len(queries) / args.requests:.2f}, '
+          f'mails queued: {OutboundEmail.objects.count()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Permission checks for users in many groups: ModelBackend vs permission_cache.
+
+    python benchmarks/bench_permissions.py [--groups 50] [--perms-per-group 20] [--checks 2000]
+
+Each check uses a freshly loaded user, as every request does, and asks for
+one permission the user has through a group.
+"""
+import argparse
+import random
+
+from common import report, setup_django, Timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--perms-per-group', type=int, default=20)
+    parser.add_argument('--checks', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.backends import ModelBackend
+    from django.contrib.auth.models import Group, Permission
+    from django.contrib.contenttypes.models import ContentType
+    from accounts.auth_backend import EmailOrUsernameModelBackend
+
+    User = get_user_model()
+    content_type = ContentType.objects.get_for_model(User)
+    permissions = Permission.objects.bulk_create([
+        Permission(content_type=content_type, codename=f'bench_{i}', name=f'Bench {i}')
+        for i in range(args.groups * args.perms_per_group)
+    ])
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='x', is_active=True)
+    for g in range(args.groups):
+        group = Group.objects.create(name=f'group{g}')
+        group.permissions.add(*permissions[g * args.perms_per_group:(g + 1) * args.perms_per_group])
+        user.groups.add(group)
+    names = [f'accounts.{p.codename}' for p in permissions]
+
+    for label, backend in (
+        ('ModelBackend', ModelBackend()),
+        ('EmailOrUsernameModelBackend (cached)', EmailOrUsernameModelBackend()),
+    ):
+        backend.has_perm(User.objects.get(pk=user.pk), names[0])  # Warm up
+        samples = []
+        for _ in range(args.checks):
+            fresh = User.objects.get(pk=user.pk)
+            with Timer() as t:
+                assert backend.has_perm(fresh, random.choice(names))
+            samples.append(t.elapsed)
+        report(label, samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Session engine throughput: db vs cached_db vs accounts.session_backend.
+
+    python benchmarks/bench_sessions.py [--sessions 5000] [--reads 20000]
+
+"login" creates a session holding the auth keys login() stores and saves it
+(cycle_key + save, as django.contrib.auth.login does). "read" loads a random
+existing session the way SessionMiddleware does on an authenticated request.
+For the write-behind engine the background thread is disabled so full
+batches are flushed inline: login throughput therefore still pays for the
+database writes, amortised over bulk upserts, rather than hiding them on
+another thread.
+"""
+import argparse
+import importlib
+import random
+
+from common import Timer, setup_django
+
+
+def run(engine, sessions, reads):
+    from django.conf import settings
+
+    settings.SESSION_ENGINE = engine
+    # Flush full batches inline so their cost is part of the login timing
+    settings.SESSION_WRITE_BEHIND_INTERVAL = None
+    settings.SESSION_WRITE_BEHIND_BATCH_SIZE = 500
+    SessionStore = importlib.import_module(engine).SessionStore
+
+    keys = []
+    with Timer() as login:
+        for i in range(sessions):
+            store = SessionStore()
+            store['_auth_user_id'] = str(i)
+            store['_auth_user_backend'] = 'accounts.auth_backend.EmailOrUsernameModelBackend'
+            store['_auth_user_hash'] = 'x' * 64
+            store.cycle_key()
+            store.save()
+            keys.append(store.session_key)
+
+    flush = None
+    if engine == 'accounts.session_backend':
+        from accounts.session_backend import writer
+
+        with Timer() as flush:
+            writer.flush()
+
+    with Timer() as read:
+        for _ in range(reads):
+            SessionStore(random.choice(keys)).get('_auth_user_id')
+
+    line = (
+        f'{engine:<45} login {sessions / login.elapsed:9.0f}/s   '
+        f'read {reads / read.elapsed:9.0f}/s'
+    )
+    if flush is not None:
+        line += f'   (final partial batch: {flush.elapsed * 1000:.0f}ms)'
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--reads', type=int, default=20000)
+    parser.add_argument('--database', help='SQLite file to use instead of an in-memory database.')
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.core.cache import cache
+
+    for engine in (
+        'django.contrib.sessions.backends.db',
+        'django.contrib.sessions.backends.cached_db',
+        'accounts.session_backend',
+    ):
+        cache.clear()
+        run(engine, args.sessions, args.reads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Time to first request for a fresh worker, with and without warm-up.
+
+    python benchmarks/bench_startup.py [--rounds 5]
+
+Each round boots a new interpreter that imports User_Authentication.wsgi on
+a throwaway SQLite database, then sends the first two requests a user would:
+GET /login/ and a successful POST /login/. "cold" is the default boot;
+"warm" sets WARMUP_ON_STARTUP, so boot includes accounts.warmup and the
+requests should not. Medians over the rounds are printed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from statistics import median
+
+from common import ROOT
+
+SETTINGS_TEMPLATE = '''
+import os
+from User_Authentication.settings import *
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {db!r}}}}}
+IDENTIFIER_FILTER_SNAPSHOT = {snapshot!r}
+WARMUP_ON_STARTUP = os.environ.get('BENCH_WARMUP') == '1'
+'''
+
+CREATE_USER = '''
+from django.contrib.auth import get_user_model
+get_user_model().objects.create_user(username='bench', email='bench@example.com', password='BenchPass123', is_active=True)
+'''
+
+DRIVER = r'''
+import io, json, re, sys, time
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+from User_Authentication.wsgi import application
+booted = time.perf_counter()
+
+
+def call(method, path, body=b'', cookie=''):
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'HTTP_COOKIE': cookie,
+               'wsgi.input': io.BytesIO(body), 'CONTENT_LENGTH': str(len(body)),
+               'CONTENT_TYPE': 'application/x-www-form-urlencoded'}
+    setup_testing_defaults(environ)
+    status = []
+    chunks = application(environ, lambda s, headers, exc_info=None: status.append((s, headers)))
+    content = b''.join(chunks)
+    return status[0][0], dict(status[0][1]), content
+
+
+status, headers, content = call('GET', '/login/')
+got = time.perf_counter()
+cookie = headers['Set-Cookie'].split(';')[0]
+token = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', content).group(1).decode()
+body = urlencode({'username': 'bench', 'password': 'BenchPass123', 'csrfmiddlewaretoken': token}).encode()
+t = time.perf_counter()
+status, headers, content = call('POST', '/login/', body, cookie)
+posted = time.perf_counter()
+assert status.startswith('302'), status
+print(json.dumps({'boot': booted - started, 'get': got - booted, 'post': posted - t}))
+'''
+
+
+def prepare_environment(workdir):
+    settings_path = Path(workdir) / 'startup_settings.py'
+    settings_path.write_text(SETTINGS_TEMPLATE.format(
+        db=str(Path(workdir) / 'db.sqlite3'), snapshot=str(Path(workdir) / 'identifier_filter.bin'),
+    ))
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='startup_settings',
+        PYTHONPATH=os.pathsep.join([str(workdir), str(ROOT)]),
+    )
+    manage = [sys.executable, str(ROOT / 'manage.py')]
+    subprocess.run(manage + ['migrate', '-v', '0'], env=env, check=True)
+    subprocess.run(manage + ['shell', '-c', CREATE_USER], env=env, check=True)
+    return env
+
+
+def boot(env, warm):
+    result = subprocess.run(
+        [sys.executable, '-c', DRIVER], env=dict(env, BENCH_WARMUP='1' if warm else '0'),
+        capture_output=True, text=True, cwd=str(ROOT),
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = prepare_environment(workdir)
+        for mode in ('cold', 'warm'):
+            runs = [boot(env, mode == 'warm') for _ in range(args.rounds)]
+            figures = {key: median(run[key] for run in runs) * 1000 for key in ('boot', 'get', 'post')}
+            print(
+                f'{mode:<5} boot={figures["boot"]:7.1f}ms first GET /login/={figures["get"]:7.1f}ms '
+                f'first login={figures["post"]:7.1f}ms '
+                f'first requests total={figures["get"] + figures["post"]:7.1f}ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Per-request authentication cost: signed bearer tokens vs sessions.
+
+    python benchmarks/bench_token_auth.py [--requests 2000]
+
+Each path requests the same JSON view (api_me) through the full middleware
+stack with the test client, so the numbers include routing and response
+rendering. The ``uncached`` session path invalidates the user cache before
+each request to show the cost of the per-request user query.
+"""
+import argparse
+import time
+
+from common import report, setup_django
+
+
+def measure(client, n, before=None, **extra):
+    from django.urls import reverse
+
+    url = reverse('api_me')
+    samples = []
+    for _ in range(n):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = client.get(url, **extra)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from accounts import api_auth, user_cache
+
+    setup_test_environment()  # Allows the test client's 'testserver' host
+    user = get_user_model().objects.create_user(
+        username='bench', email='bench@example.com', password='BenchPass123', is_active=True
+    )
+
+    token = api_auth.issue_tokens(user)['access']
+    report('bearer token', measure(Client(), args.requests, HTTP_AUTHORIZATION=f'Bearer {token}'))
+
+    session_client = Client()
+    session_client.force_login(user)
+    report('session (cached user)', measure(session_client, args.requests))
+    report(
+        'session (uncached user)',
+        measure(session_client, args.requests, before=lambda: user_cache.invalidate_user(user.pk)),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django(database_name=None):
+    # Benchmarks run against a throwaway database so they never touch db.sqlite3
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'User_Authentication.settings')
+    import django
+
+    django.setup()
+    from django.db import connection
+
+    if database_name is not None:
+        connection.settings_dict['TEST']['NAME'] = database_name
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    return connection
+
+
+def database_settings(url, workdir):
+    # A throwaway SQLite file in workdir, or the PostgreSQL database at url
+    if url is None:
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(Path(workdir) / 'db.sqlite3'),
+            'OPTIONS': {'timeout': 30},
+        }
+    parsed = urlparse(url)
+    if parsed.scheme not in ('postgres', 'postgresql'):
+        raise SystemExit(f'Unsupported database URL: {url}')
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': parsed.path.lstrip('/'),
+        'USER': unquote(parsed.username or ''),
+        'PASSWORD': unquote(parsed.password or ''),
+        'HOST': parsed.hostname or '',
+        'PORT': str(parsed.port or ''),
+    }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples):
+    # Samples are in seconds; figures are printed in microseconds
+    mean = sum(samples) / len(samples)
+    print(
+        f'{label:<40} n={len(samples):<7} mean={mean * 1e6:9.1f}us '
+        f'p50={percentile(samples, 50) * 1e6:9.1f}us p99={percentile(samples, 99) * 1e6:9.1f}us'
+    )
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
@@ -0,0 +1,72 @@
+"""Minimal asyncio HTTP/1.1 client for the load-test harnesses (stdlib only)."""
+import asyncio
+import re
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+
+
+class Session:
+    """One virtual user: keeps cookies between requests, one connection per request."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookies = {}
+
+    async def request(self, method, path, data=None, headers=None):
+        body = urlencode(data).encode() if data is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: close',
+            f'Content-Length: {len(body)}',
+        ]
+        if data is not None:
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        if 'csrftoken' in self.cookies and method != 'GET':
+            lines.append(f'Referer: http://{self.host}:{self.port}{path}')
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        head, _, payload = raw.partition(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        response_headers = []
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            response_headers.append((name.strip().lower(), value.strip()))
+            if name.strip().lower() == 'set-cookie':
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+        return Response(int(status_line.split()[1]), response_headers, payload)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post_form(self, path, data):
+        # Fetch the form first so the CSRF cookie and hidden token are current
+        page = await self.get(path)
+        match = CSRF_INPUT.search(page.text)
+        if match:
+            data = dict(data, csrfmiddlewaretoken=match.group(1))
+        return await self.request('POST', path, data=data)
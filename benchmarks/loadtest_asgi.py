@@ -0,0 +1,131 @@
+"""Sync vs. async login throughput under uvicorn.
+
+Builds a throwaway SQLite database with test users, starts uvicorn on the
+project's ASGI application and drives concurrent virtual users against
+/login/ (sync view) and /async/login/ (async view).
+
+    pip install uvicorn
+    python benchmarks/loadtest_asgi.py [--users 200] [--concurrency 100] [--duration 20]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import ROOT, percentile
+from http_client import Session
+
+SETTINGS_TEMPLATE = '''
+from User_Authentication.settings import *
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+RATE_LIMITS = {{}}  # Every virtual user comes from the same address
+DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {db!r}, 'OPTIONS': {{'timeout': 30}}}}}}
+'''
+
+CREATE_USERS = '''
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+User = get_user_model()
+password = make_password('LoadTest123')
+users = []
+for i in range({count}):
+    user = User(username=f'load{{i}}', email=f'load{{i}}@example.com', password=password, is_active=True)
+    user.sync_lookup_fields()
+    users.append(user)
+User.objects.bulk_create(users, batch_size=1000)
+'''
+
+
+def prepare_environment(workdir, user_count):
+    settings_path = Path(workdir) / 'loadtest_settings.py'
+    settings_path.write_text(SETTINGS_TEMPLATE.format(db=str(Path(workdir) / 'db.sqlite3')))
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='loadtest_settings',
+        PYTHONPATH=os.pathsep.join([str(workdir), str(ROOT)]),
+    )
+    manage = [sys.executable, str(ROOT / 'manage.py')]
+    subprocess.run(manage + ['migrate', '-v', '0'], env=env, check=True)
+    subprocess.run(manage + ['shell', '-c', CREATE_USERS.format(count=user_count)], env=env, check=True)
+    return env
+
+
+def start_server(env, port, workers):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'User_Authentication.asgi:application',
+         '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+        env=env, cwd=ROOT,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(Session('127.0.0.1', port).get('/login/'))
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('uvicorn did not start')
+
+
+async def run_load(path, port, user_count, concurrency, duration):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def virtual_user(index):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            session = Session('127.0.0.1', port)
+            i = (index + len(latencies)) % user_count
+            started = time.perf_counter()
+            try:
+                response = await session.post_form(path, {'username': f'load{i}', 'password': 'LoadTest123'})
+            except OSError:
+                errors += 1
+                continue
+            if response.status == 302:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+    elapsed = time.monotonic() - started
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = prepare_environment(workdir, args.users)
+        server = start_server(env, args.port, args.workers)
+        try:
+            for label, path in (('sync  /login/', '/login/'), ('async /async/login/', '/async/login/')):
+                latencies, errors, elapsed = asyncio.run(
+                    run_load(path, args.port, args.users, args.concurrency, args.duration)
+                )
+                print(
+                    f'{label:<22} logins/s={len(latencies) / elapsed:8.1f} errors={errors:<6} '
+                    f'p50={percentile(latencies, 50) * 1000:7.1f}ms '
+                    f'p95={percentile(latencies, 95) * 1000:7.1f}ms '
+                    f'p99={percentile(latencies, 99) * 1000:7.1f}ms'
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()